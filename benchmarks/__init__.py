@@ -0,0 +1,2 @@
+"""Benchmarks of the py_utils hot paths, run with `python -m benchmarks run` and compared with
+`python -m benchmarks compare`."""
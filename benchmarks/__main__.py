@@ -0,0 +1,74 @@
+"""Run the benchmarks and compare their results between commits.
+
+`run` saves the timings of the current commit to `<results-dir>/<commit>.json`, `compare` reports the relative
+change of each benchmark between two results and exits with status 1 when one regressed beyond the threshold.
+"""
+import argparse
+import sys
+
+from benchmarks.harness import (
+    DEFAULT_RESULTS_DIR,
+    compare_results,
+    format_comparison,
+    load_results,
+    run_benchmarks,
+    save_results,
+)
+
+
+def _run(args: argparse.Namespace) -> int:
+    min_time, repeat = (0.01, 1) if args.quick else (args.min_time, args.repeat)
+    results = run_benchmarks(args.k, args.group, min_time=min_time, repeat=repeat, verbose=True)
+    if args.quick:
+        # too noisy to be compared
+        return 0
+    path = save_results(results, args.results_dir)
+    print(f"Results saved to {path}")
+    return 0
+
+
+def _compare(args: argparse.Namespace) -> int:
+    base = load_results(args.base, args.results_dir)
+    new = load_results(args.new, args.results_dir)
+    rows = compare_results(base, new, threshold=args.threshold, statistic=args.statistic)
+    if not rows:
+        print("No common benchmarks")
+        return 0
+    print(format_comparison(rows))
+    regressions = [row["name"] for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR, help="directory of the results per commit")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="run the benchmarks and save the results of the current commit")
+    run.add_argument("-k", nargs="+", help="shell-style patterns of the benchmark names, e.g. 'io.*'")
+    run.add_argument("--group", nargs="+", help="groups of the benchmarks, e.g. mappings io")
+    run.add_argument("--min-time", type=float, default=0.2, help="minimal duration of a timing round in seconds")
+    run.add_argument("--repeat", type=int, default=5, help="number of timing rounds")
+    run.add_argument("--quick", action="store_true", help="smoke test: a single short round, results are not saved")
+    run.set_defaults(handler=_run)
+
+    compare = subparsers.add_parser("compare", help="compare two results, exits with 1 on regressions")
+    compare.add_argument("base", help="results path, commit (prefix) or git revision of the reference")
+    compare.add_argument("new", nargs="?", default="HEAD", help="results to check, defaults to HEAD")
+    compare.add_argument("--threshold", type=float, default=0.1, help="relative slowdown flagged as regression")
+    compare.add_argument("--statistic", default="median", choices=["median", "min", "mean"])
+    compare.set_defaults(handler=_compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+import contextlib
+import io
+
+from benchmarks.harness import benchmark
+from py_utils.decorators.concurrency import parallel, threaded
+
+# The timings are per call of the decorated function, i.e. for N_TASKS tasks: divide by N_TASKS for the overhead
+# per task. The tasks do no work, so the timings are the overhead of the decorators (pools creation included).
+N_TASKS = 100
+
+
+def _identity(value):
+    # module level, to be picklable by `parallel`
+    return value
+
+
+def _identity_batch(values):
+    # `threaded` calls the function with `[value]` and unpacks single-item results
+    return values
+
+
+@benchmark("concurrency.threaded", group="concurrency", tasks=N_TASKS)
+def bench_threaded(tmp_dir):
+    threaded_identity = threaded(_identity_batch)
+    values = list(range(N_TASKS))
+
+    def run():
+        # `threaded` prints its progress
+        with contextlib.redirect_stdout(io.StringIO()):
+            threaded_identity(values)
+
+    return run
+
+
+@benchmark("concurrency.parallel", group="concurrency", tasks=N_TASKS)
+def bench_parallel(tmp_dir):
+    parallel_identity = parallel(_identity, nb_processes=2)
+    values = list(range(N_TASKS))
+    return lambda: parallel_identity(values)
@@ -0,0 +1,75 @@
+import numpy as np
+
+from benchmarks.harness import benchmark
+from py_utils.io import load_json, load_many_json, load_pickle, read_txt, save_json, save_pickle, save_txt
+
+
+def _json_payload(n_records: int = 2_000) -> list[dict]:
+    return [{"id": idx, "name": f"case_{idx}", "spacing": [1.0, 1.0, 2.5], "label": idx % 3} for idx in range(n_records)]
+
+
+@benchmark("io.save_json", group="io")
+def bench_save_json(tmp_dir):
+    data = _json_payload()
+    return lambda: save_json(data, tmp_dir / "data.json", log=False)
+
+
+@benchmark("io.load_json", group="io")
+def bench_load_json(tmp_dir):
+    save_json(_json_payload(), tmp_dir / "data.json", log=False)
+    return lambda: load_json(tmp_dir / "data.json")
+
+
+@benchmark("io.load_json.gzip", group="io")
+def bench_load_json_gzip(tmp_dir):
+    save_json(_json_payload(), tmp_dir / "data.json.gz", log=False)
+    return lambda: load_json(tmp_dir / "data.json.gz")
+
+
+@benchmark("io.load_many_json", group="io")
+def bench_load_many_json(tmp_dir):
+    paths = [tmp_dir / f"data_{idx}.json" for idx in range(64)]
+    for path in paths:
+        save_json(_json_payload(50), path, log=False)
+    return lambda: load_many_json(paths)
+
+
+@benchmark("io.save_txt", group="io")
+def bench_save_txt(tmp_dir):
+    text = "\n".join(f"line {idx}" for idx in range(10_000))
+    return lambda: save_txt(text, tmp_dir / "data.txt", append=False)
+
+
+@benchmark("io.read_txt", group="io")
+def bench_read_txt(tmp_dir):
+    save_txt("\n".join(f"line {idx}" for idx in range(10_000)), tmp_dir / "data.txt", append=False)
+    return lambda: read_txt(tmp_dir / "data.txt")
+
+
+def _array_payload() -> dict:
+    # 64 MiB of arrays, the size of a few preprocessed volumes
+    return {"image": np.zeros((128, 256, 256), dtype=np.float32), "mask": np.zeros((128, 256, 256), dtype=np.uint8)}
+
+
+@benchmark("io.save_pickle", group="io")
+def bench_save_pickle(tmp_dir):
+    data = _array_payload()
+    return lambda: save_pickle(data, tmp_dir / "data.pkl")
+
+
+@benchmark("io.save_pickle.out_of_band", group="io")
+def bench_save_pickle_oob(tmp_dir):
+    data = _array_payload()
+    return lambda: save_pickle(data, tmp_dir / "data.pkl", out_of_band=True)
+
+
+@benchmark("io.load_pickle", group="io")
+def bench_load_pickle(tmp_dir):
+    save_pickle(_array_payload(), tmp_dir / "data.pkl")
+    return lambda: load_pickle(tmp_dir / "data.pkl", use_mmap=False)
+
+
+@benchmark("io.load_pickle.out_of_band_mmap", group="io")
+def bench_load_pickle_oob(tmp_dir):
+    save_pickle(_array_payload(), tmp_dir / "data.pkl", out_of_band=True)
+    return lambda: load_pickle(tmp_dir / "data.pkl", use_mmap=True)
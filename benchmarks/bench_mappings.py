@@ -0,0 +1,48 @@
+import random
+
+from benchmarks.harness import benchmark
+from py_utils.mappings import flatten_mapping, merge_lists_of_dicts_on_key
+
+
+def _nested_mapping(depth: int, width: int) -> dict:
+    if depth == 0:
+        return {f"leaf_{idx}": idx for idx in range(width)}
+    return {f"node_{idx}": _nested_mapping(depth - 1, width) for idx in range(width)}
+
+
+@benchmark("mappings.flatten_mapping.wide", group="mappings")
+def flatten_wide(tmp_dir):
+    # 4 levels of 8 keys: 32768 leaves
+    nested = _nested_mapping(4, 8)
+    return lambda: flatten_mapping(nested)
+
+
+@benchmark("mappings.flatten_mapping.deep", group="mappings")
+def flatten_deep(tmp_dir):
+    nested = leaf = {}
+    for idx in range(500):
+        leaf[f"level_{idx}"] = {}
+        leaf = leaf[f"level_{idx}"]
+    leaf["value"] = 1
+    return lambda: flatten_mapping(nested)
+
+
+def _records(n_lists: int, n_records: int, seed: int = 0) -> list[list[dict]]:
+    rng = random.Random(seed)
+    lists = []
+    for list_idx in range(n_lists):
+        ids = rng.sample(range(n_records * 2), n_records)
+        lists.append([{"id": f"case_{case_id}", f"feature_{list_idx}": rng.random()} for case_id in ids])
+    return lists
+
+
+@benchmark("mappings.merge_lists_of_dicts_on_key.memory", group="mappings")
+def merge_memory(tmp_dir):
+    lists = _records(4, 10_000)
+    return lambda: merge_lists_of_dicts_on_key(lists, "id")
+
+
+@benchmark("mappings.merge_lists_of_dicts_on_key.spill", group="mappings")
+def merge_spill(tmp_dir):
+    lists = _records(4, 10_000)
+    return lambda: merge_lists_of_dicts_on_key(lists, "id", mode="spill", spill_dir=tmp_dir)
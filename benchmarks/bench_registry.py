@@ -0,0 +1,29 @@
+from benchmarks.harness import benchmark
+from py_utils.registry import Registry
+
+N_ENTRIES = 1_000
+
+
+def _registry() -> Registry:
+    registry = Registry("bench")
+    for idx in range(N_ENTRIES):
+        registry.register(lambda: None, name=f"entry_{idx}", group=f"group_{idx % 10}")
+    return registry
+
+
+@benchmark("registry.get", group="registry", entries=N_ENTRIES)
+def bench_get(tmp_dir):
+    registry = _registry()
+    return lambda: registry.get("entry_500")
+
+
+@benchmark("registry.get.with_metadata", group="registry", entries=N_ENTRIES)
+def bench_get_with_metadata(tmp_dir):
+    registry = _registry()
+    return lambda: registry.get("entry_500", with_metadata=True)
+
+
+@benchmark("registry.query", group="registry", entries=N_ENTRIES)
+def bench_query(tmp_dir):
+    registry = _registry()
+    return lambda: registry.query(group="group_3")
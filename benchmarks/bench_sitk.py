@@ -0,0 +1,60 @@
+from benchmarks.harness import SkipBenchmark, benchmark
+
+# synthetic CT-like volume, (z, y, x) as in the arrays of SimpleITK
+SHAPE = (64, 256, 256)
+SPACING = (0.8, 0.8, 2.5)
+
+
+def _volume():
+    try:
+        import numpy as np
+        import SimpleITK as sitk
+    except ImportError as exception:
+        raise SkipBenchmark(f"SimpleITK is not installed ({exception})") from exception
+
+    rng = np.random.default_rng(0)
+    array = rng.normal(0, 300, size=SHAPE).astype(np.int16)
+    image = sitk.GetImageFromArray(array)
+    image.SetSpacing(SPACING)
+    return image
+
+
+def _written_volume(tmp_dir):
+    image = _volume()
+    from py_utils.sitk import write_sitk
+
+    path = tmp_dir / "volume.nii.gz"
+    write_sitk(image, path)
+    return path
+
+
+@benchmark("sitk.load_sitk", group="sitk")
+def bench_load_sitk(tmp_dir):
+    path = _written_volume(tmp_dir)
+    from py_utils.sitk import load_sitk
+
+    return lambda: load_sitk(path)
+
+
+@benchmark("sitk.load_sitk_as_array", group="sitk")
+def bench_load_sitk_as_array(tmp_dir):
+    path = _written_volume(tmp_dir)
+    from py_utils.sitk import load_sitk_as_array
+
+    return lambda: load_sitk_as_array(path)
+
+
+@benchmark("sitk.normalize", group="sitk")
+def bench_normalize(tmp_dir):
+    image = _volume()
+    from py_utils.sitk import normalize
+
+    return lambda: normalize(image, 1, 99, 0, 255)
+
+
+@benchmark("sitk.resample_3d_image_spacing", group="sitk")
+def bench_resample(tmp_dir):
+    image = _volume()
+    from py_utils.sitk import resample_3d_image_spacing
+
+    return lambda: resample_3d_image_spacing(image, (1.6, 1.6, 2.5))
@@ -0,0 +1,251 @@
+import fnmatch
+import importlib
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import timeit
+from collections.abc import Callable, Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Union
+
+from py_utils.io import load_json, save_json
+from py_utils.registry import Registry
+from py_utils.types import PathLike
+
+__all__ = [
+    "BENCHMARKS",
+    "DEFAULT_RESULTS_DIR",
+    "SkipBenchmark",
+    "benchmark",
+    "compare_results",
+    "format_comparison",
+    "load_results",
+    "measure",
+    "run_benchmarks",
+    "save_results",
+]
+
+BENCHMARKS = Registry("benchmarks")
+DEFAULT_RESULTS_DIR = Path(__file__).resolve().parent.parent / ".benchmarks"
+
+# modules defining the benchmarks, imported by `load_benchmarks`
+_MODULES = [
+    "benchmarks.bench_mappings",
+    "benchmarks.bench_io",
+    "benchmarks.bench_concurrency",
+    "benchmarks.bench_registry",
+    "benchmarks.bench_sitk",
+]
+
+
+class SkipBenchmark(Exception):
+    """Raised by a benchmark setup when it cannot run here, e.g. because of a missing optional dependency."""
+
+
+def benchmark(name: str, group: str, **metadata: Any) -> Callable:
+    """Register a benchmark.
+
+    The decorated function is the setup of the benchmark: it receives a temporary directory and returns the
+    zero-argument callable whose duration is measured.
+
+    Example:
+        >>> from py_utils.mappings import flatten_mapping
+        >>> @benchmark("mappings.flatten_mapping", group="mappings")
+        ... def flatten(tmp_dir):
+        ...     nested = {f"key_{idx}": {"value": idx} for idx in range(1_000)}
+        ...     return lambda: flatten_mapping(nested)
+
+    Args:
+        name: name of the benchmark, `<group>.<case>` by convention
+        group: group of the benchmark, used to select benchmarks
+        **metadata: additional metadata stored with the benchmark
+    """
+    return BENCHMARKS.register(name=name, group=group, **metadata)
+
+
+def load_benchmarks() -> Registry:
+    """Import the benchmark modules, registering their benchmarks."""
+    for module in _MODULES:
+        importlib.import_module(module)
+    return BENCHMARKS
+
+
+def measure(func: Callable[[], Any], min_time: float = 0.2, repeat: int = 5) -> dict[str, Union[float, int]]:
+    """Time a callable like :mod:`timeit`.
+
+    The number of calls per round is chosen so that a round lasts at least `min_time` seconds, then `repeat` rounds
+    are timed. Times are in seconds per call.
+    """
+    number = 1
+    while True:
+        elapsed = timeit.Timer(func, timer=time.perf_counter).timeit(number)
+        if elapsed >= min_time:
+            break
+        # aim a bit above min_time to not loop again
+        number = max(number * 2, int(number * 1.2 * min_time / max(elapsed, 1e-9)))
+    timings = [elapsed / number]
+    timings += [timeit.Timer(func, timer=time.perf_counter).timeit(number) / number for _ in range(repeat - 1)]
+    return {
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def _git(*args: str) -> Union[str, None]:
+    try:
+        return subprocess.run(
+            ["git", *args],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    patterns: Union[Iterable[str], None] = None,
+    groups: Union[Iterable[str], None] = None,
+    min_time: float = 0.2,
+    repeat: int = 5,
+    verbose: bool = False,
+) -> dict[str, Any]:
+    """Run the registered benchmarks.
+
+    Args:
+        patterns: shell-style patterns of the benchmark names to run. Defaults to None (all).
+        groups: groups of the benchmarks to run. Defaults to None (all).
+        min_time: minimal duration of a timing round in seconds. Defaults to 0.2.
+        repeat: number of timing rounds. Defaults to 5.
+        verbose: print the results as they come. Defaults to False.
+
+    Returns:
+        dict[str, Any]: results, with the commit and the environment they were measured in
+    """
+    registry = load_benchmarks()
+    names = registry.query(group=list(groups)) if groups else registry.available_keys()
+    if patterns:
+        patterns = list(patterns)
+        names = [name for name in names if any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)]
+
+    commit = _git("rev-parse", "HEAD")
+    results: dict[str, Any] = {
+        "commit": commit,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")) if commit else None,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "min_time": min_time,
+        "benchmarks": {},
+        "skipped": {},
+    }
+    for name in names:
+        entry = registry.get(name, with_metadata=True)
+        setup = entry["fn"]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            try:
+                func = setup(Path(tmp_dir))
+            except (SkipBenchmark, ImportError) as exception:
+                results["skipped"][name] = str(exception)
+                if verbose:
+                    print(f"{name:<50} skipped: {exception}")
+                continue
+            timing = measure(func, min_time=min_time, repeat=repeat)
+        results["benchmarks"][name] = {**entry["metadata"], **timing}
+        if verbose:
+            print(f"{name:<50} {_format_time(timing['median']):>10} (min {_format_time(timing['min'])})")
+    return results
+
+
+def _results_name(results: dict[str, Any]) -> str:
+    name = results["commit"] or "unknown"
+    return f"{name}-dirty" if results["dirty"] else name
+
+
+def save_results(results: dict[str, Any], results_dir: PathLike = DEFAULT_RESULTS_DIR) -> Path:
+    """Save results to `<results_dir>/<commit>.json` (`<commit>-dirty.json` with uncommitted changes)."""
+    path = Path(results_dir) / f"{_results_name(results)}.json"
+    save_json(results, path, log=False)
+    return path
+
+
+def load_results(ref: PathLike, results_dir: PathLike = DEFAULT_RESULTS_DIR) -> dict[str, Any]:
+    """Load results from a path, or by commit (any unique prefix, or a git revision such as `HEAD~1`)."""
+    path = Path(ref)
+    if path.is_file():
+        return load_json(path)
+    results_dir = Path(results_dir)
+    candidates = sorted(results_dir.glob(f"{ref}*.json"))
+    if not candidates:
+        commit = _git("rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}")
+        candidates = sorted(results_dir.glob(f"{commit}*.json")) if commit else []
+    if not candidates:
+        raise FileNotFoundError(f"No benchmark results for {ref} in {results_dir}")
+    # prefer the results of the clean commit over the dirty ones
+    clean = [candidate for candidate in candidates if not candidate.stem.endswith("-dirty")]
+    candidates = clean or candidates
+    if len({candidate.stem.removesuffix("-dirty") for candidate in candidates}) > 1:
+        raise ValueError(f"Ambiguous reference {ref}: {[candidate.name for candidate in candidates]}")
+    return load_json(candidates[0])
+
+
+def compare_results(
+    base: dict[str, Any],
+    new: dict[str, Any],
+    threshold: float = 0.1,
+    statistic: str = "median",
+) -> list[dict[str, Any]]:
+    """Compare the benchmarks present in both results.
+
+    Args:
+        base: reference results
+        new: results to check
+        threshold: relative slowdown above which a benchmark is flagged as regression, e.g. 0.1 for 10%. Speedups
+            beyond the same threshold are flagged as improvements. Defaults to 0.1.
+        statistic: compared timing statistic. Defaults to "median".
+
+    Returns:
+        list[dict[str, Any]]: one row per benchmark with the base and new times, their ratio and a status among
+            `regression`, `improvement` and `ok`
+    """
+    rows = []
+    for name in sorted(set(base["benchmarks"]) & set(new["benchmarks"])):
+        base_time = base["benchmarks"][name][statistic]
+        new_time = new["benchmarks"][name][statistic]
+        ratio = new_time / base_time if base_time else float("inf")
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold):
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({"name": name, "base": base_time, "new": new_time, "ratio": ratio, "status": status})
+    return rows
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def format_comparison(rows: list[dict[str, Any]]) -> str:
+    """Human readable table of :func:`compare_results` rows."""
+    width = max([len(row["name"]) for row in rows] + [len("benchmark")])
+    lines = [f"{'benchmark':<{width}}  {'base':>10}  {'new':>10}  {'ratio':>6}  status"]
+    for row in rows:
+        lines.append(
+            f"{row['name']:<{width}}  {_format_time(row['base']):>10}  {_format_time(row['new']):>10}  "
+            f"{row['ratio']:>6.2f}  {row['status']}",
+        )
+    return "\n".join(lines)
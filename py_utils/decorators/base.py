@@ -0,0 +1,241 @@
+import copy
+import inspect
+from functools import partial, wraps
+
+__all__ = [
+    'base_decorator_func',
+    'base_decorator_func_with_args',
+    'BaseDecorator',
+]
+
+
+def base_decorator_func(function):
+    """Function based decorator template, wrapping a function.
+
+    Parameters
+    ----------
+    function : function
+        The function which shall be wrapped.
+
+    Returns
+    -------
+    function
+        The function wrapper.
+    """
+    @wraps(function)  # maintain all the info about the function
+    def wrapper(*func_args, **func_kwargs):
+        return function(*func_args, **func_kwargs)
+    return wrapper
+
+
+def base_decorator_func_with_args(function=None, *args, **kwargs):
+    """Function based decorator template, accepting arguments.
+    It can be used bare, with void parentheses or with arguments.
+
+    Parameters
+    ----------
+    function : function
+        The function which shall be wrapped.
+
+    Returns
+    -------
+    function
+        The function wrapper.
+    """
+    if function is None or not callable(function):
+        """A partial is a "non-complete function call" that includes
+        a function and some arguments, so that they are passed around
+        as one object without actually calling the function yet.
+        """
+        if function is not None:
+            args = (function,) + args
+        return partial(base_decorator_func_with_args, None, *args, **kwargs)
+
+    @wraps(function)  # maintain all the info about the function
+    def wrapper(*func_args, **func_kwargs):
+        return function(*func_args, **func_kwargs)
+    wrapper.args = args
+    wrapper.kwargs = kwargs
+    return wrapper
+
+
+class BaseDecorator:
+    """Class based decorator, from which decorators can be inherited.
+
+    It can be used bare (`@Decorator`), with void parentheses (`@Decorator()`)
+    or with arguments (`@Decorator(1, two=2)`). Passing the function as first
+    positional argument decorates it directly: `Decorator(func, two=2)`. The
+    decorator arguments are exposed as `.args` and `.kwargs` on the decorated
+    function.
+
+    Child classes customize the calls with hooks:
+
+    - `prepare()`: called once per decorated function, e.g. to precompute
+      per-function state. The function is available as `self.func`.
+    - `before(args, kwargs)`: called before each call, its return value is
+      passed to the other hooks. Returning `self.SKIP` calls the function
+      without the other hooks.
+    - `after(state, result)`: called after each successful call.
+    - `on_error(state, exception)`: called when the call raises, the exception
+      is re-raised afterwards.
+
+    Alternatively, `run(func, *args, **kwargs)` can be overridden to take full
+    control of the calls (sync functions only).
+
+    The wrapper is generated once per decorated function and matches its kind:
+    sync, async, generator or async generator functions. For generators, the
+    hooks span the iteration until the generator is exhausted or closed. When
+    no hook is overridden, the wrapper only forwards the call. Each decorated
+    function gets its own shallow copy of the decorator, available as
+    `wrapper.decorator`, so per-function state can be stored on `self`.
+    """
+
+    # returned by `before` to skip the other hooks of a call
+    SKIP = object()
+
+    def __new__(cls, *args, **kwargs):
+        if args and _is_decoratable(args[0]):
+            # bare decorator or function passed along with the decorator arguments
+            decorator = super().__new__(cls)
+            decorator.__init__(*args[1:], **kwargs)
+            return decorator.decorate(args[0])
+        return super().__new__(cls)
+
+    def __init__(self, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        self.func = None
+
+    def __call__(self, func):
+        return self.decorate(func)
+
+    def prepare(self):
+        pass
+
+    def before(self, args, kwargs):
+        return None
+
+    def after(self, state, result):
+        pass
+
+    def on_error(self, state, exception):
+        pass
+
+    def run(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def _overrides(self, name):
+        return getattr(type(self), name) is not getattr(BaseDecorator, name)
+
+    def decorate(self, func):
+        """Wrap `func`, see the class docstring."""
+        decorator = copy.copy(self)
+        decorator.func = func
+        decorator.prepare()
+
+        if decorator._overrides('run'):
+            wrapper = _run_wrapper(func, decorator.run)
+        elif any(decorator._overrides(hook) for hook in ('before', 'after', 'on_error')):
+            if inspect.isasyncgenfunction(func):
+                make_wrapper = _async_generator_wrapper
+            elif inspect.iscoroutinefunction(func):
+                make_wrapper = _async_wrapper
+            elif inspect.isgeneratorfunction(func):
+                make_wrapper = _generator_wrapper
+            else:
+                make_wrapper = _sync_wrapper
+            wrapper = make_wrapper(func, decorator.before, decorator.after, decorator.on_error, self.SKIP)
+        else:
+            wrapper = _forward_wrapper(func)
+
+        wrapper = wraps(func)(wrapper)
+        wrapper.args = self.args
+        wrapper.kwargs = self.kwargs
+        wrapper.decorator = decorator
+        return wrapper
+
+
+def _is_decoratable(obj):
+    # classes are taken as decorator arguments, e.g. exception or warning types
+    return callable(obj) and not isinstance(obj, (type, BaseDecorator))
+
+
+# The wrappers are built once per decorated function, with the hooks bound as closure variables, so a call only
+# packs the arguments and calls the hooks.
+
+def _forward_wrapper(func):
+    if inspect.iscoroutinefunction(func):
+        async def wrapper(*args, **kwargs):
+            return await func(*args, **kwargs)
+    else:
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _run_wrapper(func, run):
+    def wrapper(*args, **kwargs):
+        return run(func, *args, **kwargs)
+    return wrapper
+
+
+def _sync_wrapper(func, before, after, on_error, skip):
+    def wrapper(*args, **kwargs):
+        state = before(args, kwargs)
+        if state is skip:
+            return func(*args, **kwargs)
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as exception:
+            on_error(state, exception)
+            raise
+        after(state, result)
+        return result
+    return wrapper
+
+
+def _async_wrapper(func, before, after, on_error, skip):
+    async def wrapper(*args, **kwargs):
+        state = before(args, kwargs)
+        if state is skip:
+            return await func(*args, **kwargs)
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as exception:
+            on_error(state, exception)
+            raise
+        after(state, result)
+        return result
+    return wrapper
+
+
+def _generator_wrapper(func, before, after, on_error, skip):
+    def wrapper(*args, **kwargs):
+        state = before(args, kwargs)
+        if state is skip:
+            return (yield from func(*args, **kwargs))
+        try:
+            result = yield from func(*args, **kwargs)
+        except BaseException as exception:
+            on_error(state, exception)
+            raise
+        after(state, result)
+        return result
+    return wrapper
+
+
+def _async_generator_wrapper(func, before, after, on_error, skip):
+    async def wrapper(*args, **kwargs):
+        state = before(args, kwargs)
+        if state is skip:
+            async for item in func(*args, **kwargs):
+                yield item
+            return
+        try:
+            async for item in func(*args, **kwargs):
+                yield item
+        except BaseException as exception:
+            on_error(state, exception)
+            raise
+        after(state, None)
+    return wrapper
@@ -0,0 +1,274 @@
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import partial, wraps
+from pathlib import Path
+from typing import Any, Union
+
+from py_utils.io import _resolve_path, load_pickle, save_pickle
+from py_utils.types import PathLike
+
+__all__ = [
+    "DiskCache",
+    "disk_cache",
+]
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "py_utils"
+# raised by `pickle.dumps` for objects which cannot be pickled, e.g. lambdas, local functions or open files
+_PICKLING_ERRORS = (pickle.PicklingError, TypeError, AttributeError)
+
+
+def _digest(obj: Any) -> bytes:
+    hasher = hashlib.blake2b(digest_size=20)
+    _update_hash(hasher, obj)
+    return hasher.digest()
+
+
+def _update_hash(hasher: "hashlib._Hash", obj: Any) -> None:
+    """Feed `obj` into `hasher`.
+
+    Containers are walked so that nested numpy arrays are hashed from their raw memory instead of being pickled.
+    Sets and dicts are hashed independently of their iteration order, which depends on the insertion order and for
+    sets of strings on `PYTHONHASHSEED`, so equal arguments give the same key in every process.
+    """
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(obj, np.ndarray):
+        hasher.update(f"ndarray:{obj.dtype.str}:{obj.shape}".encode())
+        if obj.dtype.hasobject:
+            hasher.update(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+        else:
+            hasher.update(memoryview(np.ascontiguousarray(obj)).cast("B"))
+    elif isinstance(obj, (list, tuple)):
+        hasher.update(f"{type(obj).__name__}:{len(obj)}".encode())
+        for item in obj:
+            _update_hash(hasher, item)
+    elif isinstance(obj, dict):
+        hasher.update(f"dict:{len(obj)}".encode())
+        for item_digest in sorted(_digest(key) + _digest(item) for key, item in obj.items()):
+            hasher.update(item_digest)
+    elif isinstance(obj, (set, frozenset)):
+        hasher.update(f"{type(obj).__name__}:{len(obj)}".encode())
+        for item_digest in sorted(_digest(item) for item in obj):
+            hasher.update(item_digest)
+    elif isinstance(obj, str):
+        hasher.update(b"str:" + obj.encode())
+    else:
+        hasher.update(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _function_fingerprint(func: Callable) -> bytes:
+    """Hash of a function's qualified name and source code, invalidating the cache when the function changes."""
+    try:
+        source = inspect.getsource(func).encode()
+    except (OSError, TypeError):
+        source = getattr(getattr(func, "__code__", None), "co_code", b"")
+    return hashlib.blake2b(f"{func.__module__}.{func.__qualname__}".encode() + b"\x00" + source).digest()
+
+
+class DiskCache:
+    """Directory of pickled results indexed by content hash.
+
+    The index is a sqlite database, so the cache can be shared by several threads and processes. Results are written
+    to a temporary file first and atomically moved in place.
+
+    Args:
+        cache_dir: directory in which results and the index are stored
+        max_size: maximal total size of the stored results in bytes. Least recently used results are evicted first.
+            Defaults to None (unlimited).
+        max_age: maximal age of a result in seconds. Defaults to None (unlimited).
+        compression: compression codec passed to :func:`py_utils.io.save_pickle`. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        cache_dir: PathLike = DEFAULT_CACHE_DIR,
+        max_size: Union[int, None] = None,
+        max_age: Union[float, None] = None,
+        compression: Union[str, None] = None,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self.max_age = max_age
+        self.compression = compression
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, size INTEGER, created REAL, accessed REAL)",
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Open the index in a transaction which is committed, or rolled back on error, and closed on exit."""
+        conn = sqlite3.connect(self.cache_dir / "index.sqlite", timeout=60)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _path(self, key: str) -> Path:
+        return _resolve_path(self.cache_dir / key, [".pkl"], self.compression)[0]
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """Look up a result.
+
+        Returns:
+            tuple[bool, Any]: whether the key was found and the stored result (None if not found)
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False, None
+            if self.max_age is not None and now - row[0] > self.max_age:
+                self._delete(conn, [key])
+                return False, None
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        try:
+            return True, load_pickle(self._path(key), compression=self.compression)
+        except FileNotFoundError:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            return False, None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a result and evict old entries if the cache exceeds its limits."""
+        path = self._path(key)
+        tmp_path = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp{''.join(path.suffixes)}")
+        save_pickle(value, tmp_path, compression=self.compression)
+        os.replace(tmp_path, path)
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (key, path.stat().st_size, now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.max_age is not None:
+            expired = conn.execute("SELECT key FROM entries WHERE created < ?", (now - self.max_age,)).fetchall()
+            self._delete(conn, [key for key, in expired])
+        if self.max_size is not None:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            evicted = []
+            for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+                if total <= self.max_size:
+                    break
+                evicted.append(key)
+                total -= size
+            self._delete(conn, evicted)
+
+    def _delete(self, conn: sqlite3.Connection, keys: list[str]) -> None:
+        for key in keys:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        """Remove all stored results."""
+        with self._connect() as conn:
+            keys = [key for key, in conn.execute("SELECT key FROM entries").fetchall()]
+            self._delete(conn, keys)
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+def disk_cache(
+    func: Callable = None,
+    *,
+    cache_dir: PathLike = DEFAULT_CACHE_DIR,
+    max_size: Union[int, None] = None,
+    max_age: Union[float, None] = None,
+    compression: Union[str, None] = None,
+) -> Callable:
+    """Memoize the results of a function on disk.
+
+    The cache key hashes the function's qualified name, its source code and its arguments, after binding them to
+    the signature so that positional, keyword and default arguments give the same key. Numpy arrays are hashed from
+    their raw memory. Changing the function's code invalidates its cached results. Arguments which cannot be pickled,
+    e.g. lambdas, raise a `TypeError`.
+
+    Example:
+        >>> @disk_cache(cache_dir="cache", max_age=7 * 24 * 3600)
+        ... def preprocess(case_id, spacing=(1.0, 1.0, 1.0)):
+        ...     ...
+        >>> preprocess("case_1")  # computed and stored
+        >>> preprocess("case_1")  # loaded from disk
+        >>> preprocess.uncached("case_1")  # bypass the cache
+        >>> preprocess.refresh("case_1")  # recompute and overwrite the stored result
+
+    Args:
+        func: function to decorate
+        cache_dir: directory in which results are stored. Defaults to `~/.cache/py_utils`.
+        max_size: maximal total size of the cache directory in bytes. Defaults to None (unlimited).
+        max_age: maximal age of a result in seconds. Defaults to None (unlimited).
+        compression: compression codec of the stored results, see :func:`py_utils.io.save_pickle`.
+            Defaults to None.
+
+    Returns:
+        Callable: the wrapped function, with `uncached`, `refresh`, `cache_key` and `cache` attributes
+    """
+    if func is None:
+        return partial(
+            disk_cache,
+            cache_dir=cache_dir,
+            max_size=max_size,
+            max_age=max_age,
+            compression=compression,
+        )
+
+    cache = DiskCache(cache_dir, max_size=max_size, max_age=max_age, compression=compression)
+    signature = inspect.signature(func)
+    fingerprint = _function_fingerprint(func)
+
+    def cache_key(*args, **kwargs) -> str:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        hasher = hashlib.blake2b(fingerprint, digest_size=20)
+        try:
+            _update_hash(hasher, bound.arguments)
+        except _PICKLING_ERRORS as error:
+            for name, value in bound.arguments.items():
+                try:
+                    _digest(value)
+                except _PICKLING_ERRORS:
+                    raise TypeError(
+                        f"Cannot compute the cache key of {func.__qualname__}: argument {name!r} of type "
+                        f"{type(value).__name__} cannot be pickled. HINT: Call `{func.__name__}.uncached`.",
+                    ) from error
+            raise
+        return hasher.hexdigest()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = cache_key(*args, **kwargs)
+        found, result = cache.get(key)
+        if not found:
+            result = func(*args, **kwargs)
+            cache.set(key, result)
+        return result
+
+    def refresh(*args, **kwargs):
+        result = func(*args, **kwargs)
+        cache.set(cache_key(*args, **kwargs), result)
+        return result
+
+    wrapper.uncached = func
+    wrapper.refresh = refresh
+    wrapper.cache_key = cache_key
+    wrapper.cache = cache
+    return wrapper
@@ -1,7 +1,7 @@
 from threading import Thread
 import concurrent.futures
 from multiprocessing import Pool, Process
-from functools import partial
+from functools import partial, wraps
 
 __all__ = [
     'run_in_thread',
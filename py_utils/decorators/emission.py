@@ -0,0 +1,70 @@
+# emission.py
+import logging
+import warnings
+
+__all__ = [
+    'configure_emission',
+    'emit',
+]
+
+_TARGETS = ('default', 'logging', 'silent')
+
+
+class _Emission:
+    """Global state of the emission backend, checked by the decorators before building a message."""
+
+    __slots__ = ('enabled', 'target', 'logger')
+
+    def __init__(self):
+        self.enabled = True
+        self.target = 'default'
+        self.logger = None
+
+
+_EMISSION = _Emission()
+
+
+def configure_emission(target='default', logger=None):
+    """Choose where the messages of `print_call` and `deprecated` go.
+
+    Parameters
+    ----------
+    target : str, optional
+        - 'default': `print_call` prints to stdout and `deprecated` calls `warnings.warn`.
+        - 'logging': both log to `logger`, at level INFO for calls and WARNING for deprecations.
+        - 'silent': nothing is emitted. The decorators check a single flag
+          before doing anything else, so silenced decorators cost almost nothing.
+        By default 'default'.
+    logger : logging.Logger or str, optional
+        Logger or name of the logger used with the 'logging' target, by default the `py_utils` logger.
+    """
+    if target not in _TARGETS:
+        raise ValueError(f'Unknown emission target: {target}, expected one of {_TARGETS}')
+    if isinstance(logger, str) or logger is None:
+        logger = logging.getLogger(logger or 'py_utils')
+    _EMISSION.logger = logger
+    _EMISSION.target = target
+    _EMISSION.enabled = target != 'silent'
+
+
+def emit(message, category=None, stacklevel=1):
+    """Emit a message through the configured backend.
+
+    Parameters
+    ----------
+    message : str
+        The message.
+    category : type of Warning, optional
+        Emit the message as a warning of this category, by default None (a plain message).
+    stacklevel : int, optional
+        Stack level of the warning or log record, relative to the caller of `emit`, by default 1.
+    """
+    if not _EMISSION.enabled:
+        return
+    if _EMISSION.target == 'logging':
+        level = logging.INFO if category is None else logging.WARNING
+        _EMISSION.logger.log(level, message, stacklevel=stacklevel + 1)
+    elif category is not None:
+        warnings.warn(message, category=category, stacklevel=stacklevel + 1)
+    else:
+        print(message)
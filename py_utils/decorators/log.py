@@ -1,23 +1,191 @@
-# timing.py
-from functools import wraps, partial
+# log.py
+import itertools
 import logging
+import reprlib
+import threading
+import time
+
+from py_utils.decorators.base import BaseDecorator
 
 __all__ = [
     'log',
+    'summarize',
 ]
 
 
-def log(func=None, *, logger=logging.getLogger(__name__), level='info'):
-    if func is None:
-        """A partial is a "non-complete function call" that includes
-        a function and some arguments, so that they are passed around
-        as one object without actually calling the function yet.
-        """
-        return partial(log, logger=logger, level=level)
-    @wraps(func)  # maintain all the info about the function
-    def wrapper(*args, **kwargs):
-        logger.log(level, '{} was called with args: {} and kwargs: {}'.format(func.__name__, args, kwargs))
-        result = func(*args, **kwargs)
-        logger.log(level, 'return value: {}'.format(func, result))
-        return result
-    return wrapper
+class _SummaryRepr(reprlib.Repr):
+    """`reprlib.Repr` summarizing array-like objects by their shape and dtype instead of their values."""
+
+    def repr1(self, x, level):
+        if not isinstance(x, type):
+            shape = getattr(x, 'shape', None)
+            dtype = getattr(x, 'dtype', None)
+            if shape is not None and dtype is not None:
+                return f'{type(x).__name__}(shape={tuple(shape)}, dtype={dtype})'
+        return super().repr1(x, level)
+
+
+def _summary_repr(max_len, max_items):
+    summary_repr = _SummaryRepr()
+    summary_repr.maxstring = summary_repr.maxother = summary_repr.maxlong = max_len
+    summary_repr.maxlist = summary_repr.maxtuple = summary_repr.maxdict = max_items
+    summary_repr.maxset = summary_repr.maxfrozenset = summary_repr.maxdeque = max_items
+    return summary_repr
+
+
+_DEFAULT_REPR = _summary_repr(max_len=80, max_items=6)
+
+
+def summarize(obj, max_len=80, max_items=6):
+    """Short representation of an object for log messages.
+
+    Arrays (any object with `shape` and `dtype` attributes) are summarized
+    by their shape and dtype, long strings and containers are truncated.
+
+    Parameters
+    ----------
+    obj : object
+        Object to summarize.
+    max_len : int, optional
+        Maximal length of the representation of strings and other objects, by default 80.
+    max_items : int, optional
+        Maximal number of represented items of containers, by default 6.
+
+    Returns
+    -------
+    str
+        The summary.
+    """
+    summary_repr = _DEFAULT_REPR if (max_len, max_items) == (80, 6) else _summary_repr(max_len, max_items)
+    return summary_repr.repr(obj)
+
+
+class _LazyCall:
+    """Arguments of a call, only summarized when a handler formats the log record."""
+
+    __slots__ = ('args', 'kwargs', 'summary_repr')
+
+    def __init__(self, args, kwargs, summary_repr):
+        self.args = args
+        self.kwargs = kwargs
+        self.summary_repr = summary_repr
+
+    def __str__(self):
+        arguments = [self.summary_repr.repr(arg) for arg in self.args]
+        arguments += [f'{key}={self.summary_repr.repr(value)}' for key, value in self.kwargs.items()]
+        return ', '.join(arguments)
+
+
+class _LazySummary:
+    """Object only summarized when a handler formats the log record."""
+
+    __slots__ = ('obj', 'summary_repr')
+
+    def __init__(self, obj, summary_repr):
+        self.obj = obj
+        self.summary_repr = summary_repr
+
+    def __str__(self):
+        return self.summary_repr.repr(self.obj)
+
+
+class _RateLimiter:
+    """Allow at most `rate` events per second, in windows of one second."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._window = None
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        window = int(time.monotonic())
+        with self._lock:
+            if window != self._window:
+                self._window = window
+                self._count = 0
+            self._count += 1
+            return self._count <= self.rate
+
+
+class log(BaseDecorator):
+    """Decorates the passed function to log its calls and results.
+
+    Nothing is formatted unless `logger.isEnabledFor(level)`: the call and
+    its result are passed to the logger as lazy %-style arguments, which are
+    only summarized (see `summarize`) when a handler emits the record. A
+    decorated function thus costs a level check per call when logging is off.
+    Can be used bare (`@log`) or with arguments (`@log(level='debug')`).
+
+    Parameters
+    ----------
+    logger : logging.Logger or str, optional
+        Logger or name of the logger, by default the logger of the function's module.
+    level : int or str, optional
+        Logging level, e.g. `logging.DEBUG` or 'debug', by default `logging.INFO`.
+    sample_every : int, optional
+        Only log one in `sample_every` calls, by default 1 (every call).
+    rate_limit : float, optional
+        Maximal number of logged calls per second, by default None (unlimited).
+    max_len : int, optional
+        Maximal length of the summary of each argument and of the result, by default 80.
+    max_items : int, optional
+        Maximal number of summarized items of container arguments, by default 6.
+
+    Returns
+    -------
+    function
+        The function wrapper.
+
+    Examples
+    --------
+    >>> @log(level='debug', rate_limit=10)
+    ... def normalize(image, clip=(0, 1)): ...
+    """
+
+    def __init__(self, *, logger=None, level=logging.INFO, sample_every=1, rate_limit=None, max_len=80,
+                 max_items=6):
+        if sample_every < 1:
+            raise ValueError(f'sample_every must be >= 1, got {sample_every}')
+        if isinstance(level, str):
+            level_name = level
+            level = logging.getLevelName(level_name.upper())
+            if not isinstance(level, int):
+                raise ValueError(f'Unknown logging level: {level_name}')
+        super().__init__(logger=logger, level=level, sample_every=sample_every, rate_limit=rate_limit,
+                         max_len=max_len, max_items=max_items)
+        self.logger = logging.getLogger(logger) if isinstance(logger, str) else logger
+        self.level = level
+        self.sample_every = sample_every
+        self.rate_limit = rate_limit
+        self._summary_repr = _summary_repr(max_len, max_items)
+
+    def prepare(self):
+        if self.logger is None:
+            self.logger = logging.getLogger(self.func.__module__)
+        self._name = self.func.__qualname__
+        self._is_enabled_for = self.logger.isEnabledFor
+        self._throttled = self.sample_every > 1 or self.rate_limit is not None
+        self._calls = itertools.count()
+        self._allow = _RateLimiter(self.rate_limit) if self.rate_limit is not None else None
+
+    def _sampled(self):
+        if self.sample_every > 1 and next(self._calls) % self.sample_every:
+            return False
+        return self._allow is None or self._allow()
+
+    # stacklevel=3 attributes the records to the caller of the decorated function (hook < wrapper < caller)
+    def before(self, args, kwargs):
+        # the level check comes first, it is the only cost when logging is off
+        if not self._is_enabled_for(self.level) or (self._throttled and not self._sampled()):
+            return self.SKIP
+        self.logger.log(self.level, '%s called with (%s)', self._name, _LazyCall(args, kwargs, self._summary_repr),
+                        stacklevel=3)
+
+    def after(self, state, result):
+        self.logger.log(self.level, '%s returned %s', self._name, _LazySummary(result, self._summary_repr),
+                        stacklevel=3)
+
+    def on_error(self, state, exception):
+        if isinstance(exception, Exception):
+            self.logger.log(self.level, '%s raised %r', self._name, exception, stacklevel=3)
@@ -0,0 +1,312 @@
+import inspect
+import os
+import sys
+import threading
+import tracemalloc
+from collections.abc import Callable
+from functools import wraps
+from typing import Any, Union
+
+from py_utils.metrics import METRICS, MetricsRegistry
+
+__all__ = [
+    "MemoryTracker",
+    "track_memory",
+]
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+# Trackers currently inside their block, so that a nested tracker resetting the peak RSS or the tracemalloc peak can
+# report the peaks to the enclosing ones
+_ACTIVE_TRACKERS: list["MemoryTracker"] = []
+_ACTIVE_LOCK = threading.Lock()
+
+
+def _current_rss() -> Union[int, None]:
+    """Resident set size of the process in bytes, None if it cannot be read."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return None
+
+
+def _reset_peak_rss() -> bool:
+    """Reset the peak RSS of the process (Linux only). Returns whether it succeeded."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss() -> Union[int, None]:
+    """Peak resident set size of the process in bytes, since start or the last :func:`_reset_peak_rss`."""
+    try:
+        with open("/proc/self/status", "rb") as f:
+            for line in f:
+                if line.startswith(b"VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _update_nested_peaks(peak: Union[int, None], traced_peak: Union[int, None] = None) -> None:
+    """Report a peak RSS and a tracemalloc peak to the active trackers, before they are reset by a nested tracker.
+
+    Requires `_ACTIVE_LOCK`.
+    """
+    for tracker in _ACTIVE_TRACKERS:
+        if peak is not None and (tracker._nested_peak is None or peak > tracker._nested_peak):
+            tracker._nested_peak = peak
+        if traced_peak is not None and (
+            tracker._nested_traced_peak is None or traced_peak > tracker._nested_traced_peak
+        ):
+            tracker._nested_traced_peak = traced_peak
+
+
+def _format_bytes(size: Union[int, float, None]) -> str:
+    if size is None:
+        return "n/a"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(size) < 1024 or unit == "GiB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+
+
+class MemoryTracker:
+    """Measure the memory used by a block of code, see :func:`track_memory`.
+
+    After the block, the following attributes are set (sizes in bytes, None if not measured):
+
+    - `rss_delta`: change of the resident set size of the process
+    - `peak_rss_delta`: peak resident set size during the block, relative to the size before the block. The peak is
+      exact on Linux, elsewhere it is only known if the block raised the peak of the process.
+    - `traced_peak`: peak of the memory allocated through Python's allocators during the block (`tracemalloc`)
+    - `top_allocations`: `(site, size, count)` of the lines which allocated the most memory still alive at the end
+      of the block
+    - `numpy_bytes`: size of the numpy array buffers allocated during the block and still alive at its end
+
+    Args:
+        name: name of the tracked block, prefix of the recorded metrics
+        top: number of reported allocation sites. Defaults to 10.
+        trace_allocations: trace the Python allocations with `tracemalloc`, which slows down the block. Defaults to
+            True.
+        track_numpy: measure the numpy array buffers allocated during the block, requires `trace_allocations`.
+            Defaults to False.
+        registry: metrics registry in which the sizes are recorded. Defaults to :data:`py_utils.metrics.METRICS`.
+        verbose: print a summary after the block. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        name: Union[str, None] = None,
+        top: int = 10,
+        trace_allocations: bool = True,
+        track_numpy: bool = False,
+        registry: Union[MetricsRegistry, None] = METRICS,
+        verbose: bool = False,
+    ) -> None:
+        if track_numpy and not trace_allocations:
+            raise ValueError("track_numpy requires trace_allocations")
+        self.name = name
+        self.top = top
+        self.trace_allocations = trace_allocations
+        self.track_numpy = track_numpy
+        self.registry = registry
+        self.verbose = verbose
+        self.rss_delta: Union[int, None] = None
+        self.peak_rss_delta: Union[int, None] = None
+        self.traced_peak: Union[int, None] = None
+        self.top_allocations: list[tuple[str, int, int]] = []
+        self.numpy_bytes: Union[int, None] = None
+
+    def __enter__(self) -> "MemoryTracker":
+        self._started_tracing = False
+        self._snapshot = None
+        self._nested_peak: Union[int, None] = None
+        self._nested_traced_peak: Union[int, None] = None
+        if self.trace_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            if self.top or self.track_numpy:
+                self._snapshot = tracemalloc.take_snapshot()
+
+        self._traced_before = 0
+        self._rss_before = _current_rss()
+        with _ACTIVE_LOCK:
+            self._peak_before = _peak_rss()
+            traced_peak = tracemalloc.get_traced_memory()[1] if self.trace_allocations else None
+            # the enclosing trackers lose the peaks reached so far when they are reset
+            _update_nested_peaks(self._peak_before, traced_peak)
+            del traced_peak
+            self._peak_reset = _reset_peak_rss()
+            _ACTIVE_TRACKERS.append(self)
+        if self.trace_allocations:
+            # last, outside of the lock, once the temporary objects of the bookkeeping above are freed, so that
+            # they do not lower the memory traced during the block below the baseline
+            self._traced_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        rss_after = _current_rss()
+        peak_after = _peak_rss()
+        with _ACTIVE_LOCK:
+            _ACTIVE_TRACKERS.remove(self)
+            peak = peak_after
+            if peak is not None and self._nested_peak is not None:
+                peak = max(peak, self._nested_peak)
+            traced_peak = None
+            if self.trace_allocations:
+                traced_peak = tracemalloc.get_traced_memory()[1]
+                if self._nested_traced_peak is not None:
+                    traced_peak = max(traced_peak, self._nested_traced_peak)
+            _update_nested_peaks(peak, traced_peak)
+
+        if self._rss_before is not None and rss_after is not None:
+            self.rss_delta = rss_after - self._rss_before
+        if peak is not None:
+            baseline = self._rss_before if self._rss_before is not None else self._peak_before
+            if self._peak_reset or peak > self._peak_before:
+                self.peak_rss_delta = max(peak - baseline, 0)
+
+        if self.trace_allocations:
+            self.traced_peak = traced_peak - self._traced_before
+            if self._snapshot is not None:
+                self._collect_allocations(tracemalloc.take_snapshot())
+                self._snapshot = None
+            if self._started_tracing:
+                tracemalloc.stop()
+
+        self._record()
+        if self.verbose:
+            print(self.summary())
+
+    def _collect_allocations(self, snapshot: tracemalloc.Snapshot) -> None:
+        # ignore the allocations of the tracker itself
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        if self.top:
+            stats = snapshot.filter_traces(filters).compare_to(self._snapshot.filter_traces(filters), "lineno")
+            self.top_allocations = [
+                (str(stat.traceback[0]), stat.size_diff, stat.count_diff) for stat in stats[: self.top]
+            ]
+        np = sys.modules.get("numpy")
+        if self.track_numpy and np is not None:
+            # numpy reports the allocations of array buffers to tracemalloc in a dedicated domain
+            numpy_filter = [tracemalloc.DomainFilter(True, np.lib.tracemalloc_domain)]
+            before = sum(stat.size for stat in self._snapshot.filter_traces(numpy_filter).statistics("filename"))
+            after = sum(stat.size for stat in snapshot.filter_traces(numpy_filter).statistics("filename"))
+            self.numpy_bytes = after - before
+
+    def _record(self) -> None:
+        if self.registry is None or self.name is None:
+            return
+        for field in ("rss_delta", "peak_rss_delta", "traced_peak", "numpy_bytes"):
+            value = getattr(self, field)
+            if value is not None:
+                self.registry.record(f"{self.name}.{field}", value, unit="B")
+
+    def summary(self) -> str:
+        """Human readable summary of the measurements."""
+        lines = [
+            f"{self.name or 'block'}: peak RSS {_format_bytes(self.peak_rss_delta)}, "
+            f"RSS delta {_format_bytes(self.rss_delta)}, traced peak {_format_bytes(self.traced_peak)}",
+        ]
+        if self.numpy_bytes is not None:
+            lines.append(f"  numpy arrays: {_format_bytes(self.numpy_bytes)}")
+        for site, size, count in self.top_allocations:
+            lines.append(f"  {site}: {_format_bytes(size)} in {count} blocks")
+        return "\n".join(lines)
+
+    def __call__(self, func: Callable) -> Callable:
+        options = dict(
+            name=self.name or f"{func.__module__}.{func.__qualname__}",
+            top=self.top,
+            trace_allocations=self.trace_allocations,
+            track_numpy=self.track_numpy,
+            registry=self.registry,
+            verbose=self.verbose,
+        )
+
+        # a new tracker per call, the last one is kept on the wrapper
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                with MemoryTracker(**options) as tracker:
+                    wrapper.last_tracker = tracker
+                    return await func(*args, **kwargs)
+
+        else:
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with MemoryTracker(**options) as tracker:
+                    wrapper.last_tracker = tracker
+                    return func(*args, **kwargs)
+
+        wrapper.last_tracker = None
+        return wrapper
+
+
+def track_memory(
+    name: Union[str, Callable, None] = None,
+    *,
+    top: int = 10,
+    trace_allocations: bool = True,
+    track_numpy: bool = False,
+    registry: Union[MetricsRegistry, None] = METRICS,
+    verbose: bool = False,
+) -> Any:
+    """Measure the memory used by a function or block of code.
+
+    The peak and final RSS deltas, the `tracemalloc` peak and optionally the numpy array volume are recorded as
+    metrics named `<name>.<measurement>` with unit `B` in the same registry as the timing decorators, so
+    `METRICS.report()` shows time and memory side by side.
+
+    Example:
+        >>> import numpy as np
+        >>> from py_utils.sitk import load_sitk_as_array
+        >>> @track_memory(track_numpy=True)
+        ... def normalize(image): ...
+        >>> normalize(np.zeros((64, 256, 256)))
+        >>> print(normalize.last_tracker.summary())
+        >>> with track_memory("load_case", verbose=True):
+        ...     array = load_sitk_as_array("case.nii.gz")
+
+    Args:
+        name: name of the tracked block. Defaults to the qualified name of the decorated function.
+        top: number of reported allocation sites. Defaults to 10.
+        trace_allocations: trace the Python allocations with `tracemalloc`, which slows down the block. Defaults to
+            True.
+        track_numpy: measure the numpy array buffers allocated during the block. Defaults to False.
+        registry: metrics registry in which the sizes are recorded, None to not record them. Defaults to
+            :data:`py_utils.metrics.METRICS`.
+        verbose: print a summary after each block. Defaults to False.
+
+    Returns:
+        the :class:`MemoryTracker` as context manager or decorator, or the wrapped function if used as a bare
+        decorator
+    """
+    options = dict(
+        top=top,
+        trace_allocations=trace_allocations,
+        track_numpy=track_numpy,
+        registry=registry,
+        verbose=verbose,
+    )
+    if callable(name):
+        return MemoryTracker(**options)(name)
+    return MemoryTracker(name, **options)
@@ -1,17 +1,51 @@
-from functools import wraps
+from py_utils.decorators.base import BaseDecorator
+from py_utils.decorators.emission import _EMISSION, emit
+from py_utils.decorators.log import _RateLimiter, _summary_repr
 
 __all__ = [
     'print_call',
 ]
 
 
-def print_call(function):
-    @wraps(function)
-    def wrapper(*func_args, **func_kwargs):
-        print('{} is called from the decorator' \
-            'with arguments={} and kwargs={}'.format(
-                function.__name__, func_args, func_kwargs))
-        result = function(*func_args, **func_kwargs)
-        print('{} returns {}'.format(function.__name__, result))
-        return result
-    return wrapper
\ No newline at end of file
+class print_call(BaseDecorator):
+    """Decorates the passed function to print its calls and results.
+
+    Arguments and results are summarized (arrays by shape and dtype, long
+    strings and containers truncated, see `py_utils.decorators.log.summarize`).
+    The messages go through the emission backend, see `configure_emission`.
+
+    Parameters
+    ----------
+    rate_limit : float, optional
+        Maximal number of printed calls per second, the other calls go
+        straight to the function. By default None (unlimited).
+    max_len : int, optional
+        Maximal length of the summary of each argument and of the result, by default 80.
+    max_items : int, optional
+        Maximal number of summarized items of container arguments, by default 6.
+
+    Examples
+    --------
+    >>> @print_call(rate_limit=1)
+    ... def step(batch): ...
+    """
+
+    def __init__(self, *, rate_limit=None, max_len=80, max_items=6):
+        super().__init__(rate_limit=rate_limit, max_len=max_len, max_items=max_items)
+        self.rate_limit = rate_limit
+        self._summary_repr = _summary_repr(max_len, max_items)
+
+    def prepare(self):
+        self._name = self.func.__name__
+        self._allow = _RateLimiter(self.rate_limit) if self.rate_limit is not None else None
+
+    def before(self, args, kwargs):
+        if not _EMISSION.enabled or (self._allow is not None and not self._allow()):
+            return self.SKIP
+        summary_repr = self._summary_repr
+        arguments = [summary_repr.repr(arg) for arg in args]
+        arguments += [f'{key}={summary_repr.repr(value)}' for key, value in kwargs.items()]
+        emit(f'{self._name} is called with ({", ".join(arguments)})', stacklevel=3)
+
+    def after(self, state, result):
+        emit(f'{self._name} returns {self._summary_repr.repr(result)}', stacklevel=3)
@@ -0,0 +1,273 @@
+import inspect
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from functools import partial, wraps
+from types import CodeType, FrameType
+from typing import Any, Union
+
+from py_utils.types import PathLike
+
+__all__ = [
+    "Profiler",
+    "profile",
+    "profiled",
+]
+
+
+class Profiler:
+    """Statistical profiler sampling the call stacks of running threads at a fixed interval.
+
+    Samples are aggregated into collapsed stacks (`root;caller;leaf count` lines), the input format of flame graph
+    tools such as `flamegraph.pl`, speedscope or https://www.speedscope.app.
+
+    Two timers are available:
+
+    - `thread`: a daemon thread wakes up every `interval_ms` and reads the frames of the profiled threads from
+      `sys._current_frames`. It measures wall-clock time, including time spent waiting on I/O or locks.
+    - `signal`: `SIGPROF` is delivered every `interval_ms` of CPU time and the handler records the stack of the
+      main thread. Only available on Unix and when started from the main thread.
+
+    With the default interval of 10ms, a sample costs a few tens of microseconds, i.e. an overhead below 1%.
+    `sampling_time_ns` accumulates the time spent taking samples.
+
+    The profiler is reentrant: it samples every thread that called :meth:`start` until it calls :meth:`stop`, and
+    keeps accumulating samples across start/stop cycles.
+
+    Args:
+        interval_ms: sampling interval in milliseconds. Defaults to 10.0.
+        all_threads: sample all threads instead of the ones which started the profiler. Stacks are then prefixed
+            with the thread name. Defaults to False.
+        mode: `thread` or `signal`. Defaults to "thread".
+    """
+
+    def __init__(self, interval_ms: float = 10.0, all_threads: bool = False, mode: str = "thread") -> None:
+        if mode not in ("thread", "signal"):
+            raise ValueError(f"Unknown profiler mode: {mode}, expected 'thread' or 'signal'")
+        if mode == "signal" and not hasattr(signal, "setitimer"):
+            raise ValueError("The signal profiler mode requires signal.setitimer, which is not available here")
+        if interval_ms <= 0:
+            raise ValueError(f"interval_ms must be positive, got {interval_ms}")
+        self.interval_ms = interval_ms
+        self.all_threads = all_threads
+        self.mode = mode
+        self.samples: Counter[str] = Counter()
+        self.sampling_time_ns = 0
+        self._labels: dict[CodeType, str] = {}
+        self._thread_names: dict[int, str] = {}
+        self._targets: dict[int, int] = {}  # thread id -> number of nested starts
+        self._lock = threading.Lock()
+        self._running = False
+        self._sampler: Union[threading.Thread, None] = None
+        self._stop_event = threading.Event()
+        self._previous_handler: Any = None
+
+    def _label(self, code: CodeType, frame: FrameType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            module = frame.f_globals.get("__name__", "?")
+            label = self._labels[code] = f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+        return label
+
+    def _collapse(self, frame: Union[FrameType, None], thread_id: int) -> str:
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code, frame))
+            frame = frame.f_back
+        if self.all_threads:
+            name = self._thread_names.get(thread_id)
+            if name is None:
+                self._thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                name = self._thread_names.get(thread_id, str(thread_id))
+            labels.append(name)
+        return ";".join(reversed(labels))
+
+    def _sample(self, frames: dict[int, FrameType], skip: Union[int, None] = None) -> None:
+        start = time.perf_counter_ns()
+        targets = frames.keys() if self.all_threads else list(self._targets)
+        for thread_id in targets:
+            if thread_id == skip:
+                continue
+            frame = frames.get(thread_id)
+            if frame is not None:
+                self.samples[self._collapse(frame, thread_id)] += 1
+        self.sampling_time_ns += time.perf_counter_ns() - start
+
+    def _run_sampler(self, stop_event: threading.Event) -> None:
+        interval = self.interval_ms / 1000
+        sampler_id = threading.get_ident()
+        while not stop_event.wait(interval):
+            self._sample(sys._current_frames(), skip=sampler_id)
+
+    def _handle_signal(self, signum: int, frame: Union[FrameType, None]) -> None:
+        start = time.perf_counter_ns()
+        main_id = threading.main_thread().ident
+        if self.all_threads:
+            frames = sys._current_frames()
+            frames[main_id] = frame
+            self._sample(frames)
+        else:
+            self.samples[self._collapse(frame, main_id)] += 1
+            self.sampling_time_ns += time.perf_counter_ns() - start
+
+    def start(self) -> "Profiler":
+        """Start sampling the current thread (or all threads)."""
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._targets[thread_id] = self._targets.get(thread_id, 0) + 1
+            if self._running:
+                return self
+            if self.mode == "signal":
+                if threading.current_thread() is not threading.main_thread():
+                    self._targets.pop(thread_id)
+                    raise RuntimeError("The signal profiler mode must be started from the main thread")
+                self._previous_handler = signal.signal(signal.SIGPROF, self._handle_signal)
+                signal.setitimer(signal.ITIMER_PROF, self.interval_ms / 1000, self.interval_ms / 1000)
+            else:
+                # a new event per sampler, so a quick restart cannot keep the previous sampler alive
+                self._stop_event = threading.Event()
+                self._sampler = threading.Thread(
+                    target=self._run_sampler,
+                    args=(self._stop_event,),
+                    name="py_utils-profiler",
+                    daemon=True,
+                )
+                self._sampler.start()
+            self._running = True
+        return self
+
+    def stop(self) -> "Profiler":
+        """Stop sampling the current thread, and stop the timer once no thread is profiled anymore."""
+        thread_id = threading.get_ident()
+        sampler = None
+        with self._lock:
+            depth = self._targets.get(thread_id, 0) - 1
+            if depth > 0:
+                self._targets[thread_id] = depth
+            else:
+                self._targets.pop(thread_id, None)
+            if self._targets or not self._running:
+                return self
+            if self.mode == "signal":
+                signal.setitimer(signal.ITIMER_PROF, 0, 0)
+                signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+            else:
+                self._stop_event.set()
+                sampler, self._sampler = self._sampler, None
+            self._running = False
+        if sampler is not None:
+            sampler.join()
+        return self
+
+    def __enter__(self) -> "Profiler":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _snapshot(self) -> dict[str, int]:
+        # copying the dict is a single C call holding the GIL, so it cannot run into the sampler adding stacks. A
+        # lock would deadlock in signal mode, where the handler interrupts the main thread while it holds the lock.
+        return dict(self.samples)
+
+    def collapsed(self) -> str:
+        """Samples as collapsed stacks, one `frame;frame;...;frame count` line per distinct stack."""
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(self._snapshot().items()))
+
+    def save(self, path: PathLike) -> None:
+        """Save the collapsed stacks to a text file, see :func:`py_utils.io.save_txt`."""
+        from py_utils.io import save_txt
+
+        save_txt(self.collapsed() + "\n", path, append=False)
+
+    def top(self, n: int = 10) -> list[tuple[str, int]]:
+        """Frames in which most samples were taken (self time), with their number of samples."""
+        leaves: Counter[str] = Counter()
+        for stack, count in self._snapshot().items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(n)
+
+    def clear(self) -> None:
+        self.samples = Counter()
+        self.sampling_time_ns = 0
+
+
+def profile(interval_ms: float = 10.0, all_threads: bool = False, mode: str = "thread") -> Profiler:
+    """Profile a block of code.
+
+    Example:
+        >>> with profile(interval_ms=5) as profiler:
+        ...     squares = [value**2 for value in range(1_000_000)]
+        >>> profiler.save("batch.txt")  # flamegraph.pl batch.txt > batch.svg
+        >>> profiler.top(5)
+
+    Args:
+        interval_ms: sampling interval in milliseconds. Defaults to 10.0.
+        all_threads: sample all threads instead of the current one. Defaults to False.
+        mode: `thread` (wall-clock) or `signal` (CPU time, main thread only) timer. Defaults to "thread".
+
+    Returns:
+        Profiler: the profiler, to use as context manager
+    """
+    return Profiler(interval_ms=interval_ms, all_threads=all_threads, mode=mode)
+
+
+def profiled(
+    func: Callable = None,
+    *,
+    interval_ms: float = 10.0,
+    all_threads: bool = False,
+    mode: str = "thread",
+    output: Union[PathLike, None] = None,
+) -> Callable:
+    """Profile all calls of a function, accumulating the samples in `wrapper.profiler`.
+
+    Example:
+        >>> @profiled(interval_ms=5, output="normalize_stacks.txt")
+        ... def normalize(image): ...
+
+    Args:
+        func: function to decorate
+        interval_ms: sampling interval in milliseconds. Defaults to 10.0.
+        all_threads: sample all threads instead of the calling one. Defaults to False.
+        mode: `thread` (wall-clock) or `signal` (CPU time, main thread only) timer. Defaults to "thread".
+        output: file to which the accumulated collapsed stacks are saved after each call. Defaults to None.
+
+    Returns:
+        Callable: the wrapped function, with a `profiler` attribute
+    """
+    if func is None:
+        return partial(profiled, interval_ms=interval_ms, all_threads=all_threads, mode=mode, output=output)
+
+    profiler = Profiler(interval_ms=interval_ms, all_threads=all_threads, mode=mode)
+
+    def _finish():
+        profiler.stop()
+        if output is not None and not profiler._running:
+            profiler.save(output)
+
+    if inspect.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            profiler.start()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _finish()
+
+    else:
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler.start()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _finish()
+
+    wrapper.profiler = profiler
+    return wrapper
@@ -1,18 +1,62 @@
-import warnings
-from functools import wraps
+import sys
+
+from py_utils.decorators.base import BaseDecorator
+from py_utils.decorators.emission import _EMISSION, emit
 
 __all__ = [
     'deprecated',
 ]
 
-def deprecated(function):
+
+class deprecated(BaseDecorator):
     """
     This marks functions as deprecated.
-    A warning is emitted when the function is used.
+    A warning is emitted the first time the function is called from each
+    call site (code location), later calls from the same site only cost a
+    set lookup. The message is built once, when the function is decorated.
+    The warnings go through the emission backend, see `configure_emission`.
+
+    Parameters
+    ----------
+    reason : str, optional
+        Appended to the message, e.g. 'Use `load_json` instead.', by default None.
+    version : str, optional
+        Version since which the function is deprecated, by default None.
+    category : type of Warning, optional
+        Category of the warning, by default DeprecationWarning.
+
+    Examples
+    --------
+    >>> @deprecated('Use `load_json` instead.', version='0.3')
+    ... def read_json(path): ...
     """
-    @wraps(function)
-    def wrapper(*func_args, **func_kwargs):
-        warnings.warn("Call to deprecated function %s." % function.__name__,
-                      category=DeprecationWarning)
-        return function(*func_args, **func_kwargs)
-    return wrapper
\ No newline at end of file
+
+    def __init__(self, reason=None, *, version=None, category=DeprecationWarning):
+        super().__init__(reason, version=version, category=category)
+        self.reason = reason
+        self.version = version
+        self.category = category
+
+    def prepare(self):
+        message = 'Call to deprecated function %s' % self.func.__qualname__
+        if self.version is not None:
+            message += ' (deprecated since version %s)' % self.version
+        message += '.'
+        if self.reason:
+            message += ' ' + self.reason
+        self._message = message
+        # (code object, line number) of the call sites which already emitted the warning
+        self._call_sites = set()
+
+    def before(self, args, kwargs):
+        if not _EMISSION.enabled:
+            return self.SKIP
+        # frames: before < wrapper < call site
+        frame = sys._getframe(2)
+        call_site = (frame.f_code, frame.f_lineno)
+        if call_site in self._call_sites:
+            return self.SKIP
+        self._call_sites.add(call_site)
+        # stacklevel relative to emit: before < wrapper < call site
+        emit(self._message, category=self.category, stacklevel=3)
+        return self.SKIP
@@ -1,172 +1,97 @@
-import pytest
-
-from py_utils.enums import MyIntEnum, MyStrEnum
-
-
-###########
-# StrEnum #
-###########
-class StrEnum1(MyStrEnum):
-    FIZZ = "fizz"
-    BUZZ = "buzz"
+from enum import Enum, EnumMeta
+from types import MappingProxyType
+from typing import Any
+
+__all__ = [
+    "MyStrEnum",
+    "MyIntEnum",
+]
+
+
+class _LookupEnumMeta(EnumMeta):
+    """Metaclass precomputing per-class lookup tables, so membership tests and parsing are dict lookups."""
+
+    def __init__(cls, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # normalized value -> member, including aliases
+        cls._member_lookup = MappingProxyType(
+            {cls._normalize(member.value): member for member in cls.__members__.values()},
+        )
+        cls._value_tuple = tuple(member.value for member in cls)
+
+    def __contains__(cls, item: Any) -> bool:
+        """Whether `item` is a member or the value of a member, for str enums independent of the case."""
+        if isinstance(item, cls):
+            return True
+        try:
+            return cls._normalize(item) in cls._member_lookup
+        except TypeError:
+            # unhashable item
+            return False
 
     @property
-    def is_fizz(self) -> bool:
-        return self == StrEnum1.FIZZ
-
-    @property
-    def is_buzz(self) -> bool:
-        return self == StrEnum1.BUZZ
-
-
-class StrEnum2(MyStrEnum):
-    FIZZ = "fizz"
-
-
-@pytest.mark.parametrize(
-    ("str_", "enum", "is_contained"),
-    (
-        ("fizz", list(StrEnum1), True),
-        ("buzz", list(StrEnum1), True),
-        ("fizz", list(StrEnum2), True),
-        ("buzz", list(StrEnum2), False),
-    ),
-)
-def test_contains_str(str_, enum, is_contained):
-    """Test that enum's keys' string representation are contained in the Enum."""
-    # test with string values
-    assert (str_ in enum) == is_contained
-
-
-def test_contains_enum_key_str():
-    """Test that enum's keys are contained in the Enum."""
-    # test with enum values
-    assert StrEnum1.FIZZ in list(StrEnum1)
-
-
-def test_contains_enum_value_str():
-    """Test that enum's values are contained in the Enum."""
-    # test with enum values
-    assert StrEnum1.FIZZ.value in list(StrEnum1)
-
-
-def test_cross_access_str():
-    """Test that you can check if a key in one Enum is contained in another Enum."""
-    assert StrEnum1.FIZZ in list(StrEnum2)  # True
-    assert StrEnum2.FIZZ in list(StrEnum1)  # True
-
-
-@pytest.mark.parametrize(("key"), ("fizz", StrEnum1.FIZZ, StrEnum1.FIZZ.value))
-def test_contains_without_tolist_str(key):
-    """Test that you don't need to do `list(Enum)` to test if Enum.FIZZ in Enum."""
-    assert key in StrEnum1
-
-
-def test_properties():
-    _enum = StrEnum1("fizz")
-    print(_enum.is_fizz)  # True
-    print(_enum.is_buzz)  # False
-
-
-def test_from_str():
-    assert StrEnum1.from_str("fizz") == StrEnum1.FIZZ
-    assert StrEnum1.from_str("buzz") == StrEnum1.BUZZ
-
-
-def test_usage_as_dict_key_str():
-    """Test that the enum can be used as a key in a dictionary."""
-    # setup a dict with an enum as a key
-    a = {StrEnum1.FIZZ: "bla"}
-    # access the dict with the enum and its value
-    assert a["fizz"] == "bla"
-    assert a[StrEnum1.FIZZ] == "bla"
-
-
-@pytest.mark.parametrize(("key"), ("fizz", "Fizz", "FIZZ", "FiZz", "fiZZ"))
-def test_case_insensitivity_str(key):
-    assert key in StrEnum1
-    assert StrEnum1.from_str(key) in StrEnum1
-
-
-def test_values_str():
-    assert StrEnum1.values == ["fizz", "buzz"]
-    assert StrEnum2.values == ["fizz"]
-    with pytest.raises(AttributeError):
-        # method should not be available on instance
-        StrEnum1("fizz").values
-
-
-###########
-# IntEnum #
-###########
-class IntEnum1(MyIntEnum):
-    FIZZ = 0
-    BUZZ = 1
-
-    @property
-    def is_fizz(self) -> bool:
-        return self == IntEnum1.FIZZ
-
-    @property
-    def is_buzz(self) -> bool:
-        return self == IntEnum1.BUZZ
-
-
-class IntEnum2(MyIntEnum):
-    FIZZ = 0
-
-
-@pytest.mark.parametrize(
-    ("int_", "enum", "is_contained"),
-    (
-        (0, list(IntEnum1), True),
-        (1, list(IntEnum1), True),
-        (0, list(IntEnum2), True),
-        (1, list(IntEnum2), False),
-    ),
-)
-def test_contains_int(int_, enum, is_contained):
-    """Test that enum's keys' string representation are contained in the Enum."""
-    # test with string values
-    assert (int_ in enum) == is_contained
-
-
-def test_contains_enum_key_int():
-    """Test that enum's keys are contained in the Enum."""
-    # test with enum values
-    assert IntEnum1.FIZZ in list(IntEnum1)
-
-
-def test_contains_enum_value_int():
-    """Test that enum's values are contained in the Enum."""
-    # test with enum values
-    assert IntEnum1.FIZZ.value in list(IntEnum1)
-
-
-def test_cross_access_int():
-    """Test that you can check if a key in one Enum is contained in another Enum."""
-    assert IntEnum1.FIZZ in list(IntEnum2)  # True
-    assert IntEnum2.FIZZ in list(IntEnum1)  # True
-
-
-@pytest.mark.parametrize(("key"), (0, IntEnum1.FIZZ, IntEnum1.FIZZ.value))
-def test_contains_without_tolist_int(key):
-    """Test that you don't need to do `list(Enum)` to test if Enum.FIZZ in Enum."""
-    assert key in IntEnum1
-
-
-def test_usage_as_dict_key_int():
-    """Test that the enum can be used as a key in a dictionary."""
-    # setup a dict with an enum as a key
-    a = {IntEnum1.FIZZ: "bla"}
-    # access the dict with the enum and its value
-    assert a[0] == "bla"
-    assert a[IntEnum1.FIZZ] == "bla"
-
-
-def test_values_int():
-    assert IntEnum1.values == [0, 1]
-    assert IntEnum2.values == [0]
-    with pytest.raises(AttributeError):
-        # method should not be available on instance
-        IntEnum1(0).values
\ No newline at end of file
+    def values(cls) -> list[Any]:
+        """Values of the members, in definition order. Only available on the class, not on its members."""
+        return list(cls._value_tuple)
+
+
+class MyStrEnum(str, Enum, metaclass=_LookupEnumMeta):
+    """String enum whose members compare and hash like their value, with case-insensitive membership and parsing.
+
+    Example:
+        >>> class Mode(MyStrEnum):
+        ...     TRAIN = "train"
+        ...     TEST = "test"
+        >>> "Train" in Mode
+        True
+        >>> Mode.from_str("TEST")
+        <Mode.TEST: 'test'>
+        >>> Mode.values
+        ['train', 'test']
+    """
+
+    @staticmethod
+    def _normalize(value: Any) -> Any:
+        return value.casefold() if isinstance(value, str) else value
+
+    @classmethod
+    def from_str(cls, value: str) -> "MyStrEnum":
+        """Get the member with the value `value`, independent of the case.
+
+        Raises:
+            ValueError: if no member has the value `value`
+        """
+        try:
+            return cls._member_lookup[cls._normalize(value)]
+        except (KeyError, TypeError):
+            raise ValueError(f"{value!r} is not a valid {cls.__qualname__}, choose one of {cls.values}") from None
+
+
+class MyIntEnum(int, Enum, metaclass=_LookupEnumMeta):
+    """Integer enum whose members compare and hash like their value, with O(1) membership and parsing.
+
+    Example:
+        >>> class Axis(MyIntEnum):
+        ...     X = 0
+        ...     Y = 1
+        >>> 1 in Axis
+        True
+        >>> Axis.from_str("1")
+        <Axis.Y: 1>
+    """
+
+    @staticmethod
+    def _normalize(value: Any) -> Any:
+        return value
+
+    @classmethod
+    def from_str(cls, value: str) -> "MyIntEnum":
+        """Get the member with the value `int(value)`.
+
+        Raises:
+            ValueError: if `value` is not an integer or no member has it as value
+        """
+        try:
+            return cls._member_lookup[int(value)]
+        except (KeyError, TypeError):
+            raise ValueError(f"{value!r} is not a valid {cls.__qualname__}, choose one of {cls.values}") from None
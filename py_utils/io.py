@@ -1,10 +1,22 @@
+import asyncio
+import bz2
+import concurrent.futures
+import gzip
+import io
 import json
+import lzma
+import mmap
 import os
 import pickle
+import struct
+import threading
+from collections.abc import Callable, Iterable
+from functools import partial
 from pathlib import Path
-from typing import Any
+from typing import IO, Any, Union
 
-from python_utils.types import Pathlike
+from py_utils.imports import _module_available
+from py_utils.types import PathLike
 
 __all__ = [
     "read_txt",
@@ -13,27 +25,165 @@ __all__ = [
     "save_json",
     "load_pickle",
     "save_pickle",
+    "LoadManyError",
+    "load_many",
+    "load_many_json",
+    "load_many_pickle",
+    "async_read_txt",
+    "async_save_txt",
+    "async_load_json",
+    "async_save_json",
+    "async_load_pickle",
+    "async_save_pickle",
 ]
 
+_ZSTD_AVAILABLE = _module_available("zstandard")
+_LZ4_AVAILABLE = _module_available("lz4")
 
-def read_txt(file_path):
-    with open(file_path) as f:
+# file suffix -> compression codec
+_COMPRESSION_SUFFIXES = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".xz": "lzma",
+    ".lzma": "lzma",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+    ".lz4": "lz4",
+}
+# compression codec -> suffix appended when the codec is passed as argument
+_COMPRESSION_DEFAULT_SUFFIXES = {
+    "gzip": ".gz",
+    "bz2": ".bz2",
+    "lzma": ".xz",
+    "zstd": ".zst",
+    "lz4": ".lz4",
+}
+
+
+def _resolve_path(
+    path: PathLike,
+    suffixes: list[str],
+    compression: Union[str, None] = None,
+) -> tuple[Path, Union[str, None]]:
+    """Complete `path` with the first of `suffixes` and the suffix of the compression codec if they are missing.
+
+    Args:
+        path: path to file
+        suffixes: accepted file suffixes, the first one is appended if the path has none of them
+        compression: name of the compression codec. If None, it is inferred from the path's suffix.
+
+    Returns:
+        tuple[Path, Union[str, None]]: the completed path and the compression codec (None if uncompressed)
+    """
+    path = Path(path)
+    if compression is not None and compression not in _COMPRESSION_DEFAULT_SUFFIXES:
+        raise ValueError(
+            f"Unknown compression: {compression}. Choose one of {list(_COMPRESSION_DEFAULT_SUFFIXES)}.",
+        )
+
+    codec_suffix = ""
+    if path.suffix in _COMPRESSION_SUFFIXES and (
+        compression is None or _COMPRESSION_SUFFIXES[path.suffix] == compression
+    ):
+        compression = _COMPRESSION_SUFFIXES[path.suffix]
+        codec_suffix = path.suffix
+        path = path.with_suffix("")
+    elif compression is not None:
+        codec_suffix = _COMPRESSION_DEFAULT_SUFFIXES[compression]
+
+    if path.suffix not in suffixes:
+        path = Path(str(path) + suffixes[0])
+    return Path(str(path) + codec_suffix), compression
+
+
+def _open(
+    path: PathLike,
+    mode: str = "rb",
+    compression: Union[str, None] = None,
+    level: Union[int, None] = None,
+    threads: Union[int, None] = None,
+) -> IO:
+    """Open a file, streaming its content through a compression codec.
+
+    Args:
+        path: path to file
+        mode: mode as for :func:`open`. Text modes are supported for all codecs.
+        compression: name of the compression codec, one of `gzip`, `bz2`, `lzma`, `zstd` and `lz4`.
+            If None, the file is opened uncompressed. Defaults to None.
+        level: compression level, codec specific. If None, the codec's default is used. Defaults to None.
+        threads: number of compression threads. Only used by `zstd`, -1 uses all cores. Defaults to None.
+
+    Returns:
+        IO: file object
+    """
+    if compression is None:
+        return open(path, mode)
+
+    binary_mode = mode.replace("t", "").replace("b", "") + "b"
+    if compression == "gzip":
+        f = gzip.open(path, binary_mode, compresslevel=9 if level is None else level)
+    elif compression == "bz2":
+        f = bz2.open(path, binary_mode, compresslevel=9 if level is None else level)
+    elif compression == "lzma":
+        f = lzma.open(path, binary_mode, preset=level)
+    elif compression == "zstd":
+        if not _ZSTD_AVAILABLE:
+            raise ModuleNotFoundError("zstd compression requires `zstandard`. Install it with `pip install zstandard`.")
+        import zstandard
+
+        cctx = zstandard.ZstdCompressor(level=3 if level is None else level, threads=threads or 0)
+        f = zstandard.open(path, binary_mode, cctx=cctx)
+    elif compression == "lz4":
+        if not _LZ4_AVAILABLE:
+            raise ModuleNotFoundError("lz4 compression requires `lz4`. Install it with `pip install lz4`.")
+        import lz4.frame
+
+        f = lz4.frame.open(path, binary_mode, compression_level=level or 0)
+    else:
+        raise ValueError(f"Unknown compression: {compression}. Choose one of {list(_COMPRESSION_DEFAULT_SUFFIXES)}.")
+
+    if "b" not in mode:
+        return io.TextIOWrapper(f)
+    return f
+
+
+def read_txt(file_path: PathLike, compression: Union[str, None] = None) -> list[str]:
+    """Read txt file line by line.
+
+    Args:
+        file_path: path to txt file
+        compression: compression codec. If None, it is inferred from the file suffix. Defaults to None.
+
+    Returns:
+        list[str]: lines of the file
+    """
+    if compression is None:
+        compression = _COMPRESSION_SUFFIXES.get(Path(file_path).suffix)
+    with _open(file_path, "r", compression=compression) as f:
         content = f.read().splitlines()
     return content
 
 
-def save_txt(data: str, path: Path, append: bool = True):
+def save_txt(
+    data: str,
+    path: PathLike,
+    append: bool = True,
+    compression: Union[str, None] = None,
+    level: Union[int, None] = None,
+    threads: Union[int, None] = None,
+):
     """Save txt file.
 
     Args:
         data: data to save to txt
         path: path to txt file
         append (bool): whether to append to existing file. Defaults to True.
+        compression: compression codec (`gzip`, `bz2`, `lzma`, `zstd` or `lz4`). If None, it is inferred from the
+            path's suffix (e.g. `.txt.gz`). Defaults to None.
+        level: compression level. Defaults to None.
+        threads: number of compression threads, only used by `zstd`. Defaults to None.
     """
-    if isinstance(path, str):
-        path = Path(path)
-    if not (".txt" == path.suffix):
-        path = str(path) + ".txt"
+    path, compression = _resolve_path(path, [".txt"], compression)
 
     # In case directory given is the current one, should pop an error
     try:
@@ -42,50 +192,52 @@ def save_txt(data: str, path: Path, append: bool = True):
         pass
 
     mode = "a" if append else "w"
-    with open(path, mode) as f:
+    with _open(path, mode, compression=compression, level=level, threads=threads) as f:
         f.write(str(data))
 
 
-def load_json(path: Pathlike, **kwargs: Any) -> Any:
+def load_json(path: PathLike, compression: Union[str, None] = None, **kwargs: Any) -> Any:
     """Load json file.
 
     Args:
         path: path to json file
+        compression: compression codec. If None, it is inferred from the path's suffix. Defaults to None.
         **kwargs: keyword arguments passed to :func:`json.load`
 
     Returns:
         Any: json data
     """
-    if isinstance(path, str):
-        path = Path(path)
-    if not (".json" == path.suffix):
-        path = str(path) + ".json"
+    path, compression = _resolve_path(path, [".json"], compression)
 
-    with open(path, "rb") as f:
+    with _open(path, "rb", compression=compression) as f:
         data = json.load(f, **kwargs)
     return data
 
 
 def save_json(
     data: Any,
-    path: Pathlike,
+    path: PathLike,
     indent: int = 4,
     msg: str = None,
     log: bool = True,
+    compression: Union[str, None] = None,
+    level: Union[int, None] = None,
+    threads: Union[int, None] = None,
     **kwargs: Any,
 ) -> None:
-    """Load json file.
+    """Save json file.
 
     Args:
         data: data to save to json
         path: path to json file
         indent: passed to json.dump
+        compression: compression codec (`gzip`, `bz2`, `lzma`, `zstd` or `lz4`). If None, it is inferred from the
+            path's suffix (e.g. `.json.zst`). Defaults to None.
+        level: compression level. Defaults to None.
+        threads: number of compression threads, only used by `zstd`. Defaults to None.
         **kwargs: keyword arguments passed to :func:`json.dump`
     """
-    if isinstance(path, str):
-        path = Path(path)
-    if not (".json" == path.suffix):
-        path = Path(str(path) + ".json")
+    path, compression = _resolve_path(path, [".json"], compression)
 
     # In case directory given is the current one, should pop an error
     try:
@@ -93,7 +245,7 @@ def save_json(
     except Exception:
         pass
 
-    with open(path, "w") as f:
+    with _open(path, "w", compression=compression, level=level, threads=threads) as f:
         json.dump(data, f, indent=indent, **kwargs)
 
     if log:
@@ -102,38 +254,128 @@ def save_json(
         print(msg)
 
 
-def load_pickle(path: Path, **kwargs) -> Any:
+# Layout of out-of-band pickle files:
+#   magic | header (pickle length, number of buffers) | buffer table (offset, length) * n | pickle stream | buffers
+# Every buffer starts on a `_OOB_ALIGNMENT` boundary so it can be mapped as a zero-copy view.
+_OOB_MAGIC = b"PYUTOOB\x00"
+_OOB_HEADER = struct.Struct("<QQ")
+_OOB_ENTRY = struct.Struct("<QQ")
+_OOB_ALIGNMENT = 64
+
+
+def _align(offset: int, alignment: int = _OOB_ALIGNMENT) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _dump_out_of_band(data: Any, f, **kwargs: Any) -> None:
+    """Pickle `data` with protocol 5 and write its buffers as separate aligned blocks."""
+    buffers: list[pickle.PickleBuffer] = []
+    stream = pickle.dumps(data, protocol=5, buffer_callback=buffers.append, **kwargs)
+    raws = [buffer.raw() for buffer in buffers]
+
+    offset = len(_OOB_MAGIC) + _OOB_HEADER.size + _OOB_ENTRY.size * len(raws) + len(stream)
+    table = []
+    for raw in raws:
+        offset = _align(offset)
+        table.append((offset, raw.nbytes))
+        offset += raw.nbytes
+
+    f.write(_OOB_MAGIC)
+    f.write(_OOB_HEADER.pack(len(stream), len(raws)))
+    for entry in table:
+        f.write(_OOB_ENTRY.pack(*entry))
+    f.write(stream)
+    position = len(_OOB_MAGIC) + _OOB_HEADER.size + _OOB_ENTRY.size * len(raws) + len(stream)
+    for (start, _), raw in zip(table, raws):
+        f.write(b"\x00" * (start - position))
+        # memoryviews are written directly, without an intermediate bytes copy
+        f.write(raw)
+        position = start + raw.nbytes
+
+
+def _load_out_of_band(f, use_mmap: bool = True, **kwargs: Any) -> Any:
+    """Load a file written by :func:`_dump_out_of_band`.
+
+    With `use_mmap` the buffers are copy-on-write views into a memory map of the file, so array data is only paged
+    in when accessed and never duplicated in memory.
+    """
+    if use_mmap:
+        content = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
+    else:
+        # read into a preallocated buffer, `bytearray(f.read())` would hold the file twice
+        content = memoryview(bytearray(os.fstat(f.fileno()).st_size))
+        f.seek(0)
+        f.readinto(content)
+
+    position = len(_OOB_MAGIC)
+    stream_length, n_buffers = _OOB_HEADER.unpack_from(content, position)
+    position += _OOB_HEADER.size
+    buffers = []
+    for _ in range(n_buffers):
+        start, length = _OOB_ENTRY.unpack_from(content, position)
+        buffers.append(content[start : start + length])
+        position += _OOB_ENTRY.size
+    return pickle.loads(content[position : position + stream_length], buffers=buffers, **kwargs)
+
+
+def load_pickle(
+    path: PathLike,
+    use_mmap: bool = True,
+    compression: Union[str, None] = None,
+    **kwargs,
+) -> Any:
     """Load pickle file.
 
+    Files written with ``save_pickle(..., out_of_band=True)`` are detected automatically.
+
     Args:
         path: path to pickle file
+        use_mmap (bool): whether to map the buffers of out-of-band pickle files into memory instead of reading them.
+            Has no effect on regular pickle files. Defaults to True.
+        compression: compression codec. If None, it is inferred from the path's suffix. Defaults to None.
         **kwargs: keyword arguments passed to :func:`pickle.load`
 
     Returns:
-        Any: json data
+        Any: unpickled data
     """
-    if isinstance(path, str):
-        path = Path(path)
-    if not (path.suffix in [".pickle", ".pkl"]):
-        path = Path(str(path) + ".pkl")
+    path, compression = _resolve_path(path, [".pkl", ".pickle"], compression)
 
-    with open(path, "rb") as f:
+    with _open(path, "rb", compression=compression) as f:
+        if compression is None and f.read(len(_OOB_MAGIC)) == _OOB_MAGIC:
+            return _load_out_of_band(f, use_mmap=use_mmap, **kwargs)
+        f.seek(0)
         data = pickle.load(f, **kwargs)
     return data
 
 
-def save_pickle(data: Any, path: Pathlike, **kwargs):
-    """Load pickle file.
+def save_pickle(
+    data: Any,
+    path: PathLike,
+    protocol: int = pickle.HIGHEST_PROTOCOL,
+    out_of_band: bool = False,
+    compression: Union[str, None] = None,
+    level: Union[int, None] = None,
+    threads: Union[int, None] = None,
+    **kwargs,
+) -> None:
+    """Save pickle file.
 
     Args:
         data: data to save to pickle
         path: path to pickle file
+        protocol (int): pickle protocol. Defaults to :data:`pickle.HIGHEST_PROTOCOL`.
+        out_of_band (bool): whether to write buffers supporting protocol 5 (e.g. numpy arrays) as separate aligned
+            blocks after the pickle stream. :func:`load_pickle` then maps them back as zero-copy views.
+            Defaults to False.
+        compression: compression codec (`gzip`, `bz2`, `lzma`, `zstd` or `lz4`). If None, it is inferred from the
+            path's suffix (e.g. `.pkl.lz4`). Defaults to None.
+        level: compression level. Defaults to None.
+        threads: number of compression threads, only used by `zstd`. Defaults to None.
         **kwargs: keyword arguments passed to :func:`pickle.dump`
     """
-    if isinstance(path, str):
-        path = Path(path)
-    if not (path.suffix in [".pickle", ".pkl"]):
-        path = str(path) + ".pkl"
+    path, compression = _resolve_path(path, [".pkl", ".pickle"], compression)
+    if out_of_band and compression is not None:
+        raise ValueError("Out-of-band buffers are memory mapped and can not be compressed.")
 
     # In case directory given is the current one, should pop an error
     try:
@@ -141,6 +383,206 @@ def save_pickle(data: Any, path: Pathlike, **kwargs):
     except Exception:
         pass
 
-    with open(str(path), "wb") as f:
-        data = pickle.dump(data, f, **kwargs)
-    return data
+    with _open(path, "wb", compression=compression, level=level, threads=threads) as f:
+        if out_of_band:
+            _dump_out_of_band(data, f, **kwargs)
+        else:
+            pickle.dump(data, f, protocol=protocol, **kwargs)
+
+
+class LoadManyError(Exception):
+    """Raised by :func:`load_many` when some files could not be loaded.
+
+    Attributes:
+        failures: mapping of the paths which failed to the raised exception
+        results: results of all files, the failed ones hold their exception
+    """
+
+    def __init__(self, failures: dict[PathLike, BaseException], results: Union[list, dict]) -> None:
+        self.failures = failures
+        self.results = results
+        listing = "\n".join(f"\t{path}: {exc!r}" for path, exc in failures.items())
+        super().__init__(f"{len(failures)} file(s) could not be loaded:\n{listing}")
+
+
+def load_many(
+    paths: Iterable[PathLike],
+    loader: Callable = load_json,
+    max_workers: int = 16,
+    max_in_flight: Union[int, None] = None,
+    as_dict: bool = False,
+    errors: str = "raise",
+    **kwargs: Any,
+) -> Union[list[Any], dict[PathLike, Any]]:
+    """Load many files concurrently on a thread pool.
+
+    Per-file latency (e.g. on network filesystems) overlaps instead of adding up, while at most `max_in_flight`
+    files are loaded or queued at any time, so `paths` may be a lazy iterable.
+
+    Example:
+        >>> results = load_many(Path("results").glob("*.json"), as_dict=True)
+        >>> paths = [Path("cases") / f"case_{idx}.pkl" for idx in range(100)]
+        >>> results = load_many(paths, loader=load_pickle, errors="return")
+
+    Args:
+        paths: paths of the files to load
+        loader: function loading a single file. Defaults to :func:`load_json`.
+        max_workers: number of loading threads. Defaults to 16.
+        max_in_flight: maximal number of submitted but unfinished loads. Defaults to twice `max_workers`.
+        as_dict: whether to return a dict keyed by path instead of a list. A path given several times is loaded
+            each time but appears once in the dict. Defaults to False.
+        errors: `raise` to raise a :class:`LoadManyError` listing every failed file once all files are processed,
+            `return` to put the raised exception in place of the result. Defaults to `raise`.
+        **kwargs: keyword arguments passed to `loader`
+
+    Returns:
+        Union[list[Any], dict[PathLike, Any]]: loaded data, in the order of `paths`
+    """
+    if errors not in ("raise", "return"):
+        raise ValueError(f"`errors` must be one of ['raise', 'return'], found: {errors}")
+    max_in_flight = max_in_flight or 2 * max_workers
+
+    ordered_paths: list[PathLike] = []
+    results: list[Any] = []
+    failures: dict[PathLike, BaseException] = {}
+
+    def collect(done: set[concurrent.futures.Future]) -> None:
+        for future in done:
+            idx = in_flight.pop(future)
+            try:
+                results[idx] = future.result()
+            except Exception as exc:
+                results[idx] = exc
+                failures[ordered_paths[idx]] = exc
+
+    in_flight: dict[concurrent.futures.Future, int] = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="load_many") as executor:
+        for idx, path in enumerate(paths):
+            if len(in_flight) >= max_in_flight:
+                done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                collect(done)
+            ordered_paths.append(path)
+            results.append(None)
+            in_flight[executor.submit(loader, path, **kwargs)] = idx
+        collect(concurrent.futures.wait(in_flight).done)
+
+    if as_dict:
+        results = dict(zip(ordered_paths, results))
+    if failures and errors == "raise":
+        raise LoadManyError(failures, results)
+    return results
+
+
+def load_many_json(paths: Iterable[PathLike], **kwargs: Any) -> Union[list[Any], dict[PathLike, Any]]:
+    """Load many json files concurrently, see :func:`load_many`."""
+    return load_many(paths, loader=load_json, **kwargs)
+
+
+def load_many_pickle(paths: Iterable[PathLike], **kwargs: Any) -> Union[list[Any], dict[PathLike, Any]]:
+    """Load many pickle files concurrently, see :func:`load_many`."""
+    return load_many(paths, loader=load_pickle, **kwargs)
+
+
+# Maximal number of threads performing the blocking work of the `async_*` functions
+ASYNC_IO_MAX_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+_async_io_executor: Union[concurrent.futures.ThreadPoolExecutor, None] = None
+_async_io_executor_lock = threading.Lock()
+
+
+def _get_async_io_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _async_io_executor
+    if _async_io_executor is None:
+        with _async_io_executor_lock:
+            if _async_io_executor is None:
+                _async_io_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=ASYNC_IO_MAX_WORKERS,
+                    thread_name_prefix="py_utils.io",
+                )
+    return _async_io_executor
+
+
+class _DirectoryWriteBatcher:
+    """Groups writes to the same directory into a single job of the async I/O thread pool.
+
+    Writes submitted while a job for their directory is still waiting in the pool's queue are appended to that job
+    instead of occupying a thread of their own, so a burst of small writes costs one thread hop.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: dict[str, list[tuple[Callable, concurrent.futures.Future]]] = {}
+
+    def submit(self, directory: str, fn: Callable) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        with self._lock:
+            batch = self._pending.get(directory)
+            if batch is None:
+                batch = self._pending[directory] = []
+                _get_async_io_executor().submit(self._run, directory)
+            batch.append((fn, future))
+        return future
+
+    def _run(self, directory: str) -> None:
+        with self._lock:
+            batch = self._pending.pop(directory)
+        for fn, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn())
+            except BaseException as exc:
+                future.set_exception(exc)
+
+
+_write_batcher = _DirectoryWriteBatcher()
+
+
+async def _run_read(fn: Callable) -> Any:
+    return await asyncio.get_running_loop().run_in_executor(_get_async_io_executor(), fn)
+
+
+async def _run_write(path: PathLike, fn: Callable) -> Any:
+    return await asyncio.wrap_future(_write_batcher.submit(os.path.dirname(os.path.abspath(path)), fn))
+
+
+async def async_read_txt(file_path: PathLike, **kwargs: Any) -> list[str]:
+    """Asynchronous version of :func:`read_txt`, run on the async I/O thread pool."""
+    return await _run_read(partial(read_txt, file_path, **kwargs))
+
+
+async def async_save_txt(data: str, path: PathLike, **kwargs: Any) -> None:
+    """Asynchronous version of :func:`save_txt`.
+
+    Writes are batched per directory on the async I/O thread pool. `data` must not be modified before the call
+    returns.
+    """
+    return await _run_write(path, partial(save_txt, data, path, **kwargs))
+
+
+async def async_load_json(path: PathLike, **kwargs: Any) -> Any:
+    """Asynchronous version of :func:`load_json`, run on the async I/O thread pool."""
+    return await _run_read(partial(load_json, path, **kwargs))
+
+
+async def async_save_json(data: Any, path: PathLike, **kwargs: Any) -> None:
+    """Asynchronous version of :func:`save_json`.
+
+    Serialization and writing are batched per directory on the async I/O thread pool. `data` must not be modified
+    before the call returns.
+    """
+    return await _run_write(path, partial(save_json, data, path, **kwargs))
+
+
+async def async_load_pickle(path: PathLike, **kwargs: Any) -> Any:
+    """Asynchronous version of :func:`load_pickle`, run on the async I/O thread pool."""
+    return await _run_read(partial(load_pickle, path, **kwargs))
+
+
+async def async_save_pickle(data: Any, path: PathLike, **kwargs: Any) -> None:
+    """Asynchronous version of :func:`save_pickle`.
+
+    Serialization and writing are batched per directory on the async I/O thread pool. `data` must not be modified
+    before the call returns.
+    """
+    return await _run_write(path, partial(save_pickle, data, path, **kwargs))
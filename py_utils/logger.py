@@ -1,28 +1,189 @@
-import os
-import functools
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+from typing import Any, Union
+
+from py_utils.types import PathLike
+
+__all__ = [
+    "JsonFormatter",
+    "create_logger",
+]
 
-def create_logger(filepath, name='logger', **kwargs):
+DEFAULT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one json object per line, for log aggregation tools.
+
+    Args:
+        fields: record attributes written in addition to the time, level, logger name and message. Defaults to
+            `("module", "funcName", "lineno", "process", "threadName")`.
     """
-    Creates a logging object and returns it
+
+    def __init__(self, fields: tuple[str, ...] = ("module", "funcName", "lineno", "process", "threadName")) -> None:
+        super().__init__()
+        self.fields = fields
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "name": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.fields:
+            data[field] = getattr(record, field, None)
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # wait for space instead of failing when the queue is full
+        self.queue.put(self._sentinel)
+
+
+class _BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler whose bounded queue either drops records or blocks the caller when it is full.
+
+    The records are written by a :class:`logging.handlers.QueueListener` thread, which is stopped, after writing the
+    queued records, when the handler is closed.
     """
-    fmt = kwargs.get('format', '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def __init__(self, log_queue: queue.Queue, on_full: str, listener_handler: logging.Handler) -> None:
+        super().__init__(log_queue)
+        self.on_full = on_full
+        self.dropped = 0
+        # producer threads drop records concurrently, `+=` alone would lose counts
+        self._dropped_lock = threading.Lock()
+        self.listener = _QueueListener(log_queue, listener_handler, respect_handler_level=True)
+        self.listener.start()
+        self._listening = True
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.on_full == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _stop_listener(self) -> None:
+        """Write the queued records and stop the listener thread, once."""
+        with self._dropped_lock:
+            listening, self._listening = self._listening, False
+        if listening:
+            self.listener.stop()
+
+    def close(self) -> None:
+        self._stop_listener()
+        for handler in self.listener.handlers:
+            handler.close()
+        super().close()
+
+
+def _file_handler(
+    filepath: PathLike,
+    rotation: Union[str, None],
+    max_bytes: int,
+    when: str,
+    backup_count: int,
+) -> logging.FileHandler:
+    if rotation is None:
+        return logging.FileHandler(filepath)
+    if rotation == "size":
+        return logging.handlers.RotatingFileHandler(filepath, maxBytes=max_bytes, backupCount=backup_count)
+    if rotation == "time":
+        return logging.handlers.TimedRotatingFileHandler(filepath, when=when, backupCount=backup_count)
+    raise ValueError(f"Unknown rotation: {rotation}, expected None, 'size' or 'time'")
+
+
+def create_logger(
+    filepath: PathLike,
+    name: str = "logger",
+    level: Union[int, str] = logging.INFO,
+    async_mode: bool = False,
+    queue_size: int = 10_000,
+    on_full: str = "drop",
+    rotation: Union[str, None] = None,
+    max_bytes: int = 10 * 1024**2,
+    when: str = "midnight",
+    backup_count: int = 5,
+    json_format: bool = False,
+    **kwargs: Any,
+) -> logging.Logger:
+    """Create a logger writing to a file and return it.
+
+    The function is idempotent: calling it again for the same logger and file returns the logger without adding
+    another handler.
+
+    In async mode, log calls only put the record in a bounded queue and a background thread does the file I/O, so
+    logging threads never wait on slow (e.g. network) file systems. When the queue is full, records are dropped
+    (`on_full="drop"`, counted in `handler.dropped`) or the caller waits for space (`on_full="block"`). The queue
+    is flushed at interpreter exit.
+
+    Example:
+        >>> logger = create_logger("logs/train.log", "train", async_mode=True, rotation="size", json_format=True)
+
+    Args:
+        filepath: path to the log file
+        name: name of the logger. Defaults to "logger".
+        level: level of the logger. Defaults to logging.INFO.
+        async_mode: write the records from a background thread. Defaults to False.
+        queue_size: maximal number of queued records in async mode. Defaults to 10_000.
+        on_full: `drop` or `block`, what to do with a record when the queue is full. Defaults to "drop".
+        rotation: None, `size` (rotate when the file exceeds `max_bytes`) or `time` (rotate at intervals given by
+            `when`). Defaults to None.
+        max_bytes: maximal size of a log file with size-based rotation. Defaults to 10 MiB.
+        when: interval of time-based rotation, see :class:`logging.handlers.TimedRotatingFileHandler`. Defaults to
+            "midnight".
+        backup_count: number of rotated files to keep. Defaults to 5.
+        json_format: write one json object per record, see :class:`JsonFormatter`. Defaults to False.
+        **kwargs: `format`, the format string of the records. Defaults to
+            `"%(asctime)s - %(name)s - %(levelname)s - %(message)s"`.
+
+    Returns:
+        logging.Logger: the logger
+    """
+    if on_full not in ("drop", "block"):
+        raise ValueError(f"Unknown on_full policy: {on_full}, expected 'drop' or 'block'")
+    fmt = kwargs.get("format", DEFAULT_FORMAT)
+    filepath = os.path.abspath(filepath)
 
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
+    logger.setLevel(level)
+    for handler in logger.handlers:
+        if getattr(handler, "_py_utils_filepath", None) == filepath:
+            return logger
 
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    dirname = os.path.dirname(filepath)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
 
     # create the logging file handler
-    fh = logging.FileHandler(filepath)
-    formatter = logging.Formatter(fmt)
-    fh.setFormatter(formatter)
+    handler = _file_handler(filepath, rotation, max_bytes, when, backup_count)
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(fmt))
+    if async_mode:
+        handler = _BoundedQueueHandler(queue.Queue(maxsize=queue_size), on_full, handler)
+        atexit.register(handler.close)
+    handler._py_utils_filepath = filepath
 
     # add handler to logger object
-    logger.addHandler(fh)
+    logger.addHandler(handler)
     return logger
 
+
 if __name__ == "__main__":
-    loggername = os.path.basename(__file__).rsplit('.', 1)[0]
-    loggerfile = os.path.join(os.path.dirname(__file__), 'logs',  loggername + '.log')
-    logger = create_logger(loggerfile, loggername)
\ No newline at end of file
+    loggername = os.path.basename(__file__).rsplit(".", 1)[0]
+    loggerfile = os.path.join(os.path.dirname(__file__), "logs", loggername + ".log")
+    logger = create_logger(loggerfile, loggername)
@@ -1,20 +1,92 @@
+import functools
+import heapq
 import itertools
+import numbers
+import operator
+import os
+import pickle
+import sys
+import tempfile
 from collections import defaultdict
-from collections.abc import Mapping, MutableMapping
-from typing import Any
+from collections.abc import Callable, Iterable, Iterator, Mapping, MutableMapping
+from typing import TYPE_CHECKING, Any, Union
+
+from py_utils.imports import _module_available
+
+if TYPE_CHECKING:
+    import numpy as np
 
 __all__ = [
+    "iter_flatten_mapping",
     "flatten_mapping",
     "flatten_mapping_to_top_level",
+    "unflatten_mapping",
+    "FlatView",
+    "deep_merge",
+    "diff_mappings",
+    "records_to_columns",
+    "columns_to_records",
     "stringify_nested_mapping",
+    "iter_merge_dicts_on_key",
     "merge_lists_of_dicts_on_key",
 ]
 
+_NUMPY_AVAILABLE = _module_available("numpy")
+
+# Types which are never nested mappings. Checking them first avoids the slow `isinstance` check against the ABC.
+_LEAF_TYPES = frozenset((int, float, complex, bool, str, bytes, type(None), list, tuple))
+# Placeholder of missing fields in the columns built by `records_to_columns`
+_MISSING = object()
+
+
+def _is_nested(item: Any) -> bool:
+    item_type = type(item)
+    return item_type is dict or (item_type not in _LEAF_TYPES and isinstance(item, MutableMapping))
+
+
+def iter_flatten_mapping(
+    nested_mapping: Mapping,
+    sep: str = ".",
+    tuple_keys: bool = False,
+) -> Iterator[tuple[Union[str, tuple], Any]]:
+    """Lazily yield the `(flat_key, value)` pairs of :func:`flatten_mapping`.
+
+    The nested mapping is walked depth-first with an explicit stack, so the nesting depth is not limited by the
+    recursion limit. The key prefix of each nesting level is built once and shared by all its values.
+
+    Example:
+        >>> list(iter_flatten_mapping({'top': {'low': 1}, 'other': 2}))
+        [('top.low', 1), ('other', 2)]
+        >>> list(iter_flatten_mapping({'top': {'low': 1}, 'other': 2}, tuple_keys=True))
+        [(('top', 'low'), 1), (('other',), 2)]
+
+    Args:
+        nested_mapping (Mapping): Mapping with nested mappings
+        sep (str, optional): Character used to separate nesting levels. Defaults to ".".
+        tuple_keys (bool, optional): Yield the tuple of original keys instead of joining their string
+            representations with `sep`. Defaults to False.
+
+    Yields:
+        tuple[Union[str, tuple], Any]: flat key and value
+    """
+    stack = [((() if tuple_keys else ""), iter(nested_mapping.items()))]
+    while stack:
+        prefix, items = stack[-1]
+        for key, item in items:
+            item_type = type(item)
+            if item_type is dict or (item_type not in _LEAF_TYPES and isinstance(item, MutableMapping)):
+                stack.append(((prefix + (key,) if tuple_keys else f"{prefix}{key!s}{sep}"), iter(item.items())))
+                break
+            yield (prefix + (key,) if tuple_keys else f"{prefix}{key!s}"), item
+        else:
+            stack.pop()
+
 
 def flatten_mapping(
     nested_mapping: Mapping,
     sep: str = ".",
-) -> Mapping[str, Any]:
+    tuple_keys: bool = False,
+) -> Mapping[Union[str, tuple], Any]:
     """Flatten nested mapping to format: toplevel + sep + intermediate + sep + lowestkey: value.
 
     Example:
@@ -32,18 +104,13 @@ def flatten_mapping(
     Args:
         nested_mapping (Mapping): Mapping with nested mappings
         sep (str, optional): Character used to separate nesting levels. Defaults to ".".
+        tuple_keys (bool, optional): Use the tuple of original keys as flat keys instead of joining their string
+            representations with `sep`. Defaults to False.
 
     Returns:
-        Mapping[str, Any]: Flatten mapping
+        Mapping[Union[str, tuple], Any]: Flatten mapping
     """
-    _mapping = {}
-    for key, item in nested_mapping.items():
-        if isinstance(item, MutableMapping):
-            for _key, _item in flatten_mapping(item, sep=sep).items():
-                _mapping[str(key) + sep + str(_key)] = _item
-        else:
-            _mapping[str(key)] = item
-    return _mapping
+    return dict(iter_flatten_mapping(nested_mapping, sep=sep, tuple_keys=tuple_keys))
 
 
 def flatten_mapping_to_top_level(
@@ -69,62 +136,694 @@ def flatten_mapping_to_top_level(
     Returns:
         Mapping[str, Any]: Flatten mapping
     """
-    _mapping = {}
-    for key, item in nested_mapping.items():
-        if isinstance(item, MutableMapping):
-            for _key, _item in flatten_mapping_to_top_level(item).items():
-                _mapping[str(_key)] = _item
+    return {str(path[-1]): item for path, item in iter_flatten_mapping(nested_mapping, tuple_keys=True)}
+
+
+def unflatten_mapping(
+    flat_mapping: Mapping[Union[str, tuple], Any],
+    sep: str = ".",
+) -> dict[str, Any]:
+    """Rebuild the nested mapping from a mapping flattened with :func:`flatten_mapping`.
+
+    Example:
+        >>> unflatten_mapping({'top.intermediate1.low': 1, 'top.intermediate2.low': 2})
+        {'top': {'intermediate1': {'low': 1}, 'intermediate2': {'low': 2}}}
+
+    Args:
+        flat_mapping (Mapping[Union[str, tuple], Any]): Flat mapping, with string keys joined with `sep` or tuple keys
+        sep (str, optional): Character used to separate nesting levels. Defaults to ".".
+
+    Raises:
+        ValueError: if a key is both a value and the prefix of other keys, e.g. `a` and `a.b`
+
+    Returns:
+        dict[str, Any]: Nested mapping
+    """
+    nested: dict[str, Any] = {}
+    for flat_key, item in flat_mapping.items():
+        *parents, key = flat_key if isinstance(flat_key, tuple) else flat_key.split(sep)
+        node = nested
+        for parent in parents:
+            node = node.setdefault(parent, {})
+            if not isinstance(node, dict):
+                raise ValueError(f"Key {flat_key!r} conflicts with the value stored at {parent!r}.")
+        if isinstance(node.get(key), dict):
+            raise ValueError(f"Key {flat_key!r} conflicts with nested keys starting with it.")
+        node[key] = item
+    return nested
+
+
+class FlatView(Mapping):
+    """Read-only view of a nested mapping with the flat keys of :func:`flatten_mapping`.
+
+    Nothing is copied: lookups walk the nested mapping along the key's parts, iteration lazily walks the whole
+    nested mapping, and changes to the nested mapping are visible in the view. Every iterated key can be looked up,
+    also when keys of the nested mapping contain `sep`.
+
+    Example:
+        >>> config = {'model': {'backbone': {'depth': 50}}, 'lr': 0.1}
+        >>> view = FlatView(config)
+        >>> view['model.backbone.depth']
+        50
+        >>> list(view)
+        ['model.backbone.depth', 'lr']
+
+    Args:
+        nested_mapping (Mapping): Mapping with nested mappings
+        sep (str, optional): Character used to separate nesting levels. Defaults to ".".
+    """
+
+    def __init__(self, nested_mapping: Mapping, sep: str = ".") -> None:
+        self.nested_mapping = nested_mapping
+        self.sep = sep
+
+    def __getitem__(self, flat_key: Union[str, tuple]) -> Any:
+        if isinstance(flat_key, tuple):
+            node = self.nested_mapping
+            for part in flat_key:
+                if not _is_nested(node):
+                    raise KeyError(flat_key)
+                node = self._child(node, part)
+        elif isinstance(flat_key, str):
+            node = self._lookup(self.nested_mapping, flat_key)
+        else:
+            raise KeyError(flat_key)
+        if node is _MISSING or _is_nested(node):
+            raise KeyError(flat_key)
+        return node
+
+    def _lookup(self, node: Any, flat_key: str) -> Any:
+        """Value at the string `flat_key` below `node`, `_MISSING` if there is none.
+
+        Keys of the nested mapping can contain `sep`, so each prefix of `flat_key` ending before a `sep` is tried.
+        """
+        if not _is_nested(node):
+            return _MISSING
+        start = 0
+        while True:
+            end = flat_key.find(self.sep, start)
+            part = flat_key if end == -1 else flat_key[:end]
+            child = self._child(node, part)
+            if child is not _MISSING:
+                if end == -1:
+                    return child
+                found = self._lookup(child, flat_key[end + len(self.sep) :])
+                if found is not _MISSING:
+                    return found
+            if end == -1:
+                return _MISSING
+            start = end + len(self.sep)
+
+    @staticmethod
+    def _child(node: Mapping, part: str) -> Any:
+        try:
+            return node[part]
+        except (KeyError, TypeError):
+            # flat keys hold the string representation of the original keys, e.g. of integers
+            for key, item in node.items():
+                if str(key) == part:
+                    return item
+        return _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        for flat_key, _ in iter_flatten_mapping(self.nested_mapping, sep=self.sep):
+            yield flat_key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in iter_flatten_mapping(self.nested_mapping, sep=self.sep))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.nested_mapping!r}, sep={self.sep!r})"
+
+
+def _merge_lists(
+    base: list,
+    override: list,
+    list_strategy: str,
+    list_key: Union[str, None],
+) -> list:
+    if list_strategy == "replace":
+        return override
+    if list_strategy == "extend":
+        return base + override
+    # merge_by_key: items sharing the value of `list_key` are deep merged, the others are appended in order
+    merged: dict[Any, Any] = {}
+    unkeyed = []
+    for item in itertools.chain(base, override):
+        if not (_is_nested(item) and list_key in item):
+            unkeyed.append(item)
+            continue
+        value = item[list_key]
+        if value in merged:
+            merged[value] = _deep_merge(merged[value], item, list_strategy, list_key)
+        else:
+            merged[value] = item
+    return list(merged.values()) + unkeyed
+
+
+def _deep_merge(
+    base: Mapping,
+    override: Mapping,
+    list_strategy: str,
+    list_key: Union[str, None],
+) -> dict:
+    merged = dict(base)
+    for key, item in override.items():
+        if key not in merged:
+            merged[key] = item
+            continue
+        base_item = merged[key]
+        if base_item is item:
+            continue
+        if _is_nested(base_item) and _is_nested(item):
+            merged[key] = _deep_merge(base_item, item, list_strategy, list_key)
+        elif isinstance(base_item, list) and isinstance(item, list):
+            merged[key] = _merge_lists(base_item, item, list_strategy, list_key)
         else:
-            _mapping[str(key)] = item
-    return _mapping
+            merged[key] = item
+    return merged
+
+
+def deep_merge(
+    *mappings: Mapping,
+    list_strategy: str = "replace",
+    list_key: Union[str, None] = None,
+) -> dict:
+    """Deep merge nested mappings, later mappings taking precedence.
+
+    The inputs are not modified. Only the mappings along the merged keys are copied, subtrees present in a single
+    input are shared with the result, so merging a small override into a large mapping is cheap.
+
+    Example:
+        >>> defaults = {'model': {'depth': 50, 'dropout': 0.1}, 'tags': ['a']}
+        >>> experiment = {'model': {'depth': 101}, 'tags': ['b']}
+        >>> deep_merge(defaults, experiment)
+        {'model': {'depth': 101, 'dropout': 0.1}, 'tags': ['b']}
+        >>> deep_merge(defaults, experiment, list_strategy='extend')
+        {'model': {'depth': 101, 'dropout': 0.1}, 'tags': ['a', 'b']}
+
+    Args:
+        *mappings (Mapping): Mappings to merge, e.g. defaults, site and experiment config
+        list_strategy (str, optional): How lists found under the same key are merged. `replace`: the later list
+            replaces the earlier one, `extend`: the lists are concatenated, `merge_by_key`: mappings in the lists with
+            the same value for `list_key` are deep merged, other items are appended. Defaults to "replace".
+        list_key (Union[str, None], optional): Key identifying the list items for `merge_by_key`. Defaults to None.
+
+    Returns:
+        dict: Merged mapping
+    """
+    if list_strategy not in ("replace", "extend", "merge_by_key"):
+        raise ValueError(
+            f"Unknown list strategy: {list_strategy}. Choose one of ['replace', 'extend', 'merge_by_key'].",
+        )
+    if list_strategy == "merge_by_key" and list_key is None:
+        raise ValueError("`list_key` is required by the `merge_by_key` list strategy.")
+
+    merged: dict = {}
+    for mapping in mappings:
+        merged = _deep_merge(merged, mapping, list_strategy, list_key)
+    return merged
+
+
+def _values_equal(a: Any, b: Any) -> bool:
+    np = sys.modules.get("numpy")
+    if np is not None and (isinstance(a, np.ndarray) or isinstance(b, np.ndarray)):
+        return np.array_equal(a, b)
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+def diff_mappings(
+    old: Mapping,
+    new: Mapping,
+    sep: str = ".",
+    tuple_keys: bool = False,
+) -> dict[str, dict[Union[str, tuple], Any]]:
+    """Compare two nested mappings.
+
+    Only the keys of both mappings are walked, and subtrees which are the same object on both sides are skipped
+    without being compared, so diffing a mapping with a modified copy of itself sharing the unchanged subtrees (e.g.
+    from :func:`deep_merge`) is cheap. Added or removed subtrees are reported at their top level key.
+
+    Example:
+        >>> diff_mappings({'a': {'b': 1, 'c': 2}}, {'a': {'b': 3}, 'd': 4})
+        {'added': {'d': 4}, 'removed': {'a.c': 2}, 'changed': {'a.b': (1, 3)}}
+
+    Args:
+        old (Mapping): Reference mapping
+        new (Mapping): Mapping compared to the reference
+        sep (str, optional): Character used to separate nesting levels in the keys. Defaults to ".".
+        tuple_keys (bool, optional): Use the tuple of original keys instead of joining their string
+            representations with `sep`. Defaults to False.
+
+    Returns:
+        dict[str, dict[Union[str, tuple], Any]]: `added` and `removed` map flat keys to values, `changed` maps flat
+        keys to the `(old, new)` values
+    """
+    added, removed, changed = {}, {}, {}
+    stack = [((), old, new)]
+    while stack:
+        prefix, old_node, new_node = stack.pop()
+        for key, old_item in old_node.items():
+            path = prefix + (key,)
+            if key not in new_node:
+                removed[path] = old_item
+                continue
+            new_item = new_node[key]
+            if old_item is new_item:
+                continue
+            if _is_nested(old_item) and _is_nested(new_item):
+                stack.append((path, old_item, new_item))
+            elif not _values_equal(old_item, new_item):
+                changed[path] = (old_item, new_item)
+        for key, new_item in new_node.items():
+            if key not in old_node:
+                added[prefix + (key,)] = new_item
+
+    diff = {"added": added, "removed": removed, "changed": changed}
+    if not tuple_keys:
+        diff = {kind: {sep.join(map(str, path)): item for path, item in items.items()} for kind, items in diff.items()}
+    return diff
+
+
+def _column_kind(value_type: type, np: Any) -> str:
+    if issubclass(value_type, (bool, np.bool_)):
+        return "bool"
+    # numpy registers its integer and floating scalar types as `numbers.Real`
+    if issubclass(value_type, numbers.Real):
+        return "real"
+    if issubclass(value_type, str):
+        return "str"
+    return "object"
+
+
+def _column_to_array(values: list[Any], dtype: Any = None) -> "np.ndarray":
+    import numpy as np
+
+    if dtype is None:
+        # columns of booleans, of real numbers (python or numpy scalars) or of strings get a typed array, mixed
+        # columns such as booleans and integers are stored as object arrays instead of being coerced
+        kinds = {_column_kind(value_type, np) for value_type in set(map(type, values))}
+        if len(kinds) > 1 or "object" in kinds:
+            dtype = object
+    if dtype is None or np.dtype(dtype) != object:
+        try:
+            return np.asarray(values, dtype=dtype)
+        except OverflowError:
+            # integers exceeding int64
+            pass
+    # explicit object arrays keep sequences as single elements instead of adding dimensions
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def records_to_columns(
+    records: Iterable[Mapping],
+    sep: str = ".",
+    flatten: bool = True,
+    dtypes: Union[dict[str, Any], None] = None,
+) -> dict[str, "np.ma.MaskedArray"]:
+    """Convert records (e.g. per-case results) to one masked numpy array per field.
+
+    Records are consumed in a single pass, so `records` can be an iterator. Nested records are flattened with the
+    keys of :func:`flatten_mapping`. Columns of booleans, integers, floats or strings get the corresponding numpy
+    dtype, other columns are object arrays. Fields missing in a record are masked.
+
+    Example:
+        >>> columns = records_to_columns([{'id': 1, 'metrics': {'dice': 0.9}}, {'id': 2}])
+        >>> columns['metrics.dice']
+        masked_array(data=[0.9, --], mask=[False,  True], fill_value=1e+20)
+        >>> columns['metrics.dice'].mean()
+        0.9
+
+    Args:
+        records (Iterable[Mapping]): Flat or nested records
+        sep (str, optional): Character used to separate nesting levels in the column names. Defaults to ".".
+        flatten (bool, optional): Whether to flatten nested records. If False, nested mappings are stored as
+            objects. Defaults to True.
+        dtypes (Union[dict[str, Any], None], optional): Numpy dtypes of some columns, overriding the inferred ones.
+            Defaults to None.
+
+    Returns:
+        dict[str, np.ma.MaskedArray]: Column name to masked array, in order of first appearance of the columns
+    """
+    if not _NUMPY_AVAILABLE:
+        raise ModuleNotFoundError("`records_to_columns` requires `numpy`. Install it with `pip install numpy`.")
+    import numpy as np
+
+    dtypes = dtypes or {}
+    # column name -> values, with `_MISSING` at the positions of the records lacking the field
+    collected: dict[str, list[Any]] = {}
+    incomplete: set[str] = set()
+    n_records = 0
+    for record in records:
+        items = iter_flatten_mapping(record, sep=sep) if flatten else record.items()
+        for name, item in items:
+            values = collected.get(name)
+            if values is None:
+                values = collected[name] = []
+            if len(values) != n_records:
+                values.extend([_MISSING] * (n_records - len(values)))
+                incomplete.add(name)
+            values.append(item)
+        n_records += 1
+
+    columns = {}
+    for name, values in collected.items():
+        if len(values) != n_records:
+            values.extend([_MISSING] * (n_records - len(values)))
+            incomplete.add(name)
+        if name not in incomplete:
+            columns[name] = np.ma.MaskedArray(_column_to_array(values, dtypes.get(name)), mask=np.ma.nomask)
+            continue
+        mask = np.fromiter((item is _MISSING for item in values), dtype=bool, count=n_records)
+        data = _column_to_array([item for item in values if item is not _MISSING], dtypes.get(name))
+        full = np.zeros(n_records, dtype=data.dtype) if data.dtype != object else np.full(n_records, None)
+        full[~mask] = data
+        columns[name] = np.ma.MaskedArray(full, mask=mask)
+    return columns
+
+
+def columns_to_records(
+    columns: Mapping[str, Any],
+    sep: str = ".",
+    unflatten: bool = True,
+) -> list[dict[str, Any]]:
+    """Convert columns, e.g. from :func:`records_to_columns`, back to records.
+
+    Masked entries are left out of the records and numpy scalars are converted to python objects.
+
+    Args:
+        columns (Mapping[str, Any]): Column name to array, masked array or sequence. All columns have the same length.
+        sep (str, optional): Character used to separate nesting levels in the column names. Defaults to ".".
+        unflatten (bool, optional): Whether to rebuild nested records from the column names with
+            :func:`unflatten_mapping`. Defaults to True.
+
+    Returns:
+        list[dict[str, Any]]: Records
+    """
+    if not _NUMPY_AVAILABLE:
+        raise ModuleNotFoundError("`columns_to_records` requires `numpy`. Install it with `pip install numpy`.")
+    import numpy as np
+
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"All columns must have the same length, found lengths: {sorted(lengths)}")
+    n_records = lengths.pop() if lengths else 0
+
+    if unflatten:
+        # validates once that no column name is the prefix of another one
+        unflatten_mapping(dict.fromkeys(columns), sep=sep)
+
+    records: list[dict[str, Any]] = [{} for _ in range(n_records)]
+    for name, column in columns.items():
+        *parents, field = name.split(sep) if unflatten else (name,)
+        values = np.ma.getdata(column).tolist()
+        mask = np.ma.getmaskarray(column).tolist()
+        for record, item, masked in zip(records, values, mask):
+            if masked:
+                continue
+            for parent in parents:
+                record = record.setdefault(parent, {})
+            record[field] = item
+    return records
+
+
+class _StringifyContext:
+    __slots__ = ("memo", "in_progress", "max_str_len", "max_array_items")
+
+    def __init__(self, max_str_len: Union[int, None], max_array_items: Union[int, None]) -> None:
+        # id of the already stringified containers -> (container, result), shared subobjects are only converted
+        # once. The container is kept alive so that its id is not reused by a temporary object, e.g. yielded by a
+        # custom mapping.
+        self.memo: dict[int, tuple[Any, Any]] = {}
+        # ids of the containers being converted, encountering one of them again means a cycle
+        self.in_progress: set[int] = set()
+        self.max_str_len = max_str_len
+        self.max_array_items = max_array_items
+
+    def truncate(self, string: str) -> str:
+        if self.max_str_len is not None and len(string) > self.max_str_len:
+            return f"{string[: self.max_str_len]}...<{len(string) - self.max_str_len} more chars>"
+        return string
+
+
+# Scalars converted with `str` without going through the dispatch
+_STRINGIFY_SCALAR_TYPES = frozenset((int, float, bool, type(None), complex))
+
+
+def _stringify(obj: Any, ctx: _StringifyContext) -> Any:
+    obj_type = type(obj)
+    if obj_type is str:
+        return ctx.truncate(obj)
+    if obj_type in _STRINGIFY_SCALAR_TYPES:
+        return str(obj)
+    return _stringify_dispatch(obj, ctx)
+
+
+def _stringify_container(obj: Any, ctx: _StringifyContext, convert: Callable, cycle_marker: str) -> Any:
+    obj_id = id(obj)
+    if obj_id in ctx.memo:
+        return ctx.memo[obj_id][1]
+    if obj_id in ctx.in_progress:
+        return cycle_marker
+    ctx.in_progress.add(obj_id)
+    try:
+        result = convert(obj, ctx)
+    finally:
+        ctx.in_progress.discard(obj_id)
+    ctx.memo[obj_id] = (obj, result)
+    return result
+
+
+@functools.singledispatch
+def _stringify_dispatch(obj: Any, ctx: _StringifyContext) -> Any:
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(obj, np.ndarray):
+        # arrays are summarized by numpy instead of being truncated as strings
+        if ctx.max_array_items is not None:
+            return np.array2string(obj, threshold=ctx.max_array_items, edgeitems=3)
+        return str(obj)
+    return ctx.truncate(str(obj))
+
+
+@_stringify_dispatch.register(Mapping)
+def _(obj: Mapping, ctx: _StringifyContext) -> dict[str, Any]:
+    return _stringify_container(
+        obj,
+        ctx,
+        lambda mapping, ctx: {str(key): _stringify(item, ctx) for key, item in mapping.items()},
+        "{...}",
+    )
+
+
+@_stringify_dispatch.register(list)
+@_stringify_dispatch.register(tuple)
+def _(obj: Union[list, tuple], ctx: _StringifyContext) -> list[Any]:
+    return _stringify_container(obj, ctx, lambda sequence, ctx: [_stringify(item, ctx) for item in sequence], "[...]")
 
 
 def stringify_nested_mapping(
     nested_mapping: Mapping[Any, Any],
+    max_str_len: Union[int, None] = None,
+    max_array_items: Union[int, None] = None,
 ) -> Mapping[str, str]:
-    if isinstance(nested_mapping, Mapping):
-        return {
-            str(key): stringify_nested_mapping(item)
-            for key, item in nested_mapping.items()
-        }
-    elif isinstance(nested_mapping, (list, tuple)):
-        return [stringify_nested_mapping(item) for item in nested_mapping]
+    """Convert the keys and values of a nested mapping to strings, e.g. to log hyperparameters.
+
+    Mappings are converted to dicts and lists and tuples to lists, other values to their string representation.
+    A container referenced several times is only converted once and the results share the converted object.
+    Cycles are replaced by `{...}` for mappings or `[...]` for sequences.
+
+    Example:
+        >>> stringify_nested_mapping({'lr': 0.1, 'layers': (64, 128), 'name': 'resnet50'}, max_str_len=6)
+        {'lr': '0.1', 'layers': ['64', '128'], 'name': 'resnet...<2 more chars>'}
+
+    Args:
+        nested_mapping (Mapping[Any, Any]): Mapping with nested mappings and sequences
+        max_str_len (Union[int, None], optional): Strings longer than this are truncated. Defaults to None.
+        max_array_items (Union[int, None], optional): Numpy arrays with more items are summarized by their first
+            and last items. Defaults to None, numpy's print threshold.
+
+    Returns:
+        Mapping[str, str]: Mapping with string keys and values
+    """
+    return _stringify(nested_mapping, _StringifyContext(max_str_len, max_array_items))
+
+
+def _records_with_key(
+    records: Iterable[dict],
+    key: str,
+    stats: dict[str, int],
+) -> Iterator[dict]:
+    for record in records:
+        if key in record:
+            yield record
+        else:
+            stats["missing"] += 1
+
+
+def _merge_record(merged: dict, record: dict, conflict: str) -> None:
+    if conflict == "update":
+        merged.update(record)
+    elif conflict == "keep_first":
+        for field, item in record.items():
+            merged.setdefault(field, item)
     else:
-        return str(nested_mapping)
+        for field, item in record.items():
+            if field in merged and not _values_equal(merged[field], item):
+                raise ValueError(f"Conflicting values for {field!r}: {merged[field]!r} and {item!r}.")
+            merged[field] = item
+
+
+def _merge_in_memory(records: Iterable[dict], key: str, conflict: str) -> Iterator[dict]:
+    # use defaultdict(dict) to avoid having to create a key:dict pair
+    merged = defaultdict(dict)
+    for record in records:
+        _merge_record(merged[record[key]], record, conflict)
+    yield from merged.values()
+
+
+def _merge_sorted(records_iterables: Iterable[Iterator[dict]], key: str, conflict: str) -> Iterator[dict]:
+    get_key = operator.itemgetter(key)
+    previous = _MISSING
+    for value, group in itertools.groupby(heapq.merge(*records_iterables, key=get_key), key=get_key):
+        if previous is not _MISSING and value < previous:
+            raise ValueError(f"Inputs are not sorted on {key!r}: {value!r} follows {previous!r}.")
+        previous = value
+        merged: dict = {}
+        for record in group:
+            _merge_record(merged, record, conflict)
+        yield merged
+
+
+def _merge_spilled(
+    records: Iterable[dict],
+    key: str,
+    conflict: str,
+    n_partitions: int,
+    spill_dir: Union[str, None],
+) -> Iterator[dict]:
+    with tempfile.TemporaryDirectory(dir=spill_dir, prefix="merge_") as tmp_dir:
+        paths = [os.path.join(tmp_dir, f"partition_{idx}.pkl") for idx in range(n_partitions)]
+        files = [open(path, "wb") for path in paths]
+        try:
+            for record in records:
+                pickle.dump(record, files[hash(record[key]) % n_partitions], protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            for f in files:
+                f.close()
+
+        for path in paths:
+            with open(path, "rb") as f:
+                yield from _merge_in_memory(_iter_pickled(f), key, conflict)
+            os.remove(path)
+
+
+def _iter_pickled(f) -> Iterator[Any]:
+    while True:
+        try:
+            yield pickle.load(f)
+        except EOFError:
+            return
+
+
+def iter_merge_dicts_on_key(
+    dicts_iterables: Iterable[Iterable[dict]],
+    key: str,
+    mode: str = "memory",
+    conflict: str = "update",
+    n_partitions: int = 64,
+    spill_dir: Union[str, None] = None,
+    stats: Union[dict[str, int], None] = None,
+) -> Iterator[dict]:
+    """Lazily merge iterables of dicts on a common key, see :func:`merge_lists_of_dicts_on_key`.
+
+    The inputs are consumed lazily, so they can be generators, e.g. reading per-shard JSONL files. In the `memory`
+    and `spill` modes the outer iterable is consumed lazily too, one input after the other. The `sorted` mode reads
+    all inputs at once, so it takes the first item of every input upfront and the outer iterable must be finite.
+
+    Args:
+        dicts_iterables (Iterable[Iterable[dict]]): Iterables of dictionaries
+        key (str): Common dictionary key on which to merge
+        mode (str, optional): `memory` merges in a dict of all keys and yields the merged dicts in order of first
+            appearance. `sorted` expects every input to be sorted on `key` and merges them in a single streaming
+            pass, keeping only the current group in memory. `spill` partitions the records by key into temporary
+            files and merges one partition at a time, the output is not ordered. Defaults to "memory".
+        conflict (str, optional): Policy for fields present in several merged dicts. `update`: later values win,
+            `keep_first`: earlier values win, `raise`: raise a ValueError for differing values. Defaults to "update".
+        n_partitions (int, optional): Number of temporary files of the `spill` mode. Defaults to 64.
+        spill_dir (Union[str, None], optional): Directory of the temporary files of the `spill` mode. Defaults to
+            None, the system's temporary directory.
+        stats (Union[dict[str, int], None], optional): If given, the number of dicts without `key`, which are
+            skipped, is stored under `missing`. Defaults to None.
+
+    Yields:
+        dict: Merged dictionary
+    """
+    if mode not in ("memory", "sorted", "spill"):
+        raise ValueError(f"Unknown mode: {mode}. Choose one of ['memory', 'sorted', 'spill'].")
+    if conflict not in ("update", "keep_first", "raise"):
+        raise ValueError(f"Unknown conflict policy: {conflict}. Choose one of ['update', 'keep_first', 'raise'].")
+
+    stats = {} if stats is None else stats
+    stats["missing"] = 0
+    records_iterables = (_records_with_key(records, key, stats) for records in dicts_iterables)
+
+    if mode == "sorted":
+        yield from _merge_sorted(records_iterables, key, conflict)
+    elif mode == "spill":
+        yield from _merge_spilled(
+            itertools.chain.from_iterable(records_iterables),
+            key,
+            conflict,
+            n_partitions,
+            spill_dir,
+        )
+    else:
+        yield from _merge_in_memory(itertools.chain.from_iterable(records_iterables), key, conflict)
 
 
 def merge_lists_of_dicts_on_key(
-    dicts_lists: list[list[dict]],
+    dicts_lists: Iterable[Iterable[dict]],
     key: str,
-) -> list[dict]:
-    """Merges lists of lists of dicts on a common key. This key has to be present in all dictionaries.
+    mode: str = "memory",
+    conflict: str = "update",
+    return_n_missing: bool = False,
+    **kwargs: Any,
+) -> Union[list[dict], tuple[list[dict], int]]:
+    """Merges lists of lists of dicts on a common key.
 
     It constructs a dict of dicts. This dict has as keys the values of the dicts in the list[list[dict]] for the passed common `key`.
     It then returns the values of this dict to recreate a list[dict].
 
-    Dictionaries with the same value for `key` update each other in the order they are processed.
+    Dictionaries with the same value for `key` update each other in the order they are processed. Dictionaries
+    without `key` are skipped and counted.
 
     Args:
-        dicts_lists (list[list[dict]]): List of dictionary lists
+        dicts_lists (Iterable[Iterable[dict]]): List of dictionary lists, or any iterable of iterables of dicts
         key (str): Common dictionary key on which to merge
+        mode (str, optional): `memory`, `sorted` (for inputs sorted on `key`) or `spill` (for joins exceeding the
+            memory), see :func:`iter_merge_dicts_on_key`. Defaults to "memory".
+        conflict (str, optional): `update`, `keep_first` or `raise`, see :func:`iter_merge_dicts_on_key`.
+            Defaults to "update".
+        return_n_missing (bool, optional): Also return the number of skipped dicts without `key`. Defaults to False.
+        **kwargs: keyword arguments passed to :func:`iter_merge_dicts_on_key`
 
     Example:
         >>> list_a = [{'common_key': 1, 'key2': 2}]
         >>> list_b = [{'common_key': 3}]
         >>> list_c = [{'common_key': 4, 'key3': 5}]
         >>> list_d = [{'common_key': 1, 'key2': 6, 'key4': 7}]
-        >>> merge_lists_of_dicts_on_key([list_a, list_b, list_c], key='common_key')
+        >>> merge_lists_of_dicts_on_key([list_a, list_b, list_c, list_d], key='common_key')
         [{'common_key': 1, 'key2': 6, 'key4': 7}, {'common_key': 3}, {'common_key': 4, 'key3': 5}]
 
     Returns:
-        list[dict]: Merged list of dictionaries
+        Union[list[dict], tuple[list[dict], int]]: Merged list of dictionaries, and the number of skipped
+        dictionaries if `return_n_missing`
     """
-    # flatten list[list[dict]] to list[dict]
-    list_of_dicts = list(itertools.chain(*dicts_lists))
-
-    # use defaultdict(dict) to avoid having to create a key:dict pair
-    merged = defaultdict(dict)
-
-    for item in list_of_dicts:
-        merged[item[key]].update(item)
-    return list(merged.values())
+    stats: dict[str, int] = {}
+    merged = list(iter_merge_dicts_on_key(dicts_lists, key, mode=mode, conflict=conflict, stats=stats, **kwargs))
+    if return_n_missing:
+        return merged, stats["missing"]
+    return merged
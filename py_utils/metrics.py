@@ -0,0 +1,281 @@
+import threading
+from collections.abc import Iterator
+from typing import Any, Union
+
+from py_utils.types import PathLike
+
+__all__ = [
+    "Metric",
+    "MetricsRegistry",
+    "METRICS",
+]
+
+# Each power of two is split into 2**_SUB_BUCKET_BITS histogram buckets, bounding the relative error of the
+# quantile estimates to 2**-(_SUB_BUCKET_BITS + 1) (~3%).
+_SUB_BUCKET_BITS = 4
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+
+_get_ident = threading.get_ident
+
+
+def _bucket_index(value: int) -> int:
+    """Index of the log-linear histogram bucket of a non-negative integer, increasing with the value."""
+    if value < _SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - _SUB_BUCKET_BITS - 1
+    # value >> shift keeps the highest _SUB_BUCKET_BITS + 1 bits, the leading one is implicit
+    return _SUB_BUCKETS + shift * _SUB_BUCKETS + (value >> shift) - _SUB_BUCKETS
+
+
+def _bucket_bounds(index: int) -> tuple[int, int]:
+    """Inverse of :func:`_bucket_index`: the values `[low, high)` falling in the bucket."""
+    if index < _SUB_BUCKETS:
+        return index, index + 1
+    shift, sub_bucket = divmod(index - _SUB_BUCKETS, _SUB_BUCKETS)
+    low = (_SUB_BUCKETS + sub_bucket) << shift
+    return low, low + (1 << shift)
+
+
+def _new_shard_values() -> list:
+    return [0, 0, float("inf"), float("-inf"), {}]
+
+
+def _merge_shard(into: list, shard: list) -> None:
+    into[0] += shard[0]
+    into[1] += shard[1]
+    into[2] = min(into[2], shard[2])
+    into[3] = max(into[3], shard[3])
+    buckets = into[4]
+    for index, bucket_count in list(shard[4].items()):
+        buckets[index] = buckets.get(index, 0) + bucket_count
+
+
+class Metric:
+    """Streaming statistics of a series of integer values, e.g. durations in nanoseconds or sizes in bytes.
+
+    Count, total, min and max are exact. Quantiles are estimated from a sparse log-linear histogram whose memory
+    only grows with the logarithm of the value range.
+
+    Each thread records into its own shard, so :meth:`add` takes no lock. The shards are merged when the
+    statistics are read. When a thread records its first value, the shards of the threads which ended are folded
+    into a single one, so short-lived threads do not grow the metric.
+
+    Args:
+        name: name of the metric
+        unit: unit of the values. Defaults to "ns".
+        sample_every: the recorded values are a sample of one in `sample_every` events. Defaults to 1.
+    """
+
+    __slots__ = ("name", "unit", "sample_every", "_shards", "_lock")
+
+    def __init__(self, name: str, unit: str = "ns", sample_every: int = 1) -> None:
+        self.name = name
+        self.unit = unit
+        self.sample_every = sample_every
+        # thread id -> [count, total, min, max, buckets], where buckets maps the signed bucket index to its count.
+        # Negative values use the mirrored indices -1, -2, ... The values of ended threads are under the key None.
+        self._shards: dict[Union[int, None], list] = {}
+        self._lock = threading.Lock()
+
+    def _new_shard(self, thread_id: int) -> list:
+        # registers threads not started by `threading` so that they are listed by `threading.enumerate`
+        threading.current_thread()
+        with self._lock:
+            alive = {thread.ident for thread in threading.enumerate()}
+            if any(key is not None and key not in alive for key in self._shards):
+                # replace the dict instead of mutating it, so that concurrent readers see a consistent state
+                shards: dict[Union[int, None], list] = {}
+                retired = _new_shard_values()
+                for key, shard in self._shards.items():
+                    if key is None or key not in alive:
+                        _merge_shard(retired, shard)
+                    else:
+                        shards[key] = shard
+                shards[None] = retired
+                self._shards = shards
+            return self._shards.setdefault(thread_id, _new_shard_values())
+
+    def add(self, value: Union[int, float]) -> None:
+        """Record a value."""
+        if value.__class__ is not int:
+            value = int(value)
+        index = _bucket_index(value) if value >= 0 else -_bucket_index(-value) - 1
+        thread_id = _get_ident()
+        shard = self._shards.get(thread_id)
+        if shard is None:
+            shard = self._new_shard(thread_id)
+        shard[0] += 1
+        shard[1] += value
+        if value < shard[2]:
+            shard[2] = value
+        if value > shard[3]:
+            shard[3] = value
+        buckets = shard[4]
+        buckets[index] = buckets.get(index, 0) + 1
+
+    def _merged(self) -> tuple[int, int, Union[int, None], Union[int, None], dict[int, int]]:
+        merged = _new_shard_values()
+        for shard in list(self._shards.values()):
+            _merge_shard(merged, shard)
+        count, total, low, high, buckets = merged
+        if not count:
+            return 0, 0, None, None, buckets
+        return count, total, low, high, buckets
+
+    @property
+    def count(self) -> int:
+        return sum(shard[0] for shard in list(self._shards.values()))
+
+    @property
+    def total(self) -> int:
+        return sum(shard[1] for shard in list(self._shards.values()))
+
+    @property
+    def min(self) -> Union[int, None]:
+        return self._merged()[2]
+
+    @property
+    def max(self) -> Union[int, None]:
+        return self._merged()[3]
+
+    @property
+    def mean(self) -> Union[float, None]:
+        count, total = self._merged()[:2]
+        return total / count if count else None
+
+    @staticmethod
+    def _quantile(
+        q: float,
+        count: int,
+        low: Union[int, None],
+        high: Union[int, None],
+        buckets: dict[int, int],
+    ) -> Union[float, None]:
+        if not count:
+            return None
+        rank = q * (count - 1)
+        seen = 0
+        for index in sorted(buckets):
+            seen += buckets[index]
+            if seen > rank:
+                bucket_low, bucket_high = _bucket_bounds(index if index >= 0 else -index - 1)
+                midpoint = (bucket_low + bucket_high - 1) / 2
+                if index < 0:
+                    midpoint = -midpoint
+                # clip to the exact extremes
+                return min(max(midpoint, low), high)
+        return float(high)
+
+    def quantile(self, q: float) -> Union[float, None]:
+        """Estimate the `q`-quantile (0 <= q <= 1) of the recorded values."""
+        count, _, low, high, buckets = self._merged()
+        return self._quantile(q, count, low, high, buckets)
+
+    def to_dict(self, quantiles: tuple[float, ...] = (0.5, 0.9, 0.99)) -> dict[str, Any]:
+        """Summary of the metric."""
+        count, total, low, high, buckets = self._merged()
+        summary = {
+            "name": self.name,
+            "unit": self.unit,
+            "count": count,
+            "estimated_calls": count * self.sample_every,
+            "total": total,
+            "mean": total / count if count else None,
+            "min": low,
+            "max": high,
+        }
+        for q in quantiles:
+            summary[f"p{q * 100:g}"] = self._quantile(q, count, low, high, buckets)
+        return summary
+
+    def reset(self) -> None:
+        with self._lock:
+            self._shards = {}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(name={self.name!r}, unit={self.unit!r}, count={self.count})"
+
+
+class MetricsRegistry:
+    """In-process, thread-safe collection of named :class:`Metric`.
+
+    Example:
+        >>> registry = MetricsRegistry()
+        >>> registry.record("load_case", 1_500_000)
+        >>> registry.record("load_case", 2_500_000)
+        >>> registry.get("load_case").mean
+        2000000.0
+        >>> print(registry.report())
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def metric(self, name: str, unit: str = "ns", sample_every: int = 1) -> Metric:
+        """Get the metric `name`, creating it if needed."""
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(name, Metric(name, unit=unit, sample_every=sample_every))
+        return metric
+
+    def record(self, name: str, value: Union[int, float], unit: str = "ns") -> None:
+        """Record a value of the metric `name`."""
+        self.metric(name, unit=unit).add(value)
+
+    def get(self, name: str) -> Union[Metric, None]:
+        return self._metrics.get(name)
+
+    def __iter__(self) -> Iterator[Metric]:
+        return iter(list(self._metrics.values()))
+
+    def __len__(self) -> int:
+        return len(self._metrics)
+
+    def snapshot(self, quantiles: tuple[float, ...] = (0.5, 0.9, 0.99)) -> list[dict[str, Any]]:
+        """Summaries of all metrics, see :meth:`Metric.to_dict`."""
+        return [metric.to_dict(quantiles=quantiles) for metric in self]
+
+    def report(self, sort_by: str = "total", unit: Union[str, None] = None) -> str:
+        """Human readable table of the metrics with values, sorted decreasingly by `sort_by`.
+
+        Args:
+            sort_by: summary field to sort by. Defaults to "total".
+            unit: only report the metrics with this unit, e.g. "ns" or "B". Defaults to None (all metrics).
+        """
+        rows = [row for row in self.snapshot() if row["count"] and (unit is None or row["unit"] == unit)]
+        rows.sort(key=lambda row: row[sort_by] if row[sort_by] is not None else float("-inf"), reverse=True)
+        columns = ["name", "unit", "count", "total", "mean", "min", "p50", "p90", "p99", "max"]
+        table = [columns] + [[_format_value(row[column]) for column in columns] for row in rows]
+        widths = [max(len(line[idx]) for line in table) for idx in range(len(columns))]
+        lines = []
+        for line in table:
+            cells = [line[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(line[1:], widths[1:])]
+            lines.append("  ".join(cells))
+        return "\n".join(lines)
+
+    def export_json(self, path: PathLike, **kwargs: Any) -> None:
+        """Save the summaries of all metrics to a json file, see :func:`py_utils.io.save_json`."""
+        from py_utils.io import save_json
+
+        save_json(self.snapshot(), path, **kwargs)
+
+    def reset(self) -> None:
+        """Clear the values of all metrics.
+
+        The metrics are reset in place, since the instrumented functions keep a reference to their metric.
+        """
+        with self._lock:
+            for metric in self._metrics.values():
+                metric.reset()
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.1f}"
+    return str(value)
+
+
+# Default registry, fed by the instrumentation decorators of `py_utils.decorators`
+METRICS = MetricsRegistry()
@@ -1,10 +1,112 @@
+import hashlib
+import importlib
 import inspect
+import os
+import pickle
+import site
+import sys
 from collections import UserDict
-from collections.abc import Callable
+from collections.abc import Callable, Hashable, Iterable
 from typing import Any, Union
 
+from py_utils.types import PathLike
+
 __all__ = ["Registry"]
 
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.join("~", ".cache")), "py_utils")
+
+
+def _read_cache(path: str) -> Union[Any, None]:
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def _write_cache(path: str, obj: Any) -> None:
+    """Pickle `obj` to `path` atomically, concurrent readers never see a partially written file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _import_target(target: str) -> Any:
+    """Import the object at `target`, given as "package.module:attr"."""
+    module_name, _, attr = target.partition(":")
+    obj = importlib.import_module(module_name)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _index_values(value: Any) -> list[Any]:
+    """Hashable values under which a metadata value is indexed, the items of multi-valued fields."""
+    values = value if isinstance(value, (list, tuple, set, frozenset)) else [value]
+    return [item for item in values if isinstance(item, Hashable)]
+
+
+def _installation_fingerprint() -> str:
+    """Cheap fingerprint of the installed distributions.
+
+    Installing or removing a distribution adds or removes its metadata directory, which changes the modification
+    time of the site-packages directory it is installed in. Other directories on `sys.path`, e.g. added through
+    `PYTHONPATH`, are fingerprinted by the names and modification times of the metadata directories they contain, so
+    that writing unrelated files in them does not invalidate the fingerprint. The working directory and the directory
+    of the script, which Python puts on `sys.path`, are skipped.
+    """
+    site_dirs = set(getattr(site, "getsitepackages", list)())
+    site_dirs.add(site.getusersitepackages())
+    skipped = {"", os.getcwd()}
+    if sys.argv and sys.argv[0]:
+        skipped.add(os.path.dirname(os.path.abspath(sys.argv[0])))
+
+    hasher = hashlib.blake2b(digest_size=16)
+    for entry in sys.path:
+        if entry in skipped:
+            continue
+        if entry in site_dirs or os.path.basename(entry) in ("site-packages", "dist-packages"):
+            try:
+                hasher.update(f"{entry}\x00{os.stat(entry).st_mtime_ns}\x00".encode())
+            except OSError:
+                pass
+            continue
+        try:
+            with os.scandir(entry) as it:
+                metadata_dirs = sorted(
+                    (item.name, item.stat().st_mtime_ns)
+                    for item in it
+                    if item.name.endswith((".dist-info", ".egg-info"))
+                )
+        except OSError:
+            continue
+        for name, mtime in metadata_dirs:
+            hasher.update(f"{entry}\x00{name}\x00{mtime}\x00".encode())
+    return hasher.hexdigest()
+
+
+def _scan_entry_points(group: str) -> list[tuple[str, str, dict[str, Any]]]:
+    """Scan the metadata of the installed distributions for the entry points of `group`."""
+    from importlib.metadata import entry_points
+
+    eps = entry_points()
+    # python < 3.10 returns a dict of group -> entry points
+    eps = eps.select(group=group) if hasattr(eps, "select") else eps.get(group, [])
+
+    found = []
+    for ep in eps:
+        # strip extras, e.g. "package.module:attr [extra]"
+        target = ep.value.split("[")[0].strip()
+        if ":" not in target:
+            # entry points referring to a module can not be registered as callable
+            continue
+        dist = getattr(ep, "dist", None)
+        metadata = {"distribution": dist.name} if dist is not None else {}
+        found.append((ep.name, target, metadata))
+    return found
+
 
 class Registry(UserDict):
     """A registry that provides a name -> object mapping.
@@ -38,9 +140,27 @@ class Registry(UserDict):
     .. code-block:: python
 
         BACKBONE_REGISTRY.register(MyBackbone)
+
+    Or lazily by dotted path, the module is only imported when the key is first accessed
+
+    .. code-block:: python
+
+        BACKBONE_REGISTRY.register("my_package.backbones:MyBackbone", name="my_backbone", metadata1="value")
+
+    To avoid importing all modules registering objects at startup, they can be scanned once into a manifest from
+    which lazy entries are registered in later runs
+
+    .. code-block:: python
+
+        BACKBONE_REGISTRY.scan(["my_package.backbones"], manifest_path="~/.cache/backbones.manifest")
     """
 
     def __init__(self, name: str) -> None:
+        # metadata field -> value -> keys of the entries with this value, used by `query`
+        self._index: dict[str, dict[Any, set[str]]] = {}
+        self._sorted_keys: Union[list[str], None] = None
+        # keys of the lazy entries whose module is being imported
+        self._resolving: set[str] = set()
         super().__init__()
         self.name = name
 
@@ -49,10 +169,28 @@ class Registry(UserDict):
 
     def __getitem__(self, key: str, with_metadata: bool = False) -> Callable:
         match = super().__getitem__(key)
+        if match["fn"] is None:
+            self._resolve(key, match)
         if with_metadata:
             return match
         return match["fn"]
 
+    def _resolve(self, key: str, match: dict[str, Any]) -> None:
+        """Import the object of a lazy entry and cache it in the entry."""
+        self._resolving.add(key)
+        try:
+            fn = _import_target(match["target"])
+        finally:
+            self._resolving.discard(key)
+        if not callable(fn):
+            raise ValueError(f"You can only register a callable, found: {fn}")
+        match["fn"] = fn
+        try:
+            match["path"] = inspect.getfile(fn)
+        except TypeError:
+            # built-in objects have no source file
+            match["path"] = None
+
     def register(
         self,
         fn: Callable = None,
@@ -60,6 +198,20 @@ class Registry(UserDict):
         override: bool = False,
         **metadata: Any,
     ):
+        # lazy entry: "package.module:attr"
+        if isinstance(fn, str):
+            if ":" not in fn:
+                raise ValueError(f"Lazy entries must have the format 'package.module:attr', found: {fn}")
+            self._register(
+                name or fn.rpartition(":")[2].rpartition(".")[2],
+                None,
+                None,
+                override=override,
+                metadata=metadata,
+                target=fn,
+            )
+            return fn
+
         # used as a function call
         if fn is not None:
             self._register(
@@ -91,31 +243,228 @@ class Registry(UserDict):
         path: str,
         override: bool = False,
         metadata: Union[dict[str, Any], None] = None,
+        target: Union[str, None] = None,
     ):
-        if not callable(fn):
-            raise ValueError(f"You can only register a callable, found: {fn}")
+        if target is None:
+            if not callable(fn):
+                raise ValueError(f"You can only register a callable, found: {fn}")
+            target = f"{fn.__module__}:{fn.__qualname__}"
 
-        if key in self.data and not override:
+        existing = self.data.get(key)
+        match = None
+        if existing is not None and existing["fn"] is None and fn is not None:
+            match = self._is_lazy_target(key, target, fn)
+            if match is None:
+                # the module of the lazy target is being imported and does not define the object yet, the entry is
+                # resolved on first access
+                return
+        if match:
+            # the module of a lazy entry is being imported and registers the object itself
+            existing["fn"] = fn
+            existing["path"] = path
+        elif existing is not None and not override:
             # raise Error if callable is already registered and override=False
             raise ValueError(
                 f"Function with name: {key} and metadata: {metadata} is already present within {self}."
                 " HINT: Use `override=True`.",
             )
         else:
+            if existing is not None:
+                self.__delitem__(key)
             self.data[key] = {
                 "fn": fn,
                 "path": path,
                 "metadata": metadata or {},
+                "target": target,
             }
+            self._update_index(key, self.data[key]["metadata"], add=True)
+            self._sorted_keys = None
+
+    def _is_lazy_target(self, key: str, target: str, fn: Callable) -> Union[bool, None]:
+        """Whether `fn`, defined at `target`, is the object of the lazy entry `key`.
+
+        The lazy target can differ from the definition of the object, e.g. `package:Backbone` re-exporting
+        `package.backbones:Backbone`. Unless `fn` self-registers while the entry is resolved, the lazy target is
+        imported and compared with `fn`.
+
+        Returns:
+            Union[bool, None]: None if it cannot be decided yet, because the module of the lazy target is being
+                imported, e.g. a package imported before the entry is accessed importing the module defining `fn`
+        """
+        lazy_target = self.data[key]["target"]
+        if lazy_target == target or key in self._resolving:
+            return True
+        module_name = lazy_target.partition(":")[0]
+        try:
+            return _import_target(lazy_target) is fn
+        except (ImportError, AttributeError):
+            spec = getattr(sys.modules.get(module_name), "__spec__", None)
+            if getattr(spec, "_initializing", False):
+                return None
+            return False
+
+    def __setitem__(self, key: str, fn: Callable) -> None:
+        """`registry[key] = fn` registers `fn` under `key`, replacing an existing entry."""
+        try:
+            path = inspect.getfile(fn)
+        except TypeError:
+            # built-in objects have no source file
+            path = None
+        self._register(key, fn, path, override=True)
+
+    def __delitem__(self, key: str) -> None:
+        self._update_index(key, self.data[key]["metadata"], add=False)
+        super().__delitem__(key)
+        self._sorted_keys = None
+
+    def _update_index(self, key: str, metadata: dict[str, Any], add: bool) -> None:
+        for field, value in metadata.items():
+            field_index = self._index.setdefault(field, {})
+            for item in _index_values(value):
+                if add:
+                    field_index.setdefault(item, set()).add(key)
+                    continue
+                keys = field_index.get(item)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del field_index[item]
+
+    def query(self, **filters: Any) -> list[str]:
+        """Return the keys of the entries whose metadata matches all `filters`, using an index of the metadata.
+
+        Metadata given as list, tuple or set matches if any of its items matches. Likewise, a filter given as list,
+        tuple or set matches any of its items.
+
+        Example:
+            >>> BACKBONE_REGISTRY = Registry("BACKBONE")
+            >>> BACKBONE_REGISTRY.register("my_package:UNet", task=["segmentation", "detection"], dim=3)
+            >>> BACKBONE_REGISTRY.register("my_package:ResNet", task="classification", dim=2)
+            >>> BACKBONE_REGISTRY.query(task="segmentation")
+            ['UNet']
+            >>> BACKBONE_REGISTRY.query(task=("segmentation", "classification"), dim=2)
+            ['ResNet']
+
+        Args:
+            **filters: metadata field to value(s)
+
+        Returns:
+            list[str]: sorted keys of the matching entries
+        """
+        matches: Union[set[str], None] = None
+        for field, value in filters.items():
+            field_index = self._index.get(field, {})
+            field_matches = set().union(*(field_index.get(item, ()) for item in _index_values(value)))
+            matches = field_matches if matches is None else matches & field_matches
+            if not matches:
+                return []
+        if matches is None:
+            return self.available_keys()
+        return sorted(matches)
 
     def available_keys(self) -> list[str]:
         """Returns a list of registered callables."""
-        return sorted(self.data.keys())
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self.data.keys())
+        return list(self._sorted_keys)
 
     def remove(self, key: str) -> None:
         """Removes the registered callable by name."""
         self.__delitem__(key)
 
+    def scan(self, modules: Iterable[str], manifest_path: PathLike) -> None:
+        """Register the objects of `modules` from a cached manifest, without importing the modules.
+
+        If the manifest is missing or outdated, i.e. the scanned modules differ or a source file which registered
+        objects changed, the modules are imported and the objects they register are written to the manifest.
+        Otherwise lazy entries are created for all objects of the manifest, which are imported on first access.
+
+        Args:
+            modules: names of the modules registering objects in this registry
+            manifest_path: path of the cached manifest
+        """
+        modules = sorted(modules)
+        manifest_path = os.path.expanduser(manifest_path)
+        manifest = self._load_manifest(manifest_path, modules)
+        if manifest is None:
+            manifest = self._build_manifest(manifest_path, modules)
+
+        for key, entry in manifest["entries"].items():
+            if key not in self.data:
+                self._register(key, None, None, metadata=entry["metadata"], target=entry["target"])
+
+    @staticmethod
+    def _load_manifest(manifest_path: str, modules: list[str]) -> Union[dict[str, Any], None]:
+        manifest = _read_cache(manifest_path)
+        if manifest is None or manifest.get("modules") != modules:
+            return None
+        for file, stamp in manifest["files"].items():
+            try:
+                stat = os.stat(file)
+            except OSError:
+                return None
+            if (stat.st_mtime_ns, stat.st_size) != stamp:
+                return None
+        return manifest
+
+    def _build_manifest(self, manifest_path: str, modules: list[str]) -> dict[str, Any]:
+        loaded = {key for key, match in self.data.items() if match["fn"] is not None}
+        for module in modules:
+            importlib.import_module(module)
+
+        entries = {}
+        source_modules = set(modules)
+        for key, match in self.data.items():
+            # objects defined in a function can not be imported lazily
+            if key in loaded or match["fn"] is None or "<locals>" in match["target"]:
+                continue
+            entries[key] = {"target": match["target"], "metadata": match["metadata"]}
+            source_modules.add(match["target"].partition(":")[0])
+
+        files = {}
+        for module_name in source_modules:
+            file = getattr(sys.modules.get(module_name), "__file__", None)
+            if file is not None:
+                stat = os.stat(file)
+                files[file] = (stat.st_mtime_ns, stat.st_size)
+
+        manifest = {"modules": modules, "files": files, "entries": entries}
+        _write_cache(manifest_path, manifest)
+        return manifest
+
+    def discover_entry_points(self, group: str, cache_path: Union[PathLike, None] = None) -> None:
+        """Register the objects that installed distributions expose as entry points of `group`.
+
+        Entries are lazy: the plugin modules are only imported when an entry is accessed. Objects already registered
+        in this registry take precedence. Scanning the metadata of all installed distributions is slow, so the
+        discovered entry points are cached in `cache_path` together with a fingerprint of the installation
+        directories on `sys.path`, and only rescanned when a distribution is installed or removed.
+
+        Plugins declare their entry points in their package configuration, e.g. in `pyproject.toml`:
+
+        .. code-block:: toml
+
+            [project.entry-points."my_package.backbones"]
+            my_backbone = "my_plugin.backbones:MyBackbone"
+
+        Args:
+            group: entry point group, e.g. `my_package.backbones`
+            cache_path: path of the cached entry point list. Defaults to
+                `~/.cache/py_utils/entry_points/<group>.pkl`.
+        """
+        if cache_path is None:
+            cache_path = os.path.join(DEFAULT_CACHE_DIR, "entry_points", f"{group}.pkl")
+        cache_path = os.path.expanduser(cache_path)
+
+        fingerprint = _installation_fingerprint()
+        cache = _read_cache(cache_path)
+        if cache is None or cache.get("fingerprint") != fingerprint:
+            cache = {"fingerprint": fingerprint, "entry_points": _scan_entry_points(group)}
+            _write_cache(cache_path, cache)
+
+        for name, target, metadata in cache["entry_points"]:
+            if name not in self.data:
+                self._register(name, None, None, metadata=metadata, target=target)
+
     def __repr__(self) -> str:
         return f"{self.name}:\n\t{self.data}"
-
@@ -4,7 +4,7 @@ from typing import Any, Union
 import numpy as np
 import SimpleITK as sitk
 
-from python_utils.types import Pathlike
+from py_utils.types import PathLike
 
 __all__ = [
     "load_sitk",
@@ -24,7 +24,7 @@ __all__ = [
 ]
 
 
-def load_sitk(path: Pathlike, **kwargs: Any) -> sitk.Image:
+def load_sitk(path: PathLike, **kwargs: Any) -> sitk.Image:
     """Functional interface to load image with sitk.
 
     Args:
@@ -44,7 +44,7 @@ def get_metadata_from_sitk(sitk_image: sitk.Image) -> dict[str, Any]:
 
 
 def load_sitk_as_array(
-    path: Pathlike,
+    path: PathLike,
     return_meta: bool = False,
     **kwargs: Any,
 ) -> Union[np.ndarray, tuple[np.ndarray, dict[str, Any]]]:
@@ -67,7 +67,7 @@ def load_sitk_as_array(
 
 def write_sitk(
     img: Union[sitk.Image, np.ndarray],
-    path: Pathlike,
+    path: PathLike,
     src_img: Union[sitk.Image, None] = None,
     direction: Union[tuple[float, ...], None] = None,
     origin: Union[tuple[float, ...], None] = None,
@@ -77,7 +77,7 @@ def write_sitk(
 
     Args:
         img (Union[sitk.Image, np.ndarray]): Image or numpy array to write
-        path (Pathlike): path to file to load
+        path (PathLike): path to file to load
         src_img (Union[sitk.Image, None]): Image to copy Information from. Default to None.
         origin (Union[tuple[float, ...], None], optional): Coordinates [x,y] or [x,y,z] of the origin vector. Defaults to None.
         direction (Union[tuple[float, ...], None], optional): 1D vector of direction matrix in row major :
@@ -300,7 +300,7 @@ def change_image_direction(
 def from_array_to_sitk_image(
     array: np.array,
     sitk_image: sitk.Image,
-    output_filename: Pathlike,
+    output_filename: PathLike,
 ):
 
     image = sitk.GetImageFromArray(array)
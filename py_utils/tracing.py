@@ -0,0 +1,284 @@
+import contextvars
+import inspect
+import itertools
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from collections.abc import Callable
+from functools import wraps
+from typing import Any, NamedTuple, Union
+
+from py_utils.types import PathLike
+
+__all__ = [
+    "SpanRecord",
+    "Tracer",
+    "TRACER",
+    "span",
+]
+
+# Offset converting `time.perf_counter_ns` to nanoseconds since the epoch, so that spans recorded by several
+# processes share a common time axis while keeping the resolution of the performance counter.
+_EPOCH_OFFSET_NS = time.time_ns() - time.perf_counter_ns()
+
+_span_ids = itertools.count(1)
+_current_span_id: contextvars.ContextVar[Union[int, None]] = contextvars.ContextVar("current_span_id", default=None)
+
+
+class SpanRecord(NamedTuple):
+    """Completed span. Times are in nanoseconds since the epoch."""
+
+    name: str
+    start_ns: int
+    duration_ns: int
+    pid: int
+    tid: int
+    span_id: int
+    parent_id: Union[int, None]
+    args: Union[dict[str, Any], None]
+
+
+_TRACERS: "weakref.WeakSet[Tracer]" = weakref.WeakSet()
+
+
+def _clear_tracers_after_fork() -> None:
+    # a forked child inherits the spans of its parent, which the parent exports itself
+    for tracer in list(_TRACERS):
+        tracer.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_clear_tracers_after_fork)
+
+
+class Tracer:
+    """Ring buffer of the completed spans of the current process.
+
+    Recording a span only appends a tuple to a bounded deque, so tracing can stay enabled in long running
+    processes: the oldest spans are dropped once `capacity` is reached.
+
+    Args:
+        capacity: maximal number of kept spans. Defaults to 100_000.
+        enabled: whether spans are recorded. Defaults to True.
+    """
+
+    def __init__(self, capacity: int = 100_000, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._spans: deque[SpanRecord] = deque(maxlen=capacity)
+        self._thread_names: dict[tuple[int, int], str] = {}
+        _TRACERS.add(self)
+
+    @property
+    def capacity(self) -> int:
+        return self._spans.maxlen
+
+    def record(self, record: SpanRecord) -> None:
+        """Add a completed span to the buffer."""
+        # deque.append is atomic, no lock needed
+        self._spans.append(record)
+        if (record.pid, record.tid) not in self._thread_names:
+            self._thread_names[(record.pid, record.tid)] = threading.current_thread().name
+
+    def spans(self) -> list[SpanRecord]:
+        """Snapshot of the recorded spans, in order of completion."""
+        return list(self._spans)
+
+    def clear(self) -> None:
+        self._spans.clear()
+        self._thread_names = {}
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """Spans in the Chrome Trace Event format, viewable in `chrome://tracing` or https://ui.perfetto.dev.
+
+        Traces saved by several processes can be merged by concatenating their `traceEvents`.
+        """
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for (pid, tid), name in self._thread_names.items()
+        ]
+        for record in self.spans():
+            event = {
+                "name": record.name,
+                "ph": "X",
+                "ts": record.start_ns / 1000,
+                "dur": record.duration_ns / 1000,
+                "pid": record.pid,
+                "tid": record.tid,
+            }
+            if record.args:
+                event["args"] = record.args
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_speedscope(self, name: str = "py_utils trace") -> dict[str, Any]:
+        """Spans in the speedscope format (https://www.speedscope.app), one evented profile per thread.
+
+        Speedscope requires the spans of a profile to be strictly nested. Spans overlapping without nesting, e.g.
+        from concurrent asyncio tasks of the same thread, are clipped to the end of the enclosing span.
+        """
+        frames: list[dict[str, str]] = []
+        frame_indices: dict[str, int] = {}
+        by_thread: dict[tuple[int, int], list[SpanRecord]] = {}
+        for record in self.spans():
+            by_thread.setdefault((record.pid, record.tid), []).append(record)
+            if record.name not in frame_indices:
+                frame_indices[record.name] = len(frames)
+                frames.append({"name": record.name})
+
+        profiles = []
+        for (pid, tid), records in by_thread.items():
+            records.sort(key=lambda record: (record.start_ns, -record.duration_ns))
+            events = []
+            stack: list[tuple[int, int]] = []  # (frame, end)
+
+            def close_until(time_ns: int) -> None:
+                while stack and stack[-1][1] <= time_ns:
+                    frame, end = stack.pop()
+                    events.append({"type": "C", "frame": frame, "at": end})
+
+            for record in records:
+                close_until(record.start_ns)
+                end = record.start_ns + record.duration_ns
+                if stack:
+                    end = min(end, stack[-1][1])
+                frame = frame_indices[record.name]
+                events.append({"type": "O", "frame": frame, "at": record.start_ns})
+                stack.append((frame, end))
+            close_until(float("inf"))
+
+            profiles.append(
+                {
+                    "type": "evented",
+                    "name": f"{self._thread_names.get((pid, tid), tid)} (pid {pid})",
+                    "unit": "nanoseconds",
+                    "startValue": records[0].start_ns,
+                    "endValue": max(event["at"] for event in events),
+                    "events": events,
+                },
+            )
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+    def export(self, path: PathLike, format: str = "chrome", **kwargs: Any) -> None:
+        """Save the spans to a json file.
+
+        Args:
+            path: path to the json file
+            format: `chrome` (Trace Event format) or `speedscope`. Defaults to "chrome".
+            **kwargs: keyword arguments passed to :func:`py_utils.io.save_json`
+        """
+        from py_utils.io import save_json
+
+        if format == "chrome":
+            data = self.to_chrome_trace()
+        elif format == "speedscope":
+            data = self.to_speedscope()
+        else:
+            raise ValueError(f"Unknown trace format: {format}, expected 'chrome' or 'speedscope'")
+        kwargs.setdefault("indent", None)
+        kwargs.setdefault("log", False)
+        save_json(data, path, **kwargs)
+
+
+# Default tracer, fed by `span`
+TRACER = Tracer()
+
+
+class _Span:
+    """Context manager and decorator recording a span, see :func:`span`."""
+
+    __slots__ = ("name", "tracer", "args", "_start", "_span_id", "_parent_id", "_token")
+
+    def __init__(self, name: Union[str, None], tracer: Union[Tracer, None], args: dict[str, Any]) -> None:
+        self.name = name
+        self.tracer = tracer if tracer is not None else TRACER
+        self.args = args
+
+    def __enter__(self) -> "_Span":
+        if not self.tracer.enabled:
+            self._token = None
+            return self
+        self._parent_id = _current_span_id.get()
+        self._span_id = next(_span_ids)
+        self._token = _current_span_id.set(self._span_id)
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self._token is None:
+            return
+        end = time.perf_counter_ns()
+        _current_span_id.reset(self._token)
+        self.tracer.record(
+            SpanRecord(
+                self.name,
+                self._start + _EPOCH_OFFSET_NS,
+                end - self._start,
+                os.getpid(),
+                threading.get_ident(),
+                self._span_id,
+                self._parent_id,
+                self.args or None,
+            ),
+        )
+
+    def __call__(self, func: Callable) -> Callable:
+        name = self.name or func.__qualname__
+        tracer = self.tracer
+        args = self.args
+
+        # a new _Span per call, so the decorated function is reentrant and thread-safe
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def wrapper(*f_args, **f_kwargs):
+                with _Span(name, tracer, args):
+                    return await func(*f_args, **f_kwargs)
+
+        else:
+
+            @wraps(func)
+            def wrapper(*f_args, **f_kwargs):
+                with _Span(name, tracer, args):
+                    return func(*f_args, **f_kwargs)
+
+        return wrapper
+
+
+def span(name: Union[str, Callable, None] = None, *, tracer: Union[Tracer, None] = None, **args: Any) -> Any:
+    """Record the time spent in a block or function as a span.
+
+    Spans opened inside another span are its children: the nesting follows the `contextvars` context, so it is
+    kept per thread and per asyncio task. Spans record the process and thread ids, so traces of worker threads and
+    processes show up as separate tracks.
+
+    Example:
+        >>> from py_utils.sitk import load_sitk
+        >>> @span
+        ... def normalize(image): ...
+        >>> with span("load_case", case_id="case_1"):
+        ...     image = load_sitk("case_1.nii.gz")
+        ...     normalize(image)
+        >>> TRACER.export("trace.json")  # open in chrome://tracing or https://ui.perfetto.dev
+        >>> TRACER.export("trace.speedscope.json", format="speedscope")
+
+    Args:
+        name: name of the span. Defaults to the qualified name of the decorated function.
+        tracer: tracer in which the span is recorded. Defaults to :data:`TRACER`.
+        **args: json serializable values attached to the span
+
+    Returns:
+        the span as context manager or decorator, or the wrapped function if used as a bare decorator
+    """
+    if callable(name):
+        return _Span(None, tracer, args)(name)
+    return _Span(name, tracer, args)
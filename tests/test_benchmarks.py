@@ -0,0 +1,60 @@
+import pytest
+
+from benchmarks.__main__ import main
+from benchmarks.harness import compare_results, load_results, run_benchmarks, save_results
+
+
+def _results(commit, dirty=False, **medians):
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "benchmarks": {name: {"group": "test", "median": median, "min": median} for name, median in medians.items()},
+        "skipped": {},
+    }
+
+
+def test_compare_results_flags_changes_beyond_threshold():
+    base = _results("a" * 40, fast=1.0, slow=1.0, same=1.0, removed=1.0)
+    new = _results("b" * 40, fast=0.5, slow=1.5, same=1.05, added=1.0)
+
+    rows = {row["name"]: row for row in compare_results(base, new, threshold=0.1)}
+
+    assert set(rows) == {"fast", "slow", "same"}
+    assert rows["fast"]["status"] == "improvement"
+    assert rows["slow"]["status"] == "regression"
+    assert rows["slow"]["ratio"] == pytest.approx(1.5)
+    assert rows["same"]["status"] == "ok"
+
+
+def test_save_and_load_results_by_commit(tmp_path):
+    clean = _results("abc123" + "0" * 34, one=1.0)
+    dirty = _results("abc123" + "0" * 34, dirty=True, one=2.0)
+
+    path = save_results(dirty, tmp_path)
+    assert path.name.endswith("-dirty.json")
+    assert load_results("abc123", tmp_path) == dirty
+    save_results(clean, tmp_path)
+
+    assert load_results("abc123", tmp_path) == clean
+    assert load_results(path, tmp_path) == dirty
+    with pytest.raises(FileNotFoundError):
+        load_results("fff", tmp_path)
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(patterns=["registry.get"], min_time=0.001, repeat=2)
+
+    assert list(results["benchmarks"]) == ["registry.get"]
+    timing = results["benchmarks"]["registry.get"]
+    assert timing["group"] == "registry"
+    assert timing["repeat"] == 2
+    assert 0 < timing["min"] <= timing["median"]
+
+
+def test_compare_command_exits_with_regressions(tmp_path, capsys):
+    save_results(_results("a" * 40, one=1.0), tmp_path)
+    save_results(_results("b" * 40, one=2.0), tmp_path)
+
+    assert main(["--results-dir", str(tmp_path), "compare", "aaaa", "bbbb", "--threshold", "1.5"]) == 0
+    assert main(["--results-dir", str(tmp_path), "compare", "aaaa", "bbbb"]) == 1
+    assert "regression" in capsys.readouterr().out
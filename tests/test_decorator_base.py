@@ -1,4 +1,5 @@
 
+import asyncio
 import unittest
 import os
 from py_utils.decorators.base import BaseDecorator
@@ -50,5 +51,86 @@ class TestBaseDecorator(unittest.TestCase):
         self.assertEqual(return_args_kwargs.args, (4,))
         self.assertEqual(return_args_kwargs.kwargs, {'five':5})
 
+    def test_hooks(self):
+        calls = []
+
+        class Recorder(BaseDecorator):
+            def before(self, args, kwargs):
+                if kwargs.get('skip'):
+                    return self.SKIP
+                calls.append(('before', args))
+                return len(calls)
+
+            def after(self, state, result):
+                calls.append(('after', state, result))
+
+            def on_error(self, state, exception):
+                calls.append(('error', state, type(exception)))
+
+        @Recorder
+        def add(a, b, skip=False):
+            return a + b
+        self.assertEqual(add(1, 2), 3)
+        self.assertEqual(add(1, 2, skip=True), 3)
+        self.assertEqual(calls, [('before', (1, 2)), ('after', 1, 3)])
+        self.assertEqual(add.__name__, 'add')
+        self.assertIsInstance(add.decorator, Recorder)
+
+        calls.clear()
+
+        @Recorder()
+        def fail():
+            raise KeyError
+        self.assertRaises(KeyError, fail)
+        self.assertEqual(calls, [('before', ()), ('error', 1, KeyError)])
+
+        calls.clear()
+
+        @Recorder
+        def count(n):
+            yield from range(n)
+            return 'done'
+        self.assertEqual(list(count(3)), [0, 1, 2])
+        self.assertEqual(calls, [('before', (3,)), ('after', 1, 'done')])
+
+        calls.clear()
+
+        @Recorder
+        async def double(x):
+            return 2 * x
+
+        @Recorder
+        async def agen(n):
+            for i in range(n):
+                yield i
+
+        async def consume():
+            return await double(2), [i async for i in agen(2)]
+        self.assertEqual(asyncio.run(consume()), (4, [0, 1]))
+        self.assertEqual(calls, [('before', (2,)), ('after', 1, 4), ('before', (2,)), ('after', 3, None)])
+
+    def test_per_function_state_and_run(self):
+        class Counter(BaseDecorator):
+            def prepare(self):
+                self.count = 0
+
+            def run(self, func, *args, **kwargs):
+                self.count += 1
+                return func(*args, **kwargs)
+
+        counter = Counter()
+        first = counter(lambda: 1)
+        second = counter(lambda: 2)
+        first()
+        first()
+        second()
+        self.assertEqual((first.decorator.count, second.decorator.count), (2, 1))
+
+        class Method:
+            @Counter
+            def value(self):
+                return 3
+        self.assertEqual(Method().value(), 3)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,120 @@
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from py_utils.decorators.caching import disk_cache
+
+calls = []
+
+
+def _expensive(a, b=2, array=None):
+    calls.append((a, b))
+    return {"sum": a + b, "array": array}
+
+
+def test_disk_cache_hit(tmp_path):
+    calls.clear()
+    cached = disk_cache(_expensive, cache_dir=tmp_path)
+
+    assert cached(1)["sum"] == 3
+    assert cached(1, 2)["sum"] == 3
+    assert cached(a=1, b=2)["sum"] == 3
+    assert calls == [(1, 2)]
+
+    assert cached(1, 3)["sum"] == 4
+    assert len(calls) == 2
+    assert len(cached.cache) == 2
+
+
+def test_disk_cache_numpy_arguments(tmp_path):
+    calls.clear()
+    cached = disk_cache(_expensive, cache_dir=tmp_path)
+
+    array = np.arange(10)
+    np.testing.assert_array_equal(cached(1, array=array)["array"], array)
+    cached(1, array=array.copy())
+    assert len(calls) == 1
+    cached(1, array=array[::-1])
+    cached(1, array=array.astype(np.float32))
+    assert len(calls) == 3
+
+
+def _kwargs_function(a, **kwargs):
+    calls.append((a, kwargs))
+    return a
+
+
+def test_disk_cache_key_is_order_independent(tmp_path):
+    calls.clear()
+    cached = disk_cache(_kwargs_function, cache_dir=tmp_path)
+
+    cached({"x": 1, "y": 2}, b=1, c=2)
+    cached({"y": 2, "x": 1}, c=2, b=1)
+    assert len(calls) == 1
+    cached({"x": 2, "y": 1}, b=1, c=2)
+    assert len(calls) == 2
+
+
+def test_disk_cache_set_arguments_across_processes(tmp_path):
+    code = (
+        "from py_utils.decorators.caching import _update_hash\n"
+        "import hashlib\n"
+        "hasher = hashlib.blake2b()\n"
+        "_update_hash(hasher, {'words': {'alpha', 'beta', 'gamma', 'delta'}, 'ids': frozenset({'a', 'b', 'c'})})\n"
+        "print(hasher.hexdigest())\n"
+    )
+    keys = {
+        subprocess.run(
+            [sys.executable, "-c", code],
+            env={**os.environ, "PYTHONHASHSEED": seed},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for seed in ("1", "2", "3")
+    }
+    assert len(keys) == 1
+
+
+def test_disk_cache_bypass_and_refresh(tmp_path):
+    calls.clear()
+    cached = disk_cache(cache_dir=tmp_path)(_expensive)
+
+    cached(1)
+    cached.uncached(1)
+    assert len(calls) == 2
+    assert len(cached.cache) == 1
+
+    cached.refresh(1)
+    cached(1)
+    assert len(calls) == 3
+
+
+def test_disk_cache_unpicklable_argument(tmp_path):
+    @disk_cache(cache_dir=tmp_path)
+    def apply(func, value):
+        return func(value)
+
+    with pytest.raises(TypeError, match="argument 'func'"):
+        apply(lambda v: v + 1, 1)
+    assert apply.uncached(lambda v: v + 1, 1) == 2
+    assert len(apply.cache) == 0
+
+
+def test_disk_cache_eviction(tmp_path):
+    calls.clear()
+    cached = disk_cache(_expensive, cache_dir=tmp_path, max_age=0.05)
+    cached(1)
+    time.sleep(0.1)
+    cached(1)
+    assert len(calls) == 2
+
+    cached = disk_cache(_expensive, cache_dir=tmp_path / "sized", max_size=1)
+    cached(1)
+    cached(2)
+    assert len(cached.cache) == 0
+    assert list((tmp_path / "sized").glob("*.pkl")) == []
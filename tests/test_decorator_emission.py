@@ -0,0 +1,90 @@
+import logging
+import warnings
+
+import numpy as np
+import pytest
+
+from py_utils.decorators.emission import configure_emission
+from py_utils.decorators.printing import print_call
+from py_utils.decorators.warnings import deprecated
+
+
+@pytest.fixture(autouse=True)
+def default_emission():
+    yield
+    configure_emission("default")
+
+
+def test_deprecated_once_per_call_site():
+    @deprecated("Use `new` instead.", version="0.3")
+    def old():
+        return 1
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        for _ in range(3):
+            assert old() == 1
+        old()
+    assert [str(warning.message) for warning in caught] == [
+        "Call to deprecated function test_deprecated_once_per_call_site.<locals>.old"
+        " (deprecated since version 0.3). Use `new` instead.",
+    ] * 2
+    assert all(warning.filename == __file__ for warning in caught)
+    assert all(warning.category is DeprecationWarning for warning in caught)
+
+
+def test_deprecated_bare():
+    @deprecated
+    def old():
+        return 1
+
+    with pytest.warns(DeprecationWarning, match="Call to deprecated function .*old.$"):
+        old()
+
+
+def test_print_call_summarizes_and_rate_limits(capsys):
+    @print_call
+    def shape(array, scale=1):
+        return array.shape
+
+    shape(np.zeros((2, 3)), scale="x" * 200)
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].startswith("shape is called with (ndarray(shape=(2, 3), dtype=float64), scale='xxx")
+    assert len(out[0]) < 150
+    assert out[1] == "shape returns (2, 3)"
+
+    @print_call(rate_limit=2)
+    def noop():
+        pass
+
+    for _ in range(10):
+        noop()
+    assert 2 * 2 <= len(capsys.readouterr().out.splitlines()) <= 2 * 4
+
+
+def test_emission_redirect_and_silence(capsys, caplog):
+    @print_call
+    def noop():
+        pass
+
+    @deprecated
+    def old():
+        pass
+
+    configure_emission("logging", logger="py_utils.tests.emission")
+    with caplog.at_level(logging.INFO, logger="py_utils.tests.emission"), warnings.catch_warnings():
+        warnings.simplefilter("error")
+        noop()
+        old()
+    assert [record.levelno for record in caplog.records] == [logging.INFO, logging.INFO, logging.WARNING]
+    assert caplog.records[-1].funcName == "test_emission_redirect_and_silence"
+
+    configure_emission("silent")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        noop()
+        old()
+    assert capsys.readouterr().out == ""
+
+    with pytest.raises(ValueError):
+        configure_emission("stderr")
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+
+import numpy as np
+import pytest
+
+from py_utils.decorators.log import log, summarize
+
+
+class _Unprintable:
+    def __repr__(self):
+        raise AssertionError("formatted although logging is disabled")
+
+
+def test_summarize():
+    assert summarize(np.zeros((2, 3), dtype=np.float32)) == "ndarray(shape=(2, 3), dtype=float32)"
+    assert summarize(list(range(100))) == "[0, 1, 2, 3, 4, 5, ...]"
+    assert len(summarize("x" * 1000)) <= 80
+    assert summarize({"a": np.zeros(3)}) == "{'a': ndarray(shape=(3,), dtype=float64)}"
+    assert summarize(np.ndarray) == "<class 'numpy.ndarray'>"
+
+
+def test_log_call_and_result(caplog):
+    @log(level="debug")
+    def add(a, b=0):
+        return a + b
+
+    with caplog.at_level(logging.DEBUG, logger=__name__):
+        assert add(np.ones(4), b=1).shape == (4,)
+    messages = [record.getMessage() for record in caplog.records]
+    assert messages == [
+        "test_log_call_and_result.<locals>.add called with (ndarray(shape=(4,), dtype=float64), b=1)",
+        "test_log_call_and_result.<locals>.add returned ndarray(shape=(4,), dtype=float64)",
+    ]
+    assert all(record.levelno == logging.DEBUG for record in caplog.records)
+    # the records point to the caller of the decorated function
+    assert caplog.records[0].funcName == "test_log_call_and_result"
+
+
+def test_log_disabled_does_not_format(caplog):
+    @log(logger="py_utils.tests.disabled", level=logging.DEBUG)
+    def identity(x):
+        return x
+
+    with caplog.at_level(logging.INFO, logger="py_utils.tests.disabled"):
+        identity(_Unprintable())
+    assert caplog.records == []
+
+
+def test_log_exception(caplog):
+    @log
+    def fail():
+        raise KeyError("missing")
+
+    with caplog.at_level(logging.INFO, logger=__name__), pytest.raises(KeyError):
+        fail()
+    assert caplog.records[-1].getMessage() == "test_log_exception.<locals>.fail raised KeyError('missing')"
+
+
+def test_log_sampling_and_rate_limit(caplog):
+    @log(sample_every=5)
+    def sampled():
+        pass
+
+    @log(rate_limit=3)
+    def limited():
+        pass
+
+    with caplog.at_level(logging.INFO, logger=__name__):
+        for _ in range(20):
+            sampled()
+        assert len(caplog.records) == 2 * 4
+        caplog.clear()
+        for _ in range(20):
+            limited()
+        # at most two one-second windows are crossed
+        assert 2 * 3 <= len(caplog.records) <= 2 * 6
+
+
+def test_log_async(caplog):
+    @log
+    async def double(x):
+        return 2 * x
+
+    with caplog.at_level(logging.INFO, logger=__name__):
+        assert asyncio.run(double(2)) == 4
+    assert caplog.records[-1].getMessage().endswith("returned 4")
+
+
+def test_log_invalid_level():
+    with pytest.raises(ValueError):
+        log(lambda: None, level="loud")
@@ -0,0 +1,86 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from py_utils.decorators.memory import MemoryTracker, track_memory
+from py_utils.metrics import MetricsRegistry
+
+
+def allocate(n_bytes):
+    array = np.empty(n_bytes // 8)
+    array.fill(1)
+    return array
+
+
+def test_track_memory_context_manager():
+    registry = MetricsRegistry()
+    with track_memory("alloc", registry=registry, track_numpy=True) as tracker:
+        array = allocate(50_000_000)
+        temporary = allocate(50_000_000)
+        del temporary
+
+    assert isinstance(tracker, MemoryTracker)
+    assert tracker.numpy_bytes == pytest.approx(50_000_000, rel=0.01)
+    assert tracker.traced_peak >= 100_000_000
+    assert tracker.peak_rss_delta >= 90_000_000
+    assert 40_000_000 <= tracker.rss_delta <= tracker.peak_rss_delta
+    site, size, count = tracker.top_allocations[0]
+    assert __file__ in site and size == pytest.approx(50_000_000, rel=0.01)
+    assert not tracemalloc.is_tracing()
+
+    assert registry.get("alloc.peak_rss_delta").unit == "B"
+    assert registry.get("alloc.numpy_bytes").total == tracker.numpy_bytes
+    assert "alloc.traced_peak" in registry.report()
+    del array
+
+
+def test_track_memory_decorator(capsys):
+    registry = MetricsRegistry()
+
+    @track_memory(registry=registry, trace_allocations=False, verbose=True)
+    def work():
+        return allocate(10_000_000).sum()
+
+    work()
+    work()
+    assert work.last_tracker.traced_peak is None
+    assert work.last_tracker.top_allocations == []
+    metric = registry.get(f"{__name__}.test_track_memory_decorator.<locals>.work.peak_rss_delta")
+    assert metric.count == 2
+    assert capsys.readouterr().out.startswith(f"{__name__}.test_track_memory_decorator.<locals>.work: peak RSS")
+
+
+def test_track_memory_nested_peaks():
+    with track_memory("outer", registry=None, trace_allocations=False) as outer:
+        temporary = allocate(80_000_000)
+        del temporary
+        with track_memory("inner", registry=None, trace_allocations=False) as inner:
+            pass
+    assert inner.peak_rss_delta < 40_000_000
+    assert outer.peak_rss_delta >= 70_000_000
+
+
+def test_track_memory_nested_traced_peaks():
+    with track_memory("outer", registry=None, top=0) as outer:
+        temporary = bytearray(20_000_000)
+        del temporary
+        with track_memory("inner", registry=None, top=0) as inner:
+            inner_temporary = bytearray(5_000_000)
+            del inner_temporary
+    # the `with` statement frees a few objects, e.g. the bound `__enter__` method, after the baseline is taken
+    tolerance = 1024
+    assert 5_000_000 - tolerance <= inner.traced_peak < 10_000_000
+    assert outer.traced_peak >= 20_000_000 - tolerance
+
+
+def test_track_memory_keeps_tracemalloc_running():
+    tracemalloc.start()
+    try:
+        with track_memory("block", registry=None, top=0):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    with pytest.raises(ValueError):
+        MemoryTracker(trace_allocations=False, track_numpy=True)
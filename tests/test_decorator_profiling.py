@@ -0,0 +1,125 @@
+import signal
+import threading
+import time
+
+import pytest
+
+from py_utils.decorators.profiling import Profiler, profile, profiled
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_profile_context_manager(tmp_path):
+    with profile(interval_ms=1) as profiler:
+        busy(0.1)
+    assert not profiler._running
+    assert sum(profiler.samples.values()) > 10
+    (leaf, _), *_ = profiler.top(1)
+    assert leaf == f"{__name__}:busy"
+    assert all(f"{__name__}:test_profile_context_manager;{__name__}:busy" in stack for stack in profiler.samples)
+
+    profiler.save(tmp_path / "stacks.txt")
+    lines = (tmp_path / "stacks.txt").read_text().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert profiler.samples[stack] == int(count)
+
+
+def test_profiled_accumulates_and_saves(tmp_path):
+    @profiled(interval_ms=1, output=tmp_path / "stacks.txt")
+    def work():
+        busy(0.03)
+
+    work()
+    first = sum(work.profiler.samples.values())
+    work()
+    assert sum(work.profiler.samples.values()) > first
+    assert (tmp_path / "stacks.txt").read_text().strip() == work.profiler.collapsed()
+    assert work.__name__ == "work"
+
+
+def test_profiler_only_samples_started_threads():
+    profiler = Profiler(interval_ms=1)
+    stop = threading.Event()
+
+    def background():
+        while not stop.is_set():
+            pass
+
+    thread = threading.Thread(target=background)
+    thread.start()
+    try:
+        with profiler:
+            busy(0.05)
+    finally:
+        stop.set()
+        thread.join()
+    assert not any("background" in stack for stack in profiler.samples)
+
+    profiler = Profiler(interval_ms=1, all_threads=True)
+    stop.clear()
+    thread = threading.Thread(target=background, name="bg")
+    thread.start()
+    try:
+        with profiler:
+            busy(0.05)
+    finally:
+        stop.set()
+        thread.join()
+    assert any(stack.startswith("bg;") and "background" in stack for stack in profiler.samples)
+
+
+def test_profiler_reentrant():
+    profiler = Profiler(interval_ms=1)
+    with profiler:
+        with profiler:
+            pass
+        assert profiler._running
+        busy(0.02)
+    assert not profiler._running
+
+
+def test_profiler_read_while_sampling():
+    profiler = Profiler(interval_ms=0.1, all_threads=True)
+    stop = threading.Event()
+
+    def recurse(depth):
+        # samples at varying depths keep adding new stacks
+        if depth and not stop.is_set():
+            return recurse(depth - 1)
+        return busy(0.0001)
+
+    def background():
+        while not stop.is_set():
+            recurse(int(time.perf_counter() * 1e5) % 50)
+
+    thread = threading.Thread(target=background)
+    thread.start()
+    try:
+        with profiler:
+            end = time.perf_counter() + 0.2
+            while time.perf_counter() < end:
+                profiler.collapsed()
+                profiler.top()
+    finally:
+        stop.set()
+        thread.join()
+    assert len(profiler.samples) > 1
+
+
+@pytest.mark.skipif(not hasattr(signal, "setitimer"), reason="requires signal.setitimer")
+def test_profiler_signal_mode():
+    with profile(interval_ms=1, mode="signal") as profiler:
+        busy(0.1)
+    assert profiler.top(1)[0][0] == f"{__name__}:busy"
+    assert signal.getsignal(signal.SIGPROF) in (signal.SIG_DFL, None)
+
+
+def test_profiler_invalid_arguments():
+    with pytest.raises(ValueError):
+        Profiler(mode="perf")
+    with pytest.raises(ValueError):
+        Profiler(interval_ms=0)
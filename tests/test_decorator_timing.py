@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+
+from py_utils.decorators.timing import time_all_class_methods, timer
+from py_utils.metrics import MetricsRegistry
+
+
+def test_timer_records_calls():
+    registry = MetricsRegistry()
+
+    @timer(registry=registry)
+    def add(a, b):
+        return a + b
+
+    assert add(1, b=2) == 3
+    assert add(2, 3) == 5
+    metric = registry.get(f"{__name__}.test_timer_records_calls.<locals>.add")
+    assert metric is add.metric
+    assert metric.count == 2
+    assert 0 < metric.min <= metric.max <= metric.total
+
+
+def test_timer_records_after_registry_reset():
+    registry = MetricsRegistry()
+
+    @timer(name="add", registry=registry)
+    def add(a, b):
+        return a + b
+
+    add(1, 2)
+    registry.reset()
+    add(1, 2)
+    assert registry.get("add").count == 1
+    assert registry.report().splitlines()[1].startswith("add")
+
+
+def test_timer_bare_uses_default_registry():
+    @timer
+    def noop():
+        pass
+
+    noop()
+    assert noop.__name__ == "noop"
+    assert noop.metric.count == 1
+
+
+def test_timer_records_failing_calls():
+    registry = MetricsRegistry()
+
+    @timer(name="fail", registry=registry)
+    def fail():
+        raise KeyError
+
+    with pytest.raises(KeyError):
+        fail()
+    assert registry.get("fail").count == 1
+
+
+def test_timer_sampling():
+    registry = MetricsRegistry()
+
+    @timer(name="sampled", sample_every=10, registry=registry)
+    def noop():
+        pass
+
+    for _ in range(100):
+        noop()
+    summary = registry.get("sampled").to_dict()
+    assert summary["count"] == 10
+    assert summary["estimated_calls"] == 100
+
+    with pytest.raises(ValueError):
+        timer(noop, sample_every=0)
+
+
+def test_timer_async():
+    registry = MetricsRegistry()
+
+    @timer(name="sleep", registry=registry)
+    async def sleep():
+        await asyncio.sleep(0.01)
+        return 1
+
+    assert asyncio.run(sleep()) == 1
+    assert registry.get("sleep").min >= 10_000_000
+
+
+def test_timer_verbose(capsys):
+    @timer(registry=MetricsRegistry(), verbose=True)
+    def noop():
+        pass
+
+    noop()
+    assert capsys.readouterr().out.startswith("noop ran in ")
+
+
+def test_time_all_class_methods():
+    registry = MetricsRegistry()
+
+    @time_all_class_methods(registry=registry, exclude="skipped")
+    class Model:
+        def __init__(self, value):
+            self._value = value
+
+        def method(self):
+            return self._value
+
+        def skipped(self):
+            return self._value
+
+        @staticmethod
+        def static(x):
+            return x
+
+        @classmethod
+        def create(cls, value):
+            return cls(value)
+
+        @property
+        def value(self):
+            return self._value
+
+        @value.setter
+        def value(self, value):
+            self._value = value
+
+        async def run(self):
+            return self._value
+
+    model = Model.create(1)
+    assert isinstance(model, Model)
+    assert model.method() == 1
+    assert model.skipped() == 1
+    assert Model.static(2) == 2
+    model.value = 3
+    assert model.value == 3
+    assert asyncio.run(model.run()) == 3
+    assert Model.method is Model.method
+
+    prefix = f"{__name__}.test_time_all_class_methods.<locals>.Model."
+    counts = {metric.name[len(prefix) :]: metric.count for metric in registry}
+    assert counts == {
+        "method": 1,
+        "static": 1,
+        "create": 1,
+        "value.getter": 1,
+        "value.setter": 1,
+        "run": 1,
+    }
+
+
+def test_time_all_class_methods_include():
+    registry = MetricsRegistry()
+
+    @time_all_class_methods(include=["load_*", "__call__"], registry=registry)
+    class Loader:
+        def load_a(self):
+            pass
+
+        def save_a(self):
+            pass
+
+        def __call__(self):
+            pass
+
+    Loader().load_a()
+    Loader().save_a()
+    Loader()()
+    assert sorted(metric.name.rsplit(".", 1)[-1] for metric in registry) == ["__call__", "load_a"]
@@ -0,0 +1,146 @@
+import asyncio
+import pickle
+
+import numpy as np
+import pytest
+
+from py_utils.io import (
+    _LZ4_AVAILABLE,
+    _ZSTD_AVAILABLE,
+    async_load_json,
+    async_load_pickle,
+    async_read_txt,
+    async_save_json,
+    async_save_pickle,
+    async_save_txt,
+    load_json,
+    load_many,
+    load_many_json,
+    load_many_pickle,
+    load_pickle,
+    LoadManyError,
+    read_txt,
+    save_json,
+    save_pickle,
+    save_txt,
+)
+
+_codecs = (
+    "gzip",
+    "bz2",
+    "lzma",
+    pytest.param("zstd", marks=pytest.mark.skipif(not _ZSTD_AVAILABLE, reason="requires zstandard")),
+    pytest.param("lz4", marks=pytest.mark.skipif(not _LZ4_AVAILABLE, reason="requires lz4")),
+)
+
+data_ = {
+    "array": np.arange(1000, dtype=np.float32).reshape(10, 100),
+    "fortran": np.asfortranarray(np.ones((3, 4))),
+    "strided": np.arange(20)[::2],
+    "empty": np.empty(0),
+    "meta": {"name": "case_1", "spacing": (1.0, 1.0, 2.5)},
+}
+
+
+def _assert_equal(loaded, expected):
+    assert loaded.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, np.ndarray):
+            np.testing.assert_array_equal(loaded[key], value)
+        else:
+            assert loaded[key] == value
+
+
+def test_save_pickle_highest_protocol(tmp_path):
+    save_pickle(data_, tmp_path / "data.pkl")
+    with open(tmp_path / "data.pkl", "rb") as f:
+        assert f.read(2) == b"\x80" + bytes([pickle.HIGHEST_PROTOCOL])
+    _assert_equal(load_pickle(tmp_path / "data.pkl"), data_)
+
+
+@pytest.mark.parametrize("use_mmap", (True, False))
+def test_pickle_out_of_band(tmp_path, use_mmap):
+    save_pickle(data_, tmp_path / "data", out_of_band=True)
+    loaded = load_pickle(tmp_path / "data", use_mmap=use_mmap)
+    _assert_equal(loaded, data_)
+
+    # arrays are writable views into the file content
+    assert loaded["array"].base is not None
+    if use_mmap:
+        assert loaded["array"].ctypes.data % 64 == 0
+    loaded["array"][0, 0] = -1
+    assert load_pickle(tmp_path / "data")["array"][0, 0] == 0
+
+
+@pytest.mark.parametrize("compression", _codecs)
+def test_compression_argument(tmp_path, compression):
+    save_json({"a": [1, 2]}, tmp_path / "data", compression=compression, level=1, log=False)
+    save_pickle(data_, tmp_path / "data", compression=compression, level=1)
+    save_txt("line1\n", tmp_path / "data", compression=compression)
+    save_txt("line2", tmp_path / "data", compression=compression)
+
+    assert load_json(tmp_path / "data", compression=compression) == {"a": [1, 2]}
+    _assert_equal(load_pickle(tmp_path / "data", compression=compression), data_)
+    assert read_txt(next(tmp_path.glob("data.txt.*"))) == ["line1", "line2"]
+
+
+@pytest.mark.parametrize("suffix", (".gz", ".bz2", ".xz", ".lzma"))
+def test_compression_from_suffix(tmp_path, suffix):
+    save_json({"a": 1}, tmp_path / f"data.json{suffix}", log=False)
+    assert load_json(tmp_path / f"data.json{suffix}") == {"a": 1}
+
+
+def test_compression_out_of_band(tmp_path):
+    with pytest.raises(ValueError):
+        save_pickle(data_, tmp_path / "data.pkl.gz", out_of_band=True)
+
+
+def test_async_io(tmp_path):
+    async def main():
+        await asyncio.gather(
+            *(async_save_json({"case": i}, tmp_path / f"case_{i}", log=False) for i in range(20)),
+            async_save_pickle(data_, tmp_path / "data"),
+            async_save_txt("line", tmp_path / "data"),
+        )
+        loaded = await asyncio.gather(*(async_load_json(tmp_path / f"case_{i}") for i in range(20)))
+        assert loaded == [{"case": i} for i in range(20)]
+        _assert_equal(await async_load_pickle(tmp_path / "data"), data_)
+        assert await async_read_txt(tmp_path / "data.txt") == ["line"]
+
+    asyncio.run(main())
+
+
+def test_async_io_error(tmp_path):
+    async def main():
+        with pytest.raises(ValueError):
+            await async_save_pickle(data_, tmp_path / "data", compression="unknown")
+        with pytest.raises(FileNotFoundError):
+            await async_load_json(tmp_path / "missing")
+
+    asyncio.run(main())
+
+
+def test_load_many(tmp_path):
+    paths = [tmp_path / f"case_{i}.json" for i in range(50)]
+    for i, path in enumerate(paths):
+        save_json({"case": i}, path, log=False)
+
+    assert load_many_json(iter(paths), max_workers=4, max_in_flight=5) == [{"case": i} for i in range(50)]
+    assert load_many(paths[:2], as_dict=True) == {paths[0]: {"case": 0}, paths[1]: {"case": 1}}
+
+    save_pickle(data_, tmp_path / "data")
+    _assert_equal(load_many_pickle([tmp_path / "data"])[0], data_)
+
+
+def test_load_many_failures(tmp_path):
+    save_json({"case": 0}, tmp_path / "case_0", log=False)
+    paths = [tmp_path / "case_0.json", tmp_path / "missing.json"]
+
+    with pytest.raises(LoadManyError) as exc_info:
+        load_many_json(paths)
+    assert list(exc_info.value.failures) == [paths[1]]
+    assert exc_info.value.results[0] == {"case": 0}
+
+    results = load_many_json(paths, errors="return")
+    assert results[0] == {"case": 0}
+    assert isinstance(results[1], FileNotFoundError)
@@ -0,0 +1,105 @@
+import json
+import logging
+import sys
+import threading
+import uuid
+
+import pytest
+
+from py_utils.logger import JsonFormatter, create_logger
+
+
+@pytest.fixture
+def name():
+    name = f"py_utils.tests.{uuid.uuid4().hex}"
+    yield name
+    logger = logging.getLogger(name)
+    for handler in list(logger.handlers):
+        handler.close()
+        logger.removeHandler(handler)
+
+
+def test_create_logger_is_idempotent(tmp_path, name):
+    path = tmp_path / "logs" / "run.log"
+    logger = create_logger(path, name)
+    assert create_logger(path, name) is logger
+    assert len(logger.handlers) == 1
+    logger.info("hello %s", "world")
+    logger.handlers[0].flush()
+    assert path.read_text().rstrip().endswith(f"{name} - INFO - hello world")
+
+    create_logger(tmp_path / "other.log", name)
+    assert len(logger.handlers) == 2
+
+
+def test_create_logger_async(tmp_path, name):
+    path = tmp_path / "run.log"
+    logger = create_logger(path, name, async_mode=True, on_full="block", queue_size=10)
+    (handler,) = logger.handlers
+    for idx in range(100):
+        logger.info("message %d", idx)
+    handler.close()
+    lines = path.read_text().splitlines()
+    assert len(lines) == 100
+    assert lines[-1].endswith("message 99")
+    assert handler.dropped == 0
+
+
+def test_create_logger_async_drops_when_full(tmp_path, name):
+    logger = create_logger(tmp_path / "run.log", name, async_mode=True, queue_size=1)
+    (handler,) = logger.handlers
+    handler._stop_listener()  # nothing consumes the queue anymore
+    for idx in range(10):
+        logger.info("message %d", idx)
+    assert handler.dropped == 9
+
+
+def test_create_logger_async_counts_concurrent_drops(tmp_path, name):
+    logger = create_logger(tmp_path / "run.log", name, async_mode=True, queue_size=1)
+    (handler,) = logger.handlers
+    handler._stop_listener()
+    logger.info("fills the queue")
+    # switch threads as often as possible to interleave the producers
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [
+            threading.Thread(target=lambda: [logger.info("message %d", idx) for idx in range(2_000)])
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert handler.dropped == 8 * 2_000
+    handler.close()
+
+
+def test_create_logger_rotation(tmp_path, name):
+    path = tmp_path / "run.log"
+    logger = create_logger(path, name, rotation="size", max_bytes=200, backup_count=2)
+    for idx in range(50):
+        logger.info("message %d", idx)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["run.log", "run.log.1", "run.log.2"]
+
+    with pytest.raises(ValueError):
+        create_logger(tmp_path / "other.log", name, rotation="weekly")
+    with pytest.raises(ValueError):
+        create_logger(tmp_path / "other.log", name, on_full="wait")
+
+
+def test_create_logger_json(tmp_path, name):
+    path = tmp_path / "run.log"
+    logger = create_logger(path, name, json_format=True)
+    try:
+        raise KeyError("missing")
+    except KeyError:
+        logger.exception("failed on %s", "case_1")
+    record = json.loads(path.read_text())
+    assert record["message"] == "failed on case_1"
+    assert record["level"] == "ERROR"
+    assert record["funcName"] == "test_create_logger_json"
+    assert "KeyError" in record["exception"]
+    assert isinstance(JsonFormatter().format(logging.makeLogRecord({"msg": "x"})), str)
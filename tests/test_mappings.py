@@ -1,7 +1,21 @@
+from collections.abc import Mapping
+
+import numpy as np
+import pytest
+
 from py_utils.mappings import (
+    FlatView,
+    columns_to_records,
+    deep_merge,
+    diff_mappings,
     flatten_mapping,
+    iter_flatten_mapping,
     flatten_mapping_to_top_level,
+    iter_merge_dicts_on_key,
+    merge_lists_of_dicts_on_key,
+    records_to_columns,
     stringify_nested_mapping,
+    unflatten_mapping,
 )
 
 dict_ = {
@@ -33,6 +47,25 @@ def test_flatten_mapping_separator():
     }
 
 
+def test_flatten_mapping_tuple_keys():
+    assert flatten_mapping({1: {2: "a"}, "b": 3}, tuple_keys=True) == {(1, 2): "a", ("b",): 3}
+
+
+def test_iter_flatten_mapping():
+    assert list(iter_flatten_mapping({"b": {}, "a": {"c": 1}, "d": 2})) == [("a.c", 1), ("d", 2)]
+
+
+def test_flatten_mapping_deep():
+    deep = leaf = {}
+    for _ in range(3000):
+        leaf["level"] = {}
+        leaf = leaf["level"]
+    leaf["value"] = 1
+    ((key, value),) = flatten_mapping(deep).items()
+    assert key == ".".join(["level"] * 3000 + ["value"])
+    assert value == 1
+
+
 def test_mapping_to_top_level():
     assert flatten_mapping_to_top_level(dict_) == {"low": 2, "low3": 3}
 
@@ -50,3 +83,232 @@ def test_stringify_nested_mapping():
         },
     }
     assert stringify_nested_mapping(dict_) == res
+
+
+def test_stringify_nested_mapping_shared_and_cyclic():
+    shared = {"a": 1}
+    cyclic = {"shared1": shared, "shared2": shared, "list": [1, (2, 3)]}
+    cyclic["self"] = cyclic
+    cyclic["list"].append(cyclic["list"])
+
+    res = stringify_nested_mapping(cyclic)
+    assert res["shared1"] == res["shared2"] == {"a": "1"}
+    assert res["list"] == ["1", ["2", "3"], "[...]"]
+    assert res["self"] == "{...}"
+
+
+class _ComputedMapping(Mapping):
+    """Mapping creating a new tuple on each access, which is freed once converted."""
+
+    def __getitem__(self, key):
+        return (key, key * 2, key * 3)
+
+    def __iter__(self):
+        return iter(range(100))
+
+    def __len__(self):
+        return 100
+
+
+def test_stringify_nested_mapping_temporaries():
+    res = stringify_nested_mapping({"computed": _ComputedMapping()})
+    assert res["computed"] == {str(idx): [str(idx), str(idx * 2), str(idx * 3)] for idx in range(100)}
+
+
+def test_stringify_nested_mapping_truncation():
+    res = stringify_nested_mapping(
+        {"name": "abcdef", "array": np.arange(100)},
+        max_str_len=20,
+        max_array_items=10,
+    )
+    assert res["name"] == "abcdef"
+    assert res["array"] == "[ 0  1  2 ... 97 98 99]"
+    assert stringify_nested_mapping({"name": "abcdef"}, max_str_len=2) == {"name": "ab...<4 more chars>"}
+
+
+def test_unflatten_mapping():
+    assert unflatten_mapping(flatten_mapping(dict_)) == dict_
+    assert unflatten_mapping(flatten_mapping(dict_, sep="/"), sep="/") == dict_
+    assert unflatten_mapping(flatten_mapping(dict_, tuple_keys=True)) == dict_
+
+
+@pytest.mark.parametrize("flat", ({"a": 1, "a.b": 2}, {"a.b": 2, "a": 1}))
+def test_unflatten_mapping_conflict(flat):
+    with pytest.raises(ValueError):
+        unflatten_mapping(flat)
+
+
+def test_flat_view():
+    view = FlatView(dict_)
+    assert dict(view) == flatten_mapping(dict_)
+    assert len(view) == 3
+    assert view["top.intermediate2.low3"] == 3
+    assert view["top", "intermediate1", "low"] == 1
+    assert "top.intermediate1" not in view
+    assert "top.intermediate1.low.deeper" not in view
+    assert "top.missing" not in view
+
+    assert FlatView({1: {2: "a"}})["1.2"] == "a"
+
+    assert 1 not in view
+    assert None not in view
+    with pytest.raises(KeyError):
+        view[1]
+
+
+def test_flat_view_keys_containing_sep():
+    nested = {"a.b": {"c": 1, "d.e": 2}, "a": {"b": {"f": 3}}, "x": {"y.z": 4}}
+    view = FlatView(nested)
+
+    assert dict(view) == flatten_mapping(nested)
+    assert all(view[flat_key] == item for flat_key, item in flatten_mapping(nested).items())
+    assert view["a.b.d.e"] == 2
+    assert view["a.b.f"] == 3
+    assert "a.b.missing" not in view
+
+
+def test_deep_merge():
+    override = {"top": {"intermediate2": {"low": 5}, "new": 6}}
+    merged = deep_merge(dict_, override)
+    assert merged == {
+        "top": {
+            "intermediate1": {"low": 1},
+            "intermediate2": {"low": 5, "low3": 3},
+            "new": 6,
+        },
+    }
+    # inputs are untouched and unchanged subtrees are shared
+    assert dict_["top"]["intermediate2"]["low"] == 2
+    assert merged["top"]["intermediate1"] is dict_["top"]["intermediate1"]
+
+
+@pytest.mark.parametrize(
+    ("list_strategy", "expected"),
+    (
+        ("replace", [{"id": 1, "b": 3}]),
+        ("extend", [{"id": 1, "a": 2}, 5, {"id": 1, "b": 3}]),
+        ("merge_by_key", [{"id": 1, "a": 2, "b": 3}, 5]),
+    ),
+)
+def test_deep_merge_lists(list_strategy, expected):
+    base = {"items": [{"id": 1, "a": 2}, 5]}
+    override = {"items": [{"id": 1, "b": 3}]}
+    assert deep_merge(base, override, list_strategy=list_strategy, list_key="id") == {"items": expected}
+
+
+def test_diff_mappings():
+    merged = deep_merge(dict_, {"top": {"intermediate2": {"low": 5}, "new": {"x": 1}}})
+    del merged["top"]["intermediate1"]
+    assert diff_mappings(dict_, merged) == {
+        "added": {"top.new": {"x": 1}},
+        "removed": {"top.intermediate1": {"low": 1}},
+        "changed": {"top.intermediate2.low": (2, 5)},
+    }
+    assert diff_mappings(dict_, dict_, tuple_keys=True) == {"added": {}, "removed": {}, "changed": {}}
+
+
+lists_ = [
+    [{"id": 1, "a": 1}, {"id": 3, "a": 3}],
+    [{"id": 2, "b": 2}, {"no_id": 0}],
+    [{"id": 1, "a": 4, "b": 5}],
+]
+
+
+@pytest.mark.parametrize("mode", ("memory", "sorted", "spill"))
+def test_merge_lists_of_dicts_on_key(tmp_path, mode):
+    merged, n_missing = merge_lists_of_dicts_on_key(
+        (iter(dicts) for dicts in lists_),
+        key="id",
+        mode=mode,
+        return_n_missing=True,
+        spill_dir=tmp_path,
+        n_partitions=2,
+    )
+    assert sorted(merged, key=lambda d: d["id"]) == [
+        {"id": 1, "a": 4, "b": 5},
+        {"id": 2, "b": 2},
+        {"id": 3, "a": 3},
+    ]
+    assert n_missing == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_merge_lists_of_dicts_on_key_order():
+    assert [d["id"] for d in merge_lists_of_dicts_on_key(lists_, key="id")] == [1, 3, 2]
+    assert [d["id"] for d in merge_lists_of_dicts_on_key(lists_, key="id", mode="sorted")] == [1, 2, 3]
+    with pytest.raises(ValueError):
+        list(iter_merge_dicts_on_key([[{"id": 2}, {"id": 1}]], key="id", mode="sorted"))
+
+
+def test_iter_merge_dicts_on_key_consumes_inputs_lazily():
+    events = []
+
+    def records(idx, dicts):
+        for record in dicts:
+            events.append(("record", idx))
+            yield record
+
+    def inputs():
+        for idx, dicts in enumerate(lists_):
+            events.append(("input", idx))
+            yield records(idx, dicts)
+
+    list(iter_merge_dicts_on_key(inputs(), key="id", mode="memory"))
+    # each input is only taken from the outer iterable once the previous one is exhausted
+    assert events == [
+        ("input", 0),
+        ("record", 0),
+        ("record", 0),
+        ("input", 1),
+        ("record", 1),
+        ("record", 1),
+        ("input", 2),
+        ("record", 2),
+    ]
+
+
+def test_merge_lists_of_dicts_on_key_conflict():
+    assert merge_lists_of_dicts_on_key(lists_, key="id", conflict="keep_first")[0] == {"id": 1, "a": 1, "b": 5}
+    with pytest.raises(ValueError):
+        merge_lists_of_dicts_on_key(lists_, key="id", conflict="raise")
+
+
+def test_records_to_columns():
+    records = [
+        {"id": 1, "name": "a", "metrics": {"dice": 0.5}, "tags": ["x"]},
+        {"id": 2, "name": "b", "tags": ["y", "z"]},
+        {"id": 3, "name": 4, "metrics": {"dice": 1.0}},
+    ]
+    columns = records_to_columns(iter(records))
+
+    assert list(columns) == ["id", "name", "metrics.dice", "tags"]
+    assert columns["id"].dtype == np.int64
+    assert columns["metrics.dice"].dtype == np.float64
+    assert columns["name"].dtype == object
+    assert columns["metrics.dice"].mean() == 0.75
+    np.testing.assert_array_equal(np.ma.getmaskarray(columns["tags"]), [False, False, True])
+    assert columns["tags"][1] == ["y", "z"]
+
+    assert columns_to_records(columns) == records
+
+
+def test_records_to_columns_numpy_scalars_and_mixed_types():
+    records = [
+        {"dice": np.float64(0.5), "n": np.int64(3), "mixed_number": 1, "flag": True, "mixed_flag": True},
+        {"dice": 0.25, "n": 4, "mixed_number": np.float32(0.5), "flag": np.bool_(False), "mixed_flag": 2},
+    ]
+    columns = records_to_columns(records)
+
+    assert columns["dice"].dtype == np.float64
+    assert columns["n"].dtype == np.int64
+    assert columns["mixed_number"].dtype == np.float64
+    assert columns["flag"].dtype == np.bool_
+    # booleans are not coerced to integers
+    assert columns["mixed_flag"].dtype == object
+    assert columns_to_records(columns) == records
+
+
+def test_records_to_columns_dtypes():
+    columns = records_to_columns([{"a": 1}, {"a": 2}], dtypes={"a": np.float32})
+    assert columns["a"].dtype == np.float32
+    assert columns_to_records(columns) == [{"a": 1.0}, {"a": 2.0}]
@@ -0,0 +1,94 @@
+import json
+import random
+import threading
+
+import pytest
+
+from py_utils.metrics import Metric, MetricsRegistry, _bucket_bounds, _bucket_index
+
+
+def test_bucket_index_is_monotonic_and_invertible():
+    previous = -1
+    for value in list(range(200)) + [2**20 + 17, 2**40 + 3]:
+        index = _bucket_index(value)
+        assert index >= previous
+        low, high = _bucket_bounds(index)
+        assert low <= value < high
+        previous = index
+
+
+def test_metric_exact_statistics():
+    metric = Metric("m")
+    for value in [5, 1, 9, 3]:
+        metric.add(value)
+    assert (metric.count, metric.total, metric.min, metric.max) == (4, 18, 1, 9)
+    assert metric.mean == 4.5
+
+
+@pytest.mark.parametrize("q", [0.1, 0.5, 0.9, 0.99])
+def test_metric_quantile_relative_error(q):
+    rng = random.Random(0)
+    values = [int(rng.lognormvariate(12, 1.5)) for _ in range(20_000)]
+    metric = Metric("m")
+    for value in values:
+        metric.add(value)
+    exact = sorted(values)[int(q * (len(values) - 1))]
+    assert metric.quantile(q) == pytest.approx(exact, rel=0.05)
+
+
+def test_metric_negative_values():
+    metric = Metric("delta", unit="B")
+    for value in [-1000, -10, 0, 10, 1000]:
+        metric.add(value)
+    assert metric.quantile(0) == -1000
+    assert metric.quantile(0.5) == 0
+    assert metric.quantile(0.25) == pytest.approx(-10, rel=0.05)
+
+
+def test_metric_threads():
+    metric = Metric("threads")
+
+    def record():
+        for value in range(1, 101):
+            metric.add(value)
+
+    for _ in range(20):
+        threads = [threading.Thread(target=record) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    metric.add(1000)
+
+    assert metric.count == 100 * 100 + 1
+    assert metric.total == 100 * 5050 + 1000
+    assert (metric.min, metric.max) == (1, 1000)
+    # the shards of the ended threads were folded together when the main thread recorded its first value
+    assert len(metric._shards) == 2
+
+
+def test_registry_report_and_export(tmp_path):
+    registry = MetricsRegistry()
+    registry.record("slow", 3_000_000)
+    registry.record("fast", 10)
+    registry.record("fast", 20)
+    assert registry.metric("fast") is registry.get("fast")
+    assert len(registry) == 2
+
+    lines = registry.report().splitlines()
+    assert lines[0].split()[:3] == ["name", "unit", "count"]
+    assert lines[1].startswith("slow") and lines[2].startswith("fast")
+
+    registry.export_json(tmp_path / "metrics.json")
+    exported = {row["name"]: row for row in json.loads((tmp_path / "metrics.json").read_text())}
+    assert exported["fast"]["count"] == 2
+    assert exported["fast"]["total"] == 30
+
+    fast = registry.get("fast")
+    registry.reset()
+    assert [metric.count for metric in registry] == [0, 0]
+    assert len(registry.report().splitlines()) == 1
+    # metrics are reset in place, references held by instrumented functions keep recording into the registry
+    fast.add(5)
+    assert registry.get("fast").count == 1
+    assert registry.report().splitlines()[1].startswith("fast")
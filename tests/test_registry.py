@@ -0,0 +1,225 @@
+import sys
+
+import pytest
+
+from py_utils.registry import Registry, _installation_fingerprint
+
+MODULE_SOURCE = """
+from registry_plugin import REGISTRY
+
+
+@REGISTRY.register(task="segmentation")
+class Backbone:
+    pass
+
+
+@REGISTRY.register(name="other", task="classification")
+def build_other():
+    pass
+"""
+
+
+@pytest.fixture
+def plugin_package(tmp_path, monkeypatch):
+    """Package `registry_plugin` with a registry and a module `registry_plugin.backbones` registering objects."""
+    package = tmp_path / "registry_plugin"
+    package.mkdir()
+    (package / "__init__.py").write_text("from py_utils.registry import Registry\nREGISTRY = Registry('PLUGIN')\n")
+    (package / "backbones.py").write_text(MODULE_SOURCE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield package
+    for module in ("registry_plugin", "registry_plugin.backbones"):
+        sys.modules.pop(module, None)
+
+
+def test_register():
+    registry = Registry("TEST")
+
+    @registry.register(metadata1="value")
+    def fn():
+        pass
+
+    registry.register(test_register, name="other_fn")
+    assert registry.get("fn") is fn
+    assert registry.get("fn", with_metadata=True)["metadata"] == {"metadata1": "value"}
+    assert registry.available_keys() == ["fn", "other_fn"]
+
+    with pytest.raises(ValueError):
+        registry.register(fn)
+    registry.remove("fn")
+    assert "fn" not in registry
+
+
+def test_query():
+    registry = Registry("TEST")
+    registry.register("collections:OrderedDict", task=["segmentation", "detection"], dim=3)
+    registry.register("collections:Counter", task="classification", dim=2)
+    registry.register("collections:deque", task="segmentation", dim=2, config={"unhashable": []})
+
+    assert registry.query(task="segmentation") == ["OrderedDict", "deque"]
+    assert registry.query(task="segmentation", dim=2) == ["deque"]
+    assert registry.query(task=("detection", "classification")) == ["Counter", "OrderedDict"]
+    assert registry.query(task="unknown") == []
+    assert registry.query(unknown_field=1) == []
+    assert registry.query() == ["Counter", "OrderedDict", "deque"]
+
+    registry.register("collections:deque", task="detection", override=True)
+    assert registry.query(task="segmentation") == ["OrderedDict"]
+    registry.remove("OrderedDict")
+    assert registry.query(task="detection") == ["deque"]
+    assert registry.available_keys() == ["Counter", "deque"]
+
+
+def test_setitem():
+    registry = Registry("TEST")
+    registry.register(test_query, name="fn", task="query")
+
+    registry["fn"] = test_setitem
+    registry["len"] = len
+    assert registry.get("fn") is test_setitem
+    assert registry.get("len", with_metadata=True)["path"] is None
+    assert registry.query(task="query") == []
+    assert registry.available_keys() == ["fn", "len"]
+    with pytest.raises(ValueError):
+        registry["value"] = 1
+
+
+def test_register_lazy():
+    registry = Registry("TEST")
+    registry.register("collections:OrderedDict", task="container")
+    registry.register("os.path:join", name="join")
+    assert registry.data["OrderedDict"]["fn"] is None
+
+    from collections import OrderedDict
+
+    assert registry.get("OrderedDict") is OrderedDict
+    assert registry.get("OrderedDict", with_metadata=True)["metadata"] == {"task": "container"}
+    assert registry["join"]("a", "b") == "a/b"
+
+    with pytest.raises(ValueError):
+        registry.register("collections.OrderedDict")
+
+
+def test_register_lazy_resolved_by_module_import(plugin_package):
+    from registry_plugin import REGISTRY
+
+    REGISTRY.register("registry_plugin.backbones:Backbone", task="segmentation")
+    assert REGISTRY.get("Backbone").__name__ == "Backbone"
+    assert REGISTRY.available_keys() == ["Backbone", "other"]
+
+
+@pytest.fixture
+def reexporting_package(tmp_path, monkeypatch):
+    """Package `reexport_plugin` re-exporting `Backbone`, registered in `reexport_registry.REGISTRY` by its module."""
+    (tmp_path / "reexport_registry.py").write_text(
+        "from py_utils.registry import Registry\nREGISTRY = Registry('PLUGIN')\n",
+    )
+    package = tmp_path / "reexport_plugin"
+    package.mkdir()
+    (package / "__init__.py").write_text("from reexport_plugin.backbones import Backbone\n")
+    (package / "backbones.py").write_text(MODULE_SOURCE.replace("registry_plugin", "reexport_registry"))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield package
+    for module in ("reexport_registry", "reexport_plugin", "reexport_plugin.backbones"):
+        sys.modules.pop(module, None)
+
+
+@pytest.mark.parametrize("import_first", [False, True])
+def test_register_lazy_reexported(reexporting_package, import_first):
+    from reexport_registry import REGISTRY
+
+    REGISTRY.register("reexport_plugin:Backbone", task="segmentation")
+    if import_first:
+        # the object registers itself before the lazy entry is accessed
+        import reexport_plugin  # noqa: F401
+
+    backbone = REGISTRY.get("Backbone")
+    assert backbone is sys.modules["reexport_plugin.backbones"].Backbone
+    assert REGISTRY.get("Backbone", with_metadata=True)["metadata"] == {"task": "segmentation"}
+    assert REGISTRY.available_keys() == ["Backbone", "other"]
+
+
+def test_register_lazy_conflicting_same_name(reexporting_package, monkeypatch):
+    from reexport_registry import REGISTRY
+
+    REGISTRY.register("reexport_plugin:Backbone", task="segmentation")
+    # an unrelated module registering an object with the name of the lazy entry
+    (reexporting_package.parent / "unrelated_backbones.py").write_text(
+        "from reexport_registry import REGISTRY\n\n\n@REGISTRY.register()\nclass Backbone:\n    pass\n",
+    )
+    monkeypatch.delitem(sys.modules, "unrelated_backbones", raising=False)
+    with pytest.raises(ValueError):
+        import unrelated_backbones  # noqa: F401
+
+    assert REGISTRY.get("Backbone") is sys.modules["reexport_plugin.backbones"].Backbone
+
+
+def test_scan(plugin_package, tmp_path):
+    from registry_plugin import REGISTRY
+
+    manifest_path = tmp_path / "manifest.pkl"
+    REGISTRY.scan(["registry_plugin.backbones"], manifest_path)
+    assert manifest_path.exists()
+    assert "registry_plugin.backbones" in sys.modules
+
+    # a new process does not import the scanned modules until an entry is accessed
+    sys.modules.pop("registry_plugin")
+    sys.modules.pop("registry_plugin.backbones")
+    from registry_plugin import REGISTRY
+
+    REGISTRY.scan(["registry_plugin.backbones"], manifest_path)
+    assert "registry_plugin.backbones" not in sys.modules
+    assert REGISTRY.available_keys() == ["Backbone", "other"]
+    assert REGISTRY.data["other"]["metadata"] == {"task": "classification"}
+    assert REGISTRY.get("other").__name__ == "build_other"
+    assert "registry_plugin.backbones" in sys.modules
+    assert REGISTRY.data["Backbone"]["fn"] is not None
+
+    # changing a registering module invalidates the manifest
+    (plugin_package / "backbones.py").write_text(MODULE_SOURCE + "\n\n")
+    sys.modules.pop("registry_plugin")
+    sys.modules.pop("registry_plugin.backbones")
+    from registry_plugin import REGISTRY
+
+    REGISTRY.scan(["registry_plugin.backbones"], manifest_path)
+    assert "registry_plugin.backbones" in sys.modules
+
+
+def test_installation_fingerprint_ignores_working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend("")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    fingerprint = _installation_fingerprint()
+    (tmp_path / "output.txt").write_text("")
+    assert _installation_fingerprint() == fingerprint
+
+
+def test_discover_entry_points(plugin_package, tmp_path, tmp_path_factory):
+    dist_info = tmp_path / "registry_plugin-1.0.dist-info"
+    dist_info.mkdir()
+    (dist_info / "METADATA").write_text("Metadata-Version: 2.1\nName: registry-plugin\nVersion: 1.0\n")
+    (dist_info / "entry_points.txt").write_text(
+        "[test.backbones]\n"
+        "backbone = registry_plugin.backbones:Backbone\n"
+        "module_only = registry_plugin.backbones\n",
+    )
+    cache_path = tmp_path_factory.mktemp("cache") / "entry_points.pkl"
+
+    registry = Registry("TEST")
+    registry.discover_entry_points("test.backbones", cache_path=cache_path)
+    assert registry.available_keys() == ["backbone"]
+    assert registry.data["backbone"]["metadata"] == {"distribution": "registry-plugin"}
+    assert "registry_plugin.backbones" not in sys.modules
+    assert registry.get("backbone").__name__ == "Backbone"
+
+    # the cached entry points are used as long as the installation does not change
+    (dist_info / "entry_points.txt").write_text("[test.backbones]\n")
+    (tmp_path / "unrelated.txt").write_text("")
+    registry = Registry("TEST")
+    registry.discover_entry_points("test.backbones", cache_path=cache_path)
+    assert registry.available_keys() == ["backbone"]
+
+    (tmp_path / "registry_plugin-1.0.dist-info").rename(tmp_path / "registry_plugin-1.1.dist-info")
+    registry = Registry("TEST")
+    registry.discover_entry_points("test.backbones", cache_path=cache_path)
+    assert registry.available_keys() == []
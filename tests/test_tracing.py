@@ -0,0 +1,117 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from py_utils.tracing import Tracer, span
+
+
+@pytest.fixture
+def tracer():
+    return Tracer()
+
+
+def test_span_nesting(tracer):
+    @span(tracer=tracer)
+    def normalize():
+        time.sleep(0.001)
+
+    with span("load_case", tracer=tracer, case_id="case_1") as outer:
+        normalize()
+        with span("resample", tracer=tracer):
+            pass
+
+    records = {record.name: record for record in tracer.spans()}
+    assert set(records) == {"load_case", "test_span_nesting.<locals>.normalize", "resample"}
+    assert records["load_case"].parent_id is None
+    assert records["load_case"].span_id == outer._span_id
+    assert records["load_case"].args == {"case_id": "case_1"}
+    assert records["resample"].parent_id == records["load_case"].span_id
+    child = records["test_span_nesting.<locals>.normalize"]
+    assert child.parent_id == records["load_case"].span_id
+    assert child.duration_ns >= 1_000_000
+    assert records["load_case"].start_ns <= child.start_ns
+    assert child.start_ns + child.duration_ns <= records["load_case"].start_ns + records["load_case"].duration_ns
+
+
+def test_span_threads_and_tasks(tracer):
+    def worker():
+        with span("worker", tracer=tracer):
+            pass
+
+    with span("main", tracer=tracer):
+        thread = threading.Thread(target=worker, name="worker-thread")
+        thread.start()
+        thread.join()
+
+    records = {record.name: record for record in tracer.spans()}
+    # a new thread starts with an empty context
+    assert records["worker"].parent_id is None
+    assert records["worker"].tid != records["main"].tid
+
+    @span("task", tracer=tracer)
+    async def task():
+        await asyncio.sleep(0)
+
+    async def main():
+        with span("gather", tracer=tracer):
+            await asyncio.gather(task(), task())
+
+    asyncio.run(main())
+    gather = next(record for record in tracer.spans() if record.name == "gather")
+    tasks = [record for record in tracer.spans() if record.name == "task"]
+    assert len(tasks) == 2
+    assert all(record.parent_id == gather.span_id for record in tasks)
+
+
+def test_tracer_ring_buffer_and_disabled():
+    tracer = Tracer(capacity=3)
+    for idx in range(5):
+        with span(f"span_{idx}", tracer=tracer):
+            pass
+    assert [record.name for record in tracer.spans()] == ["span_2", "span_3", "span_4"]
+
+    tracer.enabled = False
+    with span("ignored", tracer=tracer):
+        pass
+    assert len(tracer) == 3
+
+
+def test_export_chrome_trace(tracer, tmp_path):
+    with span("outer", tracer=tracer, size=3):
+        with span("inner", tracer=tracer):
+            pass
+    tracer.export(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert events[0]["ph"] == "M"
+    complete = {event["name"]: event for event in events if event["ph"] == "X"}
+    assert complete["outer"]["args"] == {"size": 3}
+    assert complete["outer"]["ts"] <= complete["inner"]["ts"]
+    assert complete["outer"]["dur"] >= complete["inner"]["dur"]
+
+
+def test_export_speedscope(tracer, tmp_path):
+    with span("outer", tracer=tracer):
+        with span("inner", tracer=tracer):
+            pass
+        with span("inner", tracer=tracer):
+            pass
+    tracer.export(tmp_path / "trace.speedscope.json", format="speedscope")
+    data = json.loads((tmp_path / "trace.speedscope.json").read_text())
+    frames = [frame["name"] for frame in data["shared"]["frames"]]
+    (profile,) = data["profiles"]
+    assert [(event["type"], frames[event["frame"]]) for event in profile["events"]] == [
+        ("O", "outer"),
+        ("O", "inner"),
+        ("C", "inner"),
+        ("O", "inner"),
+        ("C", "inner"),
+        ("C", "outer"),
+    ]
+    times = [event["at"] for event in profile["events"]]
+    assert times == sorted(times)
+
+    with pytest.raises(ValueError):
+        tracer.export(tmp_path / "trace.txt", format="txt")